@@ -1,16 +1,94 @@
 """
 Aplicación Flask para ejecutar scraping de ZonaProp con webhooks
 """
-from flask import Flask, request, jsonify
+import threading
+
+from flask import Flask, Response, request, jsonify
 from datetime import datetime
 from api.config import Config
+from api.job_queue import JobStore, JobRunner, ACTIVE_STATUSES, FINISHED_STATUSES, KIND_BATCH
 from api.utils import generate_job_id, send_webhook
-from api.scraper_service import run_scraping
+from api.scraper_service import run_scraping, run_batch_scraping, session_pool
+from src.metrics import metrics
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 
+def process_scrape_job(job, report_progress):
+    """
+    Ejecuta un job de la cola (en un thread del JobRunner) y notifica
+    el resultado al webhook si se proporcionó
+
+    Args:
+        job: Dict del job (job_id, url, webhook_url, ...)
+        report_progress: Callback de avance (pages_done, pages_total, listings_saved)
+
+    Returns:
+        dict: Resultado de run_scraping
+    """
+    job_id = job['job_id']
+    webhook_url = job['webhook_url']
+
+    try:
+        if job['kind'] == KIND_BATCH:
+            result = run_batch_scraping(
+                job['urls'], job_id, progress_callback=report_progress,
+                resume=job['resume'], incremental=job['incremental'], profile=job['profile']
+            )
+        else:
+            # Solo se reanudan checkpoints de jobs terminados, fallidos o huérfanos
+            result = run_scraping(
+                job['url'], job_id, progress_callback=report_progress,
+                resume=job['resume'], incremental=job['incremental'], profile=job['profile'],
+                is_abandoned=job_store.is_abandoned
+            )
+    except Exception as e:
+        # Enviar webhook de error si se proporcionó
+        if webhook_url:
+            send_webhook(webhook_url, {
+                'job_id': job_id,
+                'status': 'failed',
+                'message': str(e),
+                'timestamp': datetime.now().isoformat()
+            })
+        raise
+
+    # Enviar webhook si se proporcionó
+    if webhook_url:
+        send_webhook(webhook_url, {
+            'job_id': job_id,
+            'status': 'completed',
+            'message': f'Scraping completed. {result["count"]} properties saved',
+            'timestamp': datetime.now().isoformat()
+        })
+
+    return result
+
+
+job_store = JobStore(
+    Config.JOBS_DB_PATH,
+    max_attempts=Config.JOB_MAX_ATTEMPTS,
+    heartbeat_timeout=Config.JOB_HEARTBEAT_TIMEOUT
+)
+job_runner = JobRunner(
+    job_store,
+    process_scrape_job,
+    workers=Config.JOB_WORKERS,
+    poll_interval=Config.JOB_POLL_INTERVAL,
+    heartbeat_interval=Config.JOB_HEARTBEAT_INTERVAL
+)
+if Config.JOB_WORKERS > 0:
+    job_runner.start()
+
+    # Precalentar las sesiones HTTP en segundo plano para que el primer job
+    # no pague el challenge de Cloudflare
+    if Config.SESSION_WARMUP_URL:
+        threading.Thread(
+            target=session_pool.warm_up, args=(Config.SESSION_WARMUP_URL,), name='session-warmup', daemon=True
+        ).start()
+
+
 @app.route('/health', methods=['GET'])
 def health():
     """
@@ -23,21 +101,35 @@ def health():
     }), 200
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Métricas en formato de texto de Prometheus, sumadas entre todos los
+    workers: tiempos por etapa (fetch, extract, parse, db_queue, db_write, export),
+    páginas, publicaciones, requests, reintentos, bytes descargados,
+    filas escritas y jobs terminados
+    """
+    return Response(metrics.render_all(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/api/scrape', methods=['POST'])
 def scrape():
     """
-    Endpoint para ejecutar scraping de ZonaProp
+    Endpoint para encolar un scraping de ZonaProp
 
     Body (JSON):
         {
             "url": "https://www.zonaprop.com.ar/...",
-            "webhook_url": "https://tu-servidor.com/webhook"  # Opcional
+            "webhook_url": "https://tu-servidor.com/webhook",  # Opcional
+            "resume": true,  # Opcional: continuar el último scraping interrumpido de la URL
+            "incremental": true,  # Opcional: saltear páginas sin cambios desde el último scraping
+            "profile": true  # Opcional: perfilar el job (pstats y stacks colapsados en data/)
         }
 
     Returns:
-        JSON con el resultado del scraping:
-        - Success (200): {job_id, status, properties_count, csv_file}
-        - Error (400/500): {job_id, status, error}
+        JSON con el job encolado:
+        - Accepted (202): {job_id, status, status_url}
+        - Error (400): {error}
     """
     # Validar que el request tenga JSON
     if not request.is_json:
@@ -48,6 +140,9 @@ def scrape():
     data = request.get_json()
     url = data.get('url')
     webhook_url = data.get('webhook_url')
+    resume = bool(data.get('resume', False))
+    incremental = bool(data.get('incremental', False))
+    profile = bool(data.get('profile', False))
 
     # Validar que la URL esté presente
     if not url:
@@ -69,48 +164,132 @@ def scrape():
     if webhook_url:
         print(f'[{job_id}] Webhook: {webhook_url}')
 
-    try:
-        # Ejecutar scraping (SÍNCRONO - bloquea hasta terminar)
-        result = run_scraping(url, job_id)
+    # Encolar el job (ASÍNCRONO - lo ejecuta el pool de workers en segundo plano)
+    job = job_store.enqueue(job_id, url, webhook_url, resume=resume, incremental=incremental, profile=profile)
+    job_runner.notify()
+
+    return jsonify({
+        'job_id': job_id,
+        'status': job['status'],
+        'status_url': f'/api/jobs/{job_id}'
+    }), 202
 
-        # Enviar webhook si se proporcionó
-        if webhook_url:
-            webhook_payload = {
-                'job_id': job_id,
-                'status': 'completed',
-                'message': f'Scraping completed. {result["count"]} properties saved',
-                'timestamp': datetime.now().isoformat()
-            }
-            send_webhook(webhook_url, webhook_payload)
 
-        # Retornar respuesta exitosa
+@app.route('/api/scrape/batch', methods=['POST'])
+def scrape_batch():
+    """
+    Endpoint para encolar un scraping por lote de varias URLs de ZonaProp
+
+    Body (JSON):
+        {
+            "urls": ["https://www.zonaprop.com.ar/...", ...],
+            "webhook_url": "https://tu-servidor.com/webhook",  # Opcional
+            "resume": true,  # Opcional
+            "incremental": true,  # Opcional
+            "profile": true  # Opcional
+        }
+
+    Returns:
+        JSON con el job encolado:
+        - Accepted (202): {job_id, status, status_url, urls}
+        - Error (400): {error}
+    """
+    if not request.is_json:
         return jsonify({
-            'job_id': job_id,
-            'status': 'completed',
-            'properties_count': result['count'],
-            'csv_file': result['csv_file']
-        }), 200
+            'error': 'Content-Type must be application/json'
+        }), 400
 
-    except Exception as e:
-        error_message = str(e)
-        print(f'[{job_id}] ERROR: {error_message}')
+    data = request.get_json()
+    urls = data.get('urls')
+    webhook_url = data.get('webhook_url')
+    resume = bool(data.get('resume', False))
+    incremental = bool(data.get('incremental', False))
+    profile = bool(data.get('profile', False))
 
-        # Enviar webhook de error si se proporcionó
-        if webhook_url:
-            webhook_payload = {
-                'job_id': job_id,
-                'status': 'failed',
-                'message': error_message,
-                'timestamp': datetime.now().isoformat()
-            }
-            send_webhook(webhook_url, webhook_payload)
+    # Validar la lista de URLs
+    if not urls or not isinstance(urls, list):
+        return jsonify({
+            'error': 'urls must be a non-empty list'
+        }), 400
 
-        # Retornar respuesta de error
+    if len(urls) > Config.BATCH_MAX_URLS:
         return jsonify({
-            'job_id': job_id,
-            'status': 'failed',
-            'error': error_message
-        }), 500
+            'error': f'At most {Config.BATCH_MAX_URLS} URLs per batch'
+        }), 400
+
+    invalid_urls = [url for url in urls if not isinstance(url, str) or 'zonaprop.com.ar' not in url]
+    if invalid_urls:
+        return jsonify({
+            'error': 'All URLs must be from zonaprop.com.ar',
+            'invalid_urls': invalid_urls
+        }), 400
+
+    # Las URLs repetidas se scrapean una sola vez
+    urls = list(dict.fromkeys(urls))
+    job_id = generate_job_id()
+
+    print(f'\n[{job_id}] Nueva solicitud de scraping por lote: {len(urls)} URLs')
+    if webhook_url:
+        print(f'[{job_id}] Webhook: {webhook_url}')
+
+    job = job_store.enqueue(
+        job_id, f'batch:{len(urls)} urls', webhook_url, resume=resume, incremental=incremental, urls=urls,
+        profile=profile
+    )
+    job_runner.notify()
+
+    return jsonify({
+        'job_id': job_id,
+        'status': job['status'],
+        'status_url': f'/api/jobs/{job_id}',
+        'urls': len(urls)
+    }), 202
+
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """
+    Lista los jobs activos (queued/running) y los terminados más recientes
+    de todos los workers
+
+    Query params:
+        limit: Cantidad máxima de jobs por grupo (default: 20)
+
+    Returns:
+        JSON: {active: [...], recent: [...]}
+    """
+    limit = request.args.get('limit', 20, type=int)
+
+    def public(jobs):
+        for job in jobs:
+            job.pop('webhook_url', None)
+        return jobs
+
+    return jsonify({
+        'active': public(job_store.list_jobs(ACTIVE_STATUSES, limit)),
+        'recent': public(job_store.list_jobs(FINISHED_STATUSES, limit))
+    }), 200
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Estado de un job de scraping
+
+    Returns:
+        JSON con status, progreso (páginas hechas/total, propiedades guardadas)
+        y resultado (o error) cuando terminó
+        - 200: Job encontrado
+        - 404: Job inexistente
+    """
+    job = job_store.get(job_id)
+    if not job:
+        return jsonify({
+            'error': 'Job not found'
+        }), 404
+
+    job.pop('webhook_url', None)
+    return jsonify(job), 200
 
 
 if __name__ == '__main__':
@@ -20,5 +20,54 @@ class Config:
     WEBHOOK_TIMEOUT = 10  # seconds
 
     # Scraping
+    SCRAPER_CONCURRENCY = int(os.getenv('SCRAPER_CONCURRENCY', '1'))
+    SCRAPER_REQUESTS_PER_SECOND = float(os.getenv('SCRAPER_REQUESTS_PER_SECOND', '0.33'))
+    SCRAPER_TIMEOUT = float(os.getenv('SCRAPER_TIMEOUT', '30'))  # segundos por request
+    SCRAPER_MAX_RETRIES = int(os.getenv('SCRAPER_MAX_RETRIES', '4'))
+    SCRAPER_MAX_EMPTY_PAGES = int(os.getenv('SCRAPER_MAX_EMPTY_PAGES', '3'))
+    # Procesos de parseo por worker de Gunicorn (0 = parsear en los threads de descarga)
+    SCRAPER_PARSE_WORKERS = int(os.getenv('SCRAPER_PARSE_WORKERS', '0'))
+    # Re-scrape incremental: páginas seguidas sin cambios tras las que se termina (0 = nunca)
+    SCRAPER_STOP_AFTER_UNCHANGED = int(os.getenv('SCRAPER_STOP_AFTER_UNCHANGED', '3'))
+
+    # Páginas que esperan a guardarse en BD en segundo plano antes de frenar
+    # las descargas (0 = guardar cada página en el thread del job)
+    DB_WRITER_QUEUE_SIZE = int(os.getenv('DB_WRITER_QUEUE_SIZE', '8'))
+
+    # Pool de sesiones de cloudscraper compartidas entre jobs (cookies + keep-alive)
+    SESSION_POOL_SIZE = int(os.getenv('SESSION_POOL_SIZE', '2'))
+    SESSION_MAX_AGE = float(os.getenv('SESSION_MAX_AGE', '1800'))  # segundos
+    SESSION_WARMUP_URL = os.getenv('SESSION_WARMUP_URL') or None  # ej: https://www.zonaprop.com.ar/
+
+    # Cache en disco de páginas de resultados (vacío = deshabilitado)
+    RESPONSE_CACHE_DIR = os.getenv('RESPONSE_CACHE_DIR') or None  # ej: data/http_cache
+    RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '21600'))  # segundos (6 horas)
+    RESPONSE_CACHE_MAX_MB = float(os.getenv('RESPONSE_CACHE_MAX_MB', '500'))
+    EXPORT_FORMAT = os.getenv('EXPORT_FORMAT') or None  # 'parquet', 'arrow' o vacío (solo CSV)
     DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
     LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
+
+    # Scraping por lote: búsquedas en paralelo dentro de un job y máximo de URLs por lote
+    BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '4'))
+    BATCH_MAX_URLS = int(os.getenv('BATCH_MAX_URLS', '500'))
+
+    # Cola de jobs (SQLite local, sobrevive a reinicios)
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # Jobs en paralelo por worker de Gunicorn
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+    # Intentos por job: uno interrumpido (worker caído) más veces se marca como fallido
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+    # Latido de los jobs en curso: uno sin latidos por JOB_HEARTBEAT_TIMEOUT segundos
+    # se considera huérfano (worker caído) y se re-encola
+    JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '10'))
+    JOB_HEARTBEAT_TIMEOUT = float(os.getenv('JOB_HEARTBEAT_TIMEOUT', '60'))
+    JOBS_DB_PATH = os.getenv('JOBS_DB_PATH', os.path.join(DATA_DIR, 'jobs.sqlite3'))
+
+    # Checkpoints de páginas procesadas (para reanudar scrapings interrumpidos) e
+    # instantáneas de páginas (para re-scrapes incrementales), en el mismo archivo
+    CHECKPOINTS_DB_PATH = os.getenv('CHECKPOINTS_DB_PATH', os.path.join(DATA_DIR, 'checkpoints.sqlite3'))
+
+    # Métricas (/metrics): acumulados de todos los workers de Gunicorn en un SQLite local
+    METRICS_DB_PATH = os.getenv('METRICS_DB_PATH', os.path.join(DATA_DIR, 'metrics.sqlite3'))
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))  # segundos
+    # Logs JSON (una línea por página y por job, con los tiempos de cada etapa)
+    JSON_LOGS = os.getenv('JSON_LOGS', 'true').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,421 @@
+"""
+Cola y registro de jobs de scraping persistidos en SQLite
+
+Los jobs se encolan desde el endpoint y los ejecuta un pool de threads en
+segundo plano. El estado (ciclo de vida, tiempos, avance y contadores de
+recursos) vive en un archivo SQLite local, así que sobrevive a reinicios y
+se comparte entre los workers de Gunicorn sin broker externo.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from src.heartbeat import DEFAULT_HEARTBEAT_INTERVAL, DEFAULT_HEARTBEAT_TIMEOUT, Heartbeat, is_stale
+from src.sqlite_store import SQLiteStore
+
+KIND_SCRAPE = 'scrape'
+KIND_BATCH = 'batch'
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED)
+
+# Veces que se puede tomar un job antes de darlo por fallido: un job que
+# tira abajo al worker (OOM, segfault) no se re-encola para siempre
+DEFAULT_MAX_ATTEMPTS = 3
+
+CREATE_JOBS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'scrape',
+    urls TEXT,
+    webhook_url TEXT,
+    status TEXT NOT NULL,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    pages_total INTEGER NOT NULL DEFAULT 0,
+    listings_saved INTEGER NOT NULL DEFAULT 0,
+    counters TEXT,
+    resume INTEGER NOT NULL DEFAULT 0,
+    incremental INTEGER NOT NULL DEFAULT 0,
+    profile INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    worker_pid INTEGER,
+    heartbeat_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+)
+"""
+
+
+# Columnas agregadas después de la primera versión de la tabla
+JOBS_MIGRATION_COLUMNS = {
+    'counters': 'TEXT',
+    'resume': 'INTEGER NOT NULL DEFAULT 0',
+    'incremental': 'INTEGER NOT NULL DEFAULT 0',
+    'kind': "TEXT NOT NULL DEFAULT 'scrape'",
+    'urls': 'TEXT',
+    'profile': 'INTEGER NOT NULL DEFAULT 0',
+    'attempts': 'INTEGER NOT NULL DEFAULT 0',
+    'heartbeat_at': 'REAL',
+}
+
+
+class JobStore(SQLiteStore):
+    """
+    Registro de jobs en SQLite
+
+    Mientras un job corre, el JobRunner que lo tomó actualiza su
+    heartbeat_at (ver src/heartbeat.py). Un job 'running' sin latidos
+    recientes quedó huérfano: su worker se cayó o se recicló.
+    """
+
+    TABLES = (CREATE_JOBS_TABLE_SQL,)
+    MIGRATION_COLUMNS = {'jobs': JOBS_MIGRATION_COLUMNS}
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS, heartbeat_timeout=DEFAULT_HEARTBEAT_TIMEOUT):
+        """
+        Args:
+            path: Archivo SQLite de la cola
+            max_attempts: Veces que se toma un job como máximo; un job
+                          interrumpido en su último intento se marca como fallido
+            heartbeat_timeout: Segundos sin latido tras los que un job
+                               'running' se considera huérfano
+        """
+        super().__init__(path)
+        self.max_attempts = max(1, int(max_attempts))
+        self.heartbeat_timeout = heartbeat_timeout
+
+    def _update(self, job_id, **fields):
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        with self._connect() as connection:
+            connection.execute(
+                f'UPDATE jobs SET {assignments} WHERE id = ?',
+                (*fields.values(), job_id)
+            )
+
+    def enqueue(self, job_id, url, webhook_url=None, resume=False, incremental=False, urls=None, profile=False):
+        """
+        Encola un nuevo job
+
+        Args:
+            url: URL a scrapear (en un lote, una descripción del lote)
+            resume: Continuar desde el checkpoint sin terminar de la misma URL
+            incremental: Re-scrape incremental (saltea páginas sin cambios)
+            urls: Lista de URLs para un job por lote
+            profile: Ejecutar el job con el perfilador (ver src/profiling.py)
+
+        Returns:
+            dict: Estado del job
+        """
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT INTO jobs (id, url, kind, urls, webhook_url, status, resume, incremental, profile, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, url, KIND_BATCH if urls else KIND_SCRAPE, json.dumps(urls) if urls else None,
+                 webhook_url, STATUS_QUEUED, int(bool(resume)), int(bool(incremental)), int(bool(profile)),
+                 datetime.now().isoformat())
+            )
+        return self.get(job_id)
+
+    def claim_next(self, worker_pid):
+        """
+        Toma atómicamente el job encolado más antiguo y lo marca como running
+
+        Args:
+            worker_pid: PID del proceso que ejecutará el job
+
+        Returns:
+            dict: Job tomado, o None si la cola está vacía
+        """
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT id FROM jobs WHERE status = ? ORDER BY created_at, id LIMIT 1',
+                (STATUS_QUEUED,)
+            ).fetchone()
+
+            if row is not None:
+                connection.execute(
+                    'UPDATE jobs SET status = ?, worker_pid = ?, started_at = ?, heartbeat_at = ?, '
+                    'attempts = attempts + 1 WHERE id = ?',
+                    (STATUS_RUNNING, worker_pid, datetime.now().isoformat(), time.time(), row['id'])
+                )
+
+        if row is None:
+            return None
+
+        return self.get(row['id'])
+
+    def heartbeat(self, job_ids):
+        """
+        Registra un latido de los jobs en curso indicados
+        """
+        if not job_ids:
+            return
+        placeholders = ', '.join('?' for _ in job_ids)
+        with self._connect() as connection:
+            connection.execute(
+                f'UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND id IN ({placeholders})',
+                (time.time(), STATUS_RUNNING, *job_ids)
+            )
+
+    def update_progress(self, job_id, pages_done, pages_total, listings_saved):
+        self._update(job_id, pages_done=pages_done, pages_total=pages_total, listings_saved=listings_saved)
+
+    def complete(self, job_id, result, counters=None):
+        self._update(
+            job_id,
+            status=STATUS_COMPLETED,
+            result=json.dumps(result),
+            counters=json.dumps(counters or {}),
+            finished_at=datetime.now().isoformat()
+        )
+
+    def fail(self, job_id, error, counters=None):
+        self._update(
+            job_id,
+            status=STATUS_FAILED,
+            error=error,
+            counters=json.dumps(counters or {}),
+            finished_at=datetime.now().isoformat()
+        )
+
+    def requeue_orphans(self):
+        """
+        Vuelve a encolar los jobs 'running' sin latidos recientes (p. ej.
+        tras un reinicio o un worker de Gunicorn reciclado). Se re-encolan
+        con resume, así continúan desde su checkpoint. Los que ya agotaron
+        max_attempts se marcan como fallidos. Cada JobRunner la llama al
+        arrancar y en cada latido; la transacción evita que dos procesos
+        re-encolen el mismo job.
+
+        Returns:
+            int: Cantidad de jobs re-encolados
+        """
+        requeued = 0
+        with self._transaction() as connection:
+            rows = connection.execute(
+                'SELECT id, heartbeat_at, attempts FROM jobs WHERE status = ?', (STATUS_RUNNING,)
+            ).fetchall()
+
+            for row in rows:
+                if not is_stale(row['heartbeat_at'], self.heartbeat_timeout):
+                    continue
+
+                job_id = row['id']
+                if row['attempts'] >= self.max_attempts:
+                    print(f'[{job_id}] Job interrumpido {row["attempts"]} veces, se marca como fallido')
+                    connection.execute(
+                        'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                        (STATUS_FAILED, f'Job interrumpido {row["attempts"]} veces (worker caído)',
+                         datetime.now().isoformat(), job_id)
+                    )
+                    continue
+
+                print(f'[{job_id}] Job interrumpido, se vuelve a encolar')
+                connection.execute(
+                    'UPDATE jobs SET status = ?, worker_pid = NULL, started_at = NULL, heartbeat_at = NULL, '
+                    'resume = 1 WHERE id = ?',
+                    (STATUS_QUEUED, job_id)
+                )
+                requeued += 1
+
+        return requeued
+
+    def is_abandoned(self, job_id):
+        """
+        Indica si un job ya no va a continuar su checkpoint: terminó, falló o
+        quedó huérfano (running sin latidos recientes). Un ID que no es de
+        esta cola (p. ej. de otra ejecución) no se considera abandonado
+
+        Returns:
+            bool
+        """
+        job = self.get(job_id)
+        if job is None:
+            return False
+        if job['status'] in FINISHED_STATUSES:
+            return True
+        return job['status'] == STATUS_RUNNING and is_stale(job['heartbeat_at'], self.heartbeat_timeout)
+
+    def get(self, job_id):
+        """
+        Returns:
+            dict: Estado del job, o None si no existe
+        """
+        with self._connect() as connection:
+            row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_jobs(self, statuses, limit=20):
+        """
+        Lista jobs por estado, del más reciente al más antiguo (los IDs
+        son ordenables cronológicamente)
+
+        Args:
+            statuses: Estados a incluir (ej: ACTIVE_STATUSES, FINISHED_STATUSES)
+            limit: Cantidad máxima de jobs
+
+        Returns:
+            list: Jobs como dicts
+        """
+        placeholders = ', '.join('?' for _ in statuses)
+        with self._connect() as connection:
+            rows = connection.execute(
+                f'SELECT * FROM jobs WHERE status IN ({placeholders}) ORDER BY id DESC LIMIT ?',
+                (*statuses, limit)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row):
+        return {
+            'job_id': row['id'],
+            'url': row['url'],
+            'kind': row['kind'],
+            'urls': json.loads(row['urls']) if row['urls'] else None,
+            'webhook_url': row['webhook_url'],
+            'status': row['status'],
+            'resume': bool(row['resume']),
+            'incremental': bool(row['incremental']),
+            'profile': bool(row['profile']),
+            'progress': {
+                'pages_done': row['pages_done'],
+                'pages_total': row['pages_total'],
+                'listings_saved': row['listings_saved']
+            },
+            'counters': json.loads(row['counters']) if row['counters'] else {},
+            'worker_pid': row['worker_pid'],
+            'heartbeat_at': row['heartbeat_at'],
+            'attempts': row['attempts'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at']
+        }
+
+
+class JobRunner:
+    """
+    Pool de threads que consume la cola de jobs
+
+    Cada thread toma jobs del JobStore y los ejecuta con handler(job, report_progress),
+    donde report_progress(pages_done, pages_total, listings_saved) actualiza el avance.
+    Un thread aparte registra el latido de los jobs en curso y re-encola los
+    huérfanos de otros procesos.
+    """
+
+    def __init__(self, store, handler, workers=2, poll_interval=1.0, heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL):
+        """
+        Args:
+            store: JobStore con la cola
+            handler: Función que ejecuta un job y devuelve su resultado (dict)
+            workers: Cantidad de jobs en paralelo por proceso
+            poll_interval: Segundos entre consultas a la cola cuando está vacía
+            heartbeat_interval: Segundos entre latidos (debe ser bastante menor
+                                que el heartbeat_timeout del store)
+        """
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._threads = []
+        self._heartbeat = None
+        self._running = set()  # IDs de los jobs que ejecuta este proceso
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._threads:
+            return
+
+        self.store.requeue_orphans()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._heartbeat = Heartbeat(self.beat, self.heartbeat_interval, name='job-heartbeat').start()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self._heartbeat is not None:
+            self._heartbeat.stop(timeout)
+            self._heartbeat = None
+
+    def beat(self):
+        """
+        Latido periódico: marca vivos los jobs de este proceso y re-encola
+        los que quedaron huérfanos en otros
+        """
+        with self._lock:
+            job_ids = list(self._running)
+        self.store.heartbeat(job_ids)
+        self.store.requeue_orphans()
+
+    def notify(self):
+        """
+        Despierta a los workers al encolar un job (evita esperar el polling)
+        """
+        self._wakeup.set()
+
+    def _work(self):
+        while not self._stopped.is_set():
+            job = self.store.claim_next(os.getpid())
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            with self._lock:
+                self._running.add(job['job_id'])
+            try:
+                self.run_job(job)
+            finally:
+                with self._lock:
+                    self._running.discard(job['job_id'])
+
+    def run_job(self, job):
+        job_id = job['job_id']
+
+        def report_progress(pages_done, pages_total, listings_saved):
+            self.store.update_progress(job_id, pages_done, pages_total, listings_saved)
+
+        wall_start = time.monotonic()
+        cpu_start = time.thread_time()
+
+        def resource_counters():
+            return {
+                'wall_seconds': round(time.monotonic() - wall_start, 3),
+                # CPU del thread del job (no incluye threads auxiliares de descarga)
+                'cpu_seconds': round(time.thread_time() - cpu_start, 3),
+                'process_max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+            }
+
+        try:
+            result = self.handler(job, report_progress)
+            self.store.complete(job_id, result, resource_counters())
+        except Exception as e:
+            print(f'[{job_id}] ERROR: {e}')
+            traceback.print_exc()
+            self.store.fail(job_id, str(e), resource_counters())
@@ -1,27 +1,88 @@
 """
 Servicio de scraping que encapsula la lógica de scraping
 """
-import pandas as pd
+from contextlib import nullcontext
+
+from api.config import Config
 from src import utils
 from src.browser import Browser
+from src.batch import BatchScraper
+from src.checkpoint import CheckpointStore
+from src.estate import ESTATE_FIELDS
+from src.extractor import has_preloaded_state
+from src.metrics import JobMetrics, MetricsStore, metrics, set_json_logs
+from src.parse_pool import ParsePool
+from src.profiling import JobProfiler
+from src.response_cache import ResponseCache
+from src.session_pool import SessionPool
 from src.scraper import Scraper
-from src.database import get_session
+from src.database import get_session, identity_cache, pool_stats, release_session
+
+# Sesiones HTTP reutilizadas entre jobs del mismo proceso
+session_pool = SessionPool(size=Config.SESSION_POOL_SIZE, max_age=Config.SESSION_MAX_AGE)
+
+# Procesos de parseo compartidos por todos los jobs del proceso (se crean al primer uso)
+parse_pool = ParsePool(workers=Config.SCRAPER_PARSE_WORKERS)
+
+# Métricas del proceso, volcadas al SQLite que comparten todos los workers
+metrics.configure(MetricsStore(Config.METRICS_DB_PATH), flush_interval=Config.METRICS_FLUSH_INTERVAL)
+set_json_logs(Config.JSON_LOGS)
+
+
+def build_browser(http_session):
+    """
+    Browser con la política de requests y el cache de la configuración
+    """
+    response_cache = None
+    if Config.RESPONSE_CACHE_DIR:
+        response_cache = ResponseCache(
+            Config.RESPONSE_CACHE_DIR,
+            ttl=Config.RESPONSE_CACHE_TTL,
+            max_bytes=int(Config.RESPONSE_CACHE_MAX_MB * 1024 * 1024),
+            validator=has_preloaded_state
+        )
+    return Browser(
+        requests_per_second=Config.SCRAPER_REQUESTS_PER_SECOND,
+        timeout=Config.SCRAPER_TIMEOUT,
+        max_retries=Config.SCRAPER_MAX_RETRIES,
+        session=http_session,
+        cache=response_cache
+    )
 
 
-def run_scraping(url, job_id):
+def run_scraping(url, job_id, progress_callback=None, resume=False, incremental=False, profile=False,
+                 is_abandoned=None):
     """
     Ejecuta el scraping de una URL de ZonaProp
 
     Args:
         url (str): URL de ZonaProp a scrapear
         job_id (str): ID del job de scraping
+        progress_callback (callable): Opcional, recibe (pages_done, pages_total, listings_saved)
+        resume (bool): Continuar desde el checkpoint sin terminar de la misma URL
+                       (las páginas ya procesadas no se vuelven a descargar)
+        incremental (bool): Re-scrape incremental: las páginas sin publicaciones
+                            nuevas o modificadas desde el último scraping de la URL
+                            no se guardan ni exportan, y tras varias seguidas se termina
+        profile (bool): Perfilar el job: guarda .pstats y .collapsed junto al CSV
+        is_abandoned (callable): Con resume, indica si el job dueño de otro
+                                 checkpoint de la URL ya no lo usa (ver
+                                 JobStore.is_abandoned); sin ella solo se
+                                 reanuda el checkpoint de este job
 
     Returns:
         dict: Diccionario con los resultados del scraping
               {
-                  'count': int,  # Número de propiedades scrapeadas
+                  'count': int,  # Número de propiedades scrapeadas en esta ejecución
                   'csv_file': str,  # Ruta del archivo CSV generado
-                  'job_id': str  # ID del job
+                  'columnar_file': str,  # Ruta del Parquet/Arrow (None si EXPORT_FORMAT no está configurado)
+                  'job_id': str,  # ID del job
+                  'resumed_from': str,  # Job cuyo checkpoint se reanudó (None si no se reanudó otro)
+                  'pages_skipped': int,  # Páginas ya procesadas según el checkpoint
+                  'pages_unchanged': int,  # Páginas sin cambios (modo incremental)
+                  'db_stats': dict,  # Propiedades insertadas/actualizadas/sin cambios/fallidas
+                  'metrics': dict,  # Segundos por etapa, requests, reintentos, bytes y filas escritas
+                  'profile': dict  # Archivos y funciones principales (None si no se perfiló)
               }
 
     Raises:
@@ -30,37 +91,190 @@ def run_scraping(url, job_id):
     base_url = utils.parse_zonaprop_url(url)
     print(f'[{job_id}] Iniciando scraping para {base_url}')
 
-    # Inicializar browser y scraper
-    browser = Browser()
-    scraper = Scraper(browser, base_url)
+    # Inicializar browser y scraper, con una sesión HTTP ya usada si hay una
+    # disponible (sin handshake TLS ni challenge de Cloudflare)
+    http_session = session_pool.acquire()
+    browser = build_browser(http_session)
+    scraper = Scraper(
+        browser,
+        base_url,
+        concurrency=Config.SCRAPER_CONCURRENCY,
+        max_empty_pages=Config.SCRAPER_MAX_EMPTY_PAGES
+    )
+    scraper.progress_callback = progress_callback
+    scraper.parse_pool = parse_pool
+    job_metrics = JobMetrics(job_id)
+    scraper.job_metrics = job_metrics
 
     # Inicializar sesión de BD y habilitar guardado automático
     db_session = get_session()
-    scraper.enable_database_save(db_session)
+    scraper.enable_database_save(db_session, Config.DB_WRITER_QUEUE_SIZE)
     print(f'[{job_id}] Guardado en BD habilitado')
 
     try:
-        # Ejecutar scraping (guarda en BD automáticamente)
-        estates = scraper.scrap_website()
+        # Checkpoints: al reanudar se sigue agregando al archivo del job original
+        checkpoint_store = CheckpointStore(Config.CHECKPOINTS_DB_PATH)
+        checkpoint = scraper.enable_checkpoints(
+            checkpoint_store,
+            job_id,
+            resume=resume,
+            output_file=utils.get_filename_from_datetime(base_url, 'csv', job_id),
+            is_abandoned=is_abandoned
+        )
+        filename = checkpoint['output_file']
 
-        # Cerrar sesión de BD
-        db_session.close()
+        # Instantáneas de páginas: siempre se registran, así el próximo job
+        # incremental tiene contra qué comparar
+        scraper.enable_page_snapshots(
+            checkpoint_store,
+            incremental=incremental,
+            stop_after_unchanged=Config.SCRAPER_STOP_AFTER_UNCHANGED
+        )
 
-        # Guardar CSV al final
-        df = pd.DataFrame(estates)
-        filename = utils.get_filename_from_datetime(base_url, 'csv')
-        utils.save_df_to_csv(df, filename)
+        # Ejecutar scraping página por página: cada página se guarda en BD
+        # y se agrega al CSV (y al Parquet/Arrow) apenas se scrapea, sin acumular
+        # la búsqueda en memoria
+        profiler = JobProfiler(filename) if profile else None
+        with profiler or nullcontext(), \
+                utils.StreamingExporter(filename, ESTATE_FIELDS, Config.EXPORT_FORMAT) as exporter:
+            for page_estates in scraper.iter_pages():
+                exporter.write_page(page_estates)
+        count = exporter.rows_written
 
-        print(f'[{job_id}] Scraping completado: {len(estates)} propiedades')
+        # Cerrar sesión de BD (su conexión vuelve al pool) y devolver la sesión HTTP al pool
+        release_session()
+        session_pool.release(http_session)
+        job_totals = job_metrics.finish('completed', browser)
+
+        print(f'[{job_id}] Scraping completado: {count} propiedades')
+        print(f'[{job_id}] BD: {scraper.save_stats.as_dict()}')
+        print(f'[{job_id}] Cache de IDs: {identity_cache.stats()}')
+        print(f'[{job_id}] Pool de conexiones BD: {pool_stats()}')
+        print(f'[{job_id}] Pool de sesiones HTTP: {session_pool.stats()}')
+        if browser.cache:
+            print(f'[{job_id}] Cache de respuestas: {browser.cache.stats()}')
 
         return {
-            'count': len(estates),
+            'count': count,
             'csv_file': filename,
-            'job_id': job_id
+            'columnar_file': exporter.columnar_filename,
+            'job_id': job_id,
+            'resumed_from': checkpoint['resumed_from'],
+            'pages_skipped': len(checkpoint['completed_pages']),
+            'pages_unchanged': scraper.pages_unchanged,
+            'db_stats': scraper.save_stats.as_dict(),
+            'metrics': job_totals,
+            'profile': profiler.summary() if profiler else None
         }
 
     except Exception as e:
-        # Cerrar sesión de BD en caso de error
-        db_session.close()
+        # Cerrar sesión de BD en caso de error. La sesión HTTP se descarta:
+        # puede haber quedado bloqueada
+        release_session()
+        session_pool.release(http_session, discard=True)
+        job_metrics.finish('failed', browser)
         print(f'[{job_id}] Error durante scraping: {str(e)}')
         raise e
+
+
+def run_batch_scraping(urls, job_id, progress_callback=None, resume=False, incremental=False, profile=False):
+    """
+    Ejecuta el scraping de varias URLs de ZonaProp como un solo job
+
+    Las búsquedas comparten el pool de workers (BATCH_WORKERS), el límite de
+    tasa y la sesión HTTP, y las publicaciones repetidas entre búsquedas se
+    guardan y exportan una sola vez. Un error en una búsqueda no corta el resto.
+
+    Args:
+        urls (list): URLs de ZonaProp a scrapear
+        job_id (str): ID del job de scraping
+        progress_callback (callable): Opcional, recibe (pages_done, pages_total, listings_saved)
+                                      sumados sobre todo el lote
+        resume (bool): Continuar cada búsqueda desde su checkpoint de este job
+        incremental (bool): Re-scrape incremental de cada búsqueda
+        profile (bool): Perfilar el job: guarda .pstats y .collapsed junto al CSV
+
+    Returns:
+        dict: Resultado del lote
+              {
+                  'count': int,  # Publicaciones únicas exportadas
+                  'duplicates': int,  # Publicaciones repetidas entre búsquedas (descartadas)
+                  'failed_urls': int,  # Búsquedas que terminaron con error
+                  'csv_file': str,  # CSV único del lote
+                  'columnar_file': str,
+                  'job_id': str,
+                  'urls': list,  # Resultado por búsqueda (páginas, publicaciones, error, db_stats)
+                  'db_stats': dict,  # Totales de BD del lote
+                  'throughput': dict,  # Tiempo total, páginas y publicaciones por segundo
+                  'metrics': dict,  # Segundos por etapa, requests, reintentos, bytes y filas escritas
+                  'profile': dict  # Archivos y funciones principales (None si no se perfiló)
+              }
+
+    Raises:
+        Exception: Si fallan todas las búsquedas del lote
+    """
+    print(f'[{job_id}] Iniciando scraping por lote de {len(urls)} URLs')
+
+    http_session = session_pool.acquire()
+    browser = build_browser(http_session)
+    checkpoint_store = CheckpointStore(Config.CHECKPOINTS_DB_PATH)
+    filename = utils.get_filename_from_datetime('https://www.zonaprop.com.ar/lote', 'csv', job_id)
+    job_metrics = JobMetrics(job_id)
+
+    def prepare_scraper(scraper):
+        scraper.max_empty_pages = Config.SCRAPER_MAX_EMPTY_PAGES
+        scraper.parse_pool = parse_pool
+        scraper.job_metrics = job_metrics
+        # Todas las búsquedas del lote escriben al mismo CSV
+        scraper.enable_checkpoints(checkpoint_store, job_id, resume=resume, output_file=filename)
+        scraper.enable_page_snapshots(
+            checkpoint_store, incremental=incremental, stop_after_unchanged=Config.SCRAPER_STOP_AFTER_UNCHANGED
+        )
+
+    if resume:
+        # Reanudar: el lote sigue escribiendo al CSV del job original
+        for base_url in dict.fromkeys(utils.parse_zonaprop_url(url) for url in urls):
+            checkpoint = checkpoint_store.get(base_url, job_id)
+            if checkpoint and checkpoint['output_file']:
+                filename = checkpoint['output_file']
+                break
+
+    batch = BatchScraper(
+        browser,
+        urls,
+        workers=Config.BATCH_WORKERS,
+        session_factory=get_session,
+        prepare_scraper=prepare_scraper,
+        progress_callback=progress_callback,
+        db_writer_queue_size=Config.DB_WRITER_QUEUE_SIZE
+    )
+
+    profiler = JobProfiler(filename) if profile else None
+    try:
+        with profiler or nullcontext(), \
+                utils.StreamingExporter(filename, ESTATE_FIELDS, Config.EXPORT_FORMAT) as exporter:
+            result = batch.run(on_page=exporter.write_page)
+    except Exception:
+        session_pool.release(http_session, discard=True)
+        job_metrics.finish('failed', browser)
+        raise
+
+    failed = result['failed_urls'] == len(result['urls'])
+    session_pool.release(http_session, discard=failed)
+    job_totals = job_metrics.finish('failed' if failed else 'completed', browser)
+    if failed:
+        raise Exception(f"Fallaron todas las URLs del lote: {result['urls'][0]['error']}")
+
+    print(f"[{job_id}] Lote completado: {result['count']} propiedades únicas, "
+          f"{result['duplicates']} duplicadas, {result['failed_urls']} URLs con error")
+    print(f"[{job_id}] Throughput: {result['throughput']}")
+    print(f'[{job_id}] BD: {result["db_stats"]}')
+
+    result.update({
+        'csv_file': filename,
+        'columnar_file': exporter.columnar_filename,
+        'job_id': job_id,
+        'metrics': job_totals,
+        'profile': profiler.summary() if profiler else None
+    })
+    return result
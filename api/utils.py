@@ -1,18 +1,56 @@
 """
 Utilidades para la API Flask
 """
+import os
+import threading
+import time
 import requests
-from datetime import datetime
 from api.config import Config
 
+# Alfabeto Base32 de Crockford (sin I, L, O, U), el mismo que usa ULID
+CROCKFORD_BASE32 = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+_ulid_lock = threading.Lock()
+_last_ulid_timestamp = 0
+_last_ulid_randomness = 0
+
+
+def generate_ulid():
+    """
+    Genera un identificador estilo ULID: 48 bits de timestamp en
+    milisegundos + 80 bits aleatorios, codificado en 26 caracteres Base32.
+
+    Los IDs se ordenan cronológicamente como strings. Dentro del mismo
+    milisegundo (en el mismo proceso) la parte aleatoria se incrementa,
+    así que también quedan ordenados; entre procesos, los 80 bits
+    aleatorios hacen que una colisión sea despreciable.
+    """
+    global _last_ulid_timestamp, _last_ulid_randomness
+
+    with _ulid_lock:
+        timestamp = int(time.time() * 1000)
+        if timestamp <= _last_ulid_timestamp:
+            timestamp = _last_ulid_timestamp
+            randomness = _last_ulid_randomness + 1
+            if randomness >= 1 << 80:
+                timestamp += 1
+                randomness = int.from_bytes(os.urandom(10), 'big')
+        else:
+            randomness = int.from_bytes(os.urandom(10), 'big')
+
+        _last_ulid_timestamp = timestamp
+        _last_ulid_randomness = randomness
+
+    value = (timestamp << 80) | randomness
+    return ''.join(CROCKFORD_BASE32[(value >> shift) & 31] for shift in range(125, -5, -5))
+
 
 def generate_job_id():
     """
-    Genera un ID único para el job de scraping
-    Formato: job_YYYYMMDD_HHMMSS
+    Genera un ID único y ordenable para el job de scraping
+    Formato: job_<ULID> (ej: job_01JA8Z3Q5M7X9K2B4C6D8E0F1G)
     """
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    return f'job_{timestamp}'
+    return f'job_{generate_ulid()}'
 
 
 def send_webhook(webhook_url, payload):
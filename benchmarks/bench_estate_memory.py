@@ -0,0 +1,57 @@
+"""
+Benchmark de memoria: bytes por propiedad retenida
+
+Compara las propiedades como dicts (formato anterior, Estate.to_dict())
+con los registros Estate/EstateImage con __slots__. Se mide con
+tracemalloc la memoria que queda retenida al acumular N propiedades
+(los strings compartidos con las publicaciones originales no cuentan).
+
+Uso:
+    python -m benchmarks.bench_estate_memory [--listings 10000]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks.common import synthetic_posts
+from src.scraper import Scraper
+
+
+def retained_bytes(build):
+    """
+    Bytes que quedan asignados después de construir la lista que devuelve build
+    """
+    gc.collect()
+    tracemalloc.start()
+    values = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, values
+
+
+def run(listings):
+    posts = synthetic_posts(listings)
+    scraper = Scraper(None, '')
+
+    results = {}
+    builds = (
+        ('dict', lambda: [scraper.parse_estate(post).to_dict() for post in posts]),
+        ('Estate', lambda: [scraper.parse_estate(post) for post in posts]),
+    )
+    for name, build in builds:
+        current, values = retained_bytes(build)
+        assert len(values) == listings
+        results[name] = current / listings
+        print(f'{name:>8}: {results[name]:8.0f} bytes/propiedad ({current / 1024 / 1024:.1f} MB para {listings})')
+        del values
+
+    print(f'  ahorro: {1 - results["Estate"] / results["dict"]:8.1%}')
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de memoria por propiedad (dict vs Estate)')
+    parser.add_argument('--listings', type=int, default=10000)
+    args = parser.parse_args()
+    run(args.listings)
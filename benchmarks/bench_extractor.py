@@ -0,0 +1,77 @@
+"""
+Micro-benchmark de la extracción de window.__PRELOADED_STATE__
+
+Compara el camino anterior (BeautifulSoup/lxml + loop de llaves carácter
+por carácter) con src.extractor sobre test/mock/html_page.html.
+
+Uso:
+    python -m benchmarks.bench_extractor [--repeat N]
+"""
+import argparse
+import codecs
+import json
+import timeit
+
+from bs4 import BeautifulSoup
+
+from benchmarks.common import MOCK_HTML_PATH
+from src.extractor import extract_preloaded_state
+
+
+def legacy_extract_preloaded_state(page):
+    """
+    Implementación anterior, conservada solo como referencia para el benchmark
+    """
+    soup = BeautifulSoup(page, 'lxml')
+    script_tag = soup.find('script', id="preloadedData")
+    if not script_tag:
+        return None
+
+    script_text = script_tag.text.strip()
+    preloaded_state_marker = 'window.__PRELOADED_STATE__ = '
+    start_index = script_text.find(preloaded_state_marker)
+    if start_index == -1:
+        return None
+
+    json_start = start_index + len(preloaded_state_marker)
+    brace_count = 0
+    json_end = -1
+    for i in range(json_start, len(script_text)):
+        if script_text[i] == '{':
+            brace_count += 1
+        elif script_text[i] == '}':
+            brace_count -= 1
+            if brace_count == 0:
+                json_end = i + 1
+                break
+
+    if json_end == -1:
+        return None
+
+    return json.loads(script_text[json_start:json_end])
+
+
+def load_mock_page():
+    with codecs.open(MOCK_HTML_PATH, 'r', encoding='latin-1') as f:
+        return f.read()
+
+
+def run(repeat):
+    page = load_mock_page()
+    assert legacy_extract_preloaded_state(page) == extract_preloaded_state(page)
+
+    results = {}
+    for name, func in (('legacy', legacy_extract_preloaded_state), ('extractor', extract_preloaded_state)):
+        timings = timeit.repeat(lambda: func(page), number=1, repeat=repeat)
+        results[name] = min(timings)
+        print(f'{name:>10}: {min(timings) * 1000:8.2f} ms/página (mejor de {repeat})')
+
+    print(f'   speedup: {results["legacy"] / results["extractor"]:8.1f}x')
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de extracción de PRELOADED_STATE')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run(args.repeat)
@@ -0,0 +1,208 @@
+"""
+Micro-benchmark del parseo de publicaciones
+
+Compara el parse_estate anterior (cadena de ifs y .get armando un dict por
+propiedad) con los extractores de src.posting_fields, tanto de a una
+publicación (parse_posting) como por página a columnas
+(parse_postings_columns), sobre páginas de 20 publicaciones. Las variantes
+se miden intercaladas en cada repetición, así el ruido de la máquina las
+afecta por igual.
+
+Uso:
+    python -m benchmarks.bench_parse_estate [--pages 50] [--repeat 5]
+"""
+import argparse
+import hashlib
+import json
+import timeit
+
+from benchmarks.common import synthetic_posts
+from src.posting_fields import parse_posting, parse_postings_columns
+
+PAGE_SIZE = 20
+
+
+def legacy_parse_estate(estate_post):
+    """
+    Implementación anterior de Scraper.parse_estate (dict por propiedad),
+    conservada solo como referencia para el benchmark y los tests
+    """
+    estate = {}
+
+    # ID y títulos
+    estate['posting_id'] = estate_post.get('postingId', '')
+    estate['title'] = estate_post.get('title', '')
+    estate['generated_title'] = estate_post.get('generatedTitle', '')
+
+    # URL
+    estate['url'] = 'https://www.zonaprop.com.ar' + estate_post.get('url', '')
+
+    # Precio y tipo de operación
+    price_operations = estate_post.get('priceOperationTypes', [])
+    estate['sell_price'] = None
+    estate['sell_currency'] = None
+    estate['rent_price'] = None
+    estate['rent_currency'] = None
+    estate['price_value'] = ''  # Para CSV
+    estate['price_currency'] = ''  # Para CSV
+
+    if price_operations and len(price_operations) > 0:
+        operation = price_operations[0]
+        operation_type = operation.get('operationType', {})
+        operation_type_id = operation_type.get('operationTypeId', '')
+
+        prices = operation.get('prices', [])
+        if prices and len(prices) > 0:
+            amount = prices[0].get('amount', '')
+            currency = prices[0].get('currency', '')
+
+            # Para CSV (compatibilidad)
+            estate['price_value'] = amount
+            estate['price_currency'] = currency
+
+            # Para BD: diferenciar venta/alquiler
+            if operation_type_id == '1':  # Venta
+                estate['sell_price'] = amount
+                estate['sell_currency'] = currency
+            elif operation_type_id == '2':  # Alquiler
+                estate['rent_price'] = amount
+                estate['rent_currency'] = currency
+
+    # Expensas
+    expenses = estate_post.get('expenses')
+    if expenses:
+        estate['expenses_value'] = expenses.get('amount', '')
+        estate['expenses_currency'] = expenses.get('currency', '')
+    else:
+        estate['expenses_value'] = ''
+        estate['expenses_currency'] = ''
+
+    # Características principales
+    main_features = estate_post.get('mainFeatures', {})
+
+    # Superficie total
+    if 'CFT100' in main_features:
+        estate['superficie_total'] = main_features['CFT100'].get('value', '')
+    else:
+        estate['superficie_total'] = ''
+
+    # Superficie cubierta
+    if 'CFT101' in main_features:
+        estate['superficie_cubierta'] = main_features['CFT101'].get('value', '')
+    else:
+        estate['superficie_cubierta'] = ''
+
+    # Ambientes
+    if 'CFT1' in main_features:
+        estate['ambientes'] = main_features['CFT1'].get('value', '')
+    else:
+        estate['ambientes'] = ''
+
+    # Dormitorios
+    if 'CFT2' in main_features:
+        estate['dormitorios'] = main_features['CFT2'].get('value', '')
+    else:
+        estate['dormitorios'] = ''
+
+    # Baños
+    if 'CFT3' in main_features:
+        estate['baños'] = main_features['CFT3'].get('value', '')
+    else:
+        estate['baños'] = ''
+
+    # Cocheras
+    if 'CFT7' in main_features:
+        estate['cocheras'] = main_features['CFT7'].get('value', '')
+    else:
+        estate['cocheras'] = ''
+
+    # Antigüedad
+    if 'CFT5' in main_features:
+        estate['antiguedad'] = main_features['CFT5'].get('value', '')
+    else:
+        estate['antiguedad'] = ''
+
+    # Publisher (inmobiliaria)
+    publisher = estate_post.get('publisher', {})
+    estate['publisher_name'] = publisher.get('name', '')
+    estate['publisher_id'] = publisher.get('publisherId', '')
+    estate['publisher_url'] = 'https://www.zonaprop.com.ar' + publisher.get('url', '') if publisher.get('url') else ''
+    estate['publisher_logo_url'] = publisher.get('urlLogo', '')
+    estate['publisher_phone'] = estate_post.get('whatsApp', '')
+
+    # Ubicación
+    posting_location = estate_post.get('postingLocation') or {}
+
+    # Dirección
+    address = posting_location.get('address') or {}
+    estate['address'] = address.get('name', '')
+
+    # Barrio/zona
+    location = posting_location.get('location') or {}
+    estate['location'] = location.get('name', '')
+    estate['location_id_raw'] = location.get('locationId', '')  # Para convertir a int en database.py
+
+    # Ciudad
+    parent_location = location.get('parent') or {}
+    estate['city'] = parent_location.get('name', '')
+
+    # Descripción
+    estate['description'] = estate_post.get('descriptionNormalized', '')
+
+    # Tipo de propiedad
+    real_estate_type = estate_post.get('realEstateType', {})
+    estate['property_type'] = real_estate_type.get('name', '')
+
+    # Fecha de creación/modificación
+    estate['created_at'] = estate_post.get('modified_date', '')
+
+    # Imágenes
+    visible_pictures = estate_post.get('visiblePictures', {})
+    pictures = visible_pictures.get('pictures', [])
+    estate['images'] = []
+
+    for pic in pictures:
+        estate['images'].append({
+            'url': pic.get('url730x532', ''),
+            'order': pic.get('order', 0)
+        })
+
+    # Huella de contenido para detectar cambios en re-scrapes
+    content = {key: value for key, value in estate.items() if key != 'content_hash'}
+    serialized = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    estate['content_hash'] = hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+    return estate
+
+
+def run(pages, repeat):
+    posts = synthetic_posts(pages * PAGE_SIZE)
+    page_posts = [posts[start:start + PAGE_SIZE] for start in range(0, len(posts), PAGE_SIZE)]
+    assert parse_posting(posts[0]).to_dict() == legacy_parse_estate(posts[0])
+
+    candidates = (
+        ('legacy', lambda: [[legacy_parse_estate(post) for post in page] for page in page_posts]),
+        ('posting_fields', lambda: [[parse_posting(post) for post in page] for page in page_posts]),
+        ('columnas', lambda: [parse_postings_columns(page) for page in page_posts]),
+    )
+
+    timings = {name: [] for name, _ in candidates}
+    for _ in range(repeat):
+        for name, func in candidates:
+            timings[name].append(timeit.timeit(func, number=1))
+
+    results = {name: min(values) / len(posts) for name, values in timings.items()}
+    for name, seconds in results.items():
+        print(f'{name:>14}: {seconds * 1e6:8.1f} µs/publicación (mejor de {repeat})')
+
+    for name in ('posting_fields', 'columnas'):
+        print(f'{name:>14}: {results["legacy"] / results[name]:8.2f}x respecto de legacy')
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de parseo de publicaciones')
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run(args.pages, args.repeat)
@@ -0,0 +1,43 @@
+"""
+Datos sintéticos compartidos por los benchmarks
+"""
+import ast
+import copy
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+EXAMPLE_POST_PATH = os.path.join(ROOT_DIR, 'estate_post_example.json')
+MOCK_HTML_PATH = os.path.join(ROOT_DIR, 'test', 'mock', 'html_page.html')
+
+
+def load_example_post():
+    """
+    Carga estate_post_example.json (guardado como repr de Python, no JSON estricto)
+    """
+    with open(EXAMPLE_POST_PATH, encoding='utf-8') as f:
+        return ast.literal_eval(f.read())
+
+
+def synthetic_posts(quantity, publishers_quantity=30, first_posting_id=90000000):
+    """
+    Genera publicaciones distintas a partir del ejemplo, repartidas entre
+    una cantidad acotada de publishers (como en una búsqueda real)
+    """
+    example = load_example_post()
+    posts = []
+    for i in range(quantity):
+        post = copy.deepcopy(example)
+        post['postingId'] = str(first_posting_id + i)
+        post['publisher']['publisherId'] = str(1000 + i % publishers_quantity)
+        posts.append(post)
+    return posts
+
+
+def synthetic_estates(quantity, **kwargs):
+    """
+    Igual que synthetic_posts, pero ya parseadas con Scraper.parse_estate
+    """
+    from src.scraper import Scraper
+
+    scraper = Scraper(None, '')
+    return [scraper.parse_estate(post) for post in synthetic_posts(quantity, **kwargs)]
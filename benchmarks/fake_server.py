@@ -0,0 +1,227 @@
+"""
+Servidor HTTP local que imita las páginas de búsqueda de ZonaProp
+
+Arma cada página a partir de test/mock/html_page.html, reemplazando el
+PRELOADED_STATE por publicaciones sintéticas (generadas desde
+estate_post_example.json) y un paging acorde al tamaño configurado. Cada
+respuesta puede demorarse una latencia fija más un jitter aleatorio.
+
+Responde las mismas rutas que arma Scraper.get_page_url:
+    /<búsqueda>.html
+    /<búsqueda>-pagina-<N>.html
+
+Uso (servidor suelto, para apuntar el scraper a mano):
+    python -m benchmarks.fake_server [--listings 2000] [--page-size 20] [--latency 0.05] [--port 8765]
+"""
+import argparse
+import codecs
+import copy
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import load_example_post, MOCK_HTML_PATH
+from src.extractor import extract_preloaded_state, find_preloaded_json
+
+PAGE_PATH_PATTERN = re.compile(r'^/[^/]+?(?:-pagina-(?P<page>\d+))?\.html$')
+FIRST_POSTING_ID = 90000000
+PUBLISHERS_QUANTITY = 30
+
+
+class FakeZonaPropSite:
+    """
+    Generador de las páginas de una búsqueda sintética
+
+    Las publicaciones se generan a partir del índice global (posting_id
+    FIRST_POSTING_ID + índice), así que cada página es siempre la misma y
+    no hace falta tener la búsqueda entera en memoria.
+    """
+
+    def __init__(self, listings=2000, page_size=20, html_path=MOCK_HTML_PATH):
+        """
+        Args:
+            listings: Total de publicaciones de la búsqueda
+            page_size: Publicaciones por página
+            html_path: HTML de ejemplo del que se toma el resto de la página
+        """
+        self.listings = listings
+        self.page_size = page_size
+        self.example_post = load_example_post()
+
+        # El HTML de ejemplo no es UTF-8 válido en todo su largo (ver test/conftest.py)
+        with codecs.open(html_path, 'r', encoding='latin-1') as f:
+            template = f.read()
+        json_start, _ = find_preloaded_json(template)
+        _, json_end = json.JSONDecoder().raw_decode(template, json_start)
+        self.html_prefix = template[:json_start]
+        self.html_suffix = template[json_end:]
+        self.state = extract_preloaded_state(template)
+
+    @property
+    def total_pages(self):
+        return math.ceil(self.listings / self.page_size) if self.page_size else 0
+
+    def build_posting(self, index):
+        post = copy.deepcopy(self.example_post)
+        post['postingId'] = str(FIRST_POSTING_ID + index)
+        post['publisher']['publisherId'] = str(1000 + index % PUBLISHERS_QUANTITY)
+        return post
+
+    def build_state(self, page_number):
+        """
+        PRELOADED_STATE de una página: el del HTML de ejemplo con el paging
+        y las publicaciones de la búsqueda sintética
+        """
+        first = (page_number - 1) * self.page_size
+        last = min(first + self.page_size, self.listings)
+
+        list_store = dict(self.state['listStore'])
+        list_store['paging'] = dict(
+            list_store['paging'],
+            total=self.listings,
+            offset=first,
+            limit=self.page_size,
+            totalPages=self.total_pages,
+            currentPage=page_number,
+            firstPage=page_number == 1,
+            lastPage=page_number >= self.total_pages,
+            pagesUrl={},
+        )
+        list_store['listPostings'] = [self.build_posting(index) for index in range(first, last)]
+        return dict(self.state, listStore=list_store)
+
+    def render_page(self, page_number):
+        """
+        Returns:
+            str: HTML de la página (sin publicaciones si está fuera de rango)
+        """
+        state = self.build_state(page_number)
+        return self.html_prefix + json.dumps(state, ensure_ascii=False) + self.html_suffix
+
+
+class FakeZonaPropHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        match = PAGE_PATH_PATTERN.match(self.path.split('?', 1)[0])
+        if not match:
+            self.send_error(404)
+            return
+
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        page_number = int(match.group('page') or 1)
+        body = server.site.render_page(page_number).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        with server.lock:
+            server.requests_served += 1
+
+    def log_message(self, format, *args):
+        # Sin una línea por request: ensucia la salida del benchmark
+        pass
+
+
+class FakeZonaPropServer(ThreadingHTTPServer):
+    """
+    Servidor de FakeZonaPropSite (un thread por conexión)
+
+    Uso:
+        with FakeZonaPropServer(FakeZonaPropSite(listings=200)) as server:
+            url = server.search_url('departamentos-alquiler')
+    """
+    daemon_threads = True
+
+    def __init__(self, site, latency=0.0, jitter=0.0, host='127.0.0.1', port=0):
+        """
+        Args:
+            site: FakeZonaPropSite con las páginas a servir
+            latency: Demora fija de cada respuesta en segundos
+            jitter: Demora adicional aleatoria (uniforme entre 0 y jitter)
+            host: Interfaz donde escuchar
+            port: Puerto (0 = uno libre)
+        """
+        super().__init__((host, port), FakeZonaPropHandler)
+        self.site = site
+        self.latency = latency
+        self.jitter = jitter
+        self.lock = threading.Lock()
+        self.requests_served = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def search_url(self, search='departamentos-alquiler'):
+        """
+        URL de búsqueda sin extensión .html (como la recibe Scraper)
+        """
+        return f'{self.base_url}/{search}'
+
+    def start(self):
+        """
+        Atiende requests en un thread en segundo plano
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def serve(listings, page_size, latency, jitter, port, ready=None):
+    """
+    Corre el servidor hasta que se interrumpe el proceso. Es una función de
+    módulo para poder lanzarlo en otro proceso (así su CPU no se mezcla con
+    la del scraper medido)
+
+    Args:
+        ready: multiprocessing.Queue opcional donde se informa la URL base
+               una vez que el servidor escucha
+    """
+    server = FakeZonaPropServer(FakeZonaPropSite(listings, page_size), latency, jitter, port=port)
+    if ready is not None:
+        ready.put(server.base_url)
+    else:
+        print(f'Sirviendo {listings} publicaciones en {server.base_url} (Ctrl+C para terminar)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor local con páginas de búsqueda estilo ZonaProp')
+    parser.add_argument('--listings', type=int, default=2000)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05, help='Demora fija por respuesta (segundos)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Demora aleatoria adicional (segundos)')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    serve(args.listings, args.page_size, args.latency, args.jitter, args.port)
@@ -18,7 +18,7 @@ backlog = 2048
 workers = 2
 worker_class = 'sync'
 worker_connections = 1000
-timeout = 300  # 5 minutos para jobs largos de scraping
+timeout = 300  # Los jobs de scraping corren en background (JOB_WORKERS), no dentro del request
 keepalive = 2
 
 # Logging
@@ -68,7 +68,9 @@ CREATE TABLE `properties`  (
   `antiquity` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL,
   `address` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL,
   `description` text CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NULL DEFAULT NULL,
+  `content_hash` char(40) CHARACTER SET ascii COLLATE ascii_bin NULL DEFAULT NULL,
   PRIMARY KEY (`id`, `publication_id`, `source_id`, `publisher_id`, `location_id`) USING BTREE,
+  UNIQUE INDEX `properties_publication_source_unique`(`publication_id` ASC, `source_id` ASC) USING BTREE,
   INDEX `properties_publisher_id_foreign`(`publisher_id` ASC) USING BTREE,
   INDEX `properties_source_id_foreign`(`source_id` ASC) USING BTREE,
   CONSTRAINT `properties_publisher_id_foreign` FOREIGN KEY (`publisher_id`) REFERENCES `publisher` (`id`) ON DELETE RESTRICT ON UPDATE RESTRICT,
@@ -0,0 +1,183 @@
+"""
+Scraping por lote: varias búsquedas sobre un pool de workers, un único
+Browser (límite de tasa y sesión HTTP compartidos) y deduplicación de
+publicaciones por postingId entre todas las búsquedas del lote.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src import utils
+from src.db_writer import DEFAULT_WRITER_QUEUE_SIZE
+from src.scraper import Scraper
+
+DEFAULT_BATCH_WORKERS = 4
+
+
+class PostingRegistry:
+    """
+    Conjunto thread-safe de postingIds ya vistos en un lote
+
+    Una búsqueda reclama (claim) las publicaciones de cada página antes de
+    guardarla, así otra búsqueda del lote no guarda las mismas en paralelo.
+    Si la página no se llega a guardar, las libera (release) para que otra
+    búsqueda que las traiga pueda guardarlas.
+    """
+
+    def __init__(self):
+        self._seen = set()
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def claim(self, estates):
+        """
+        Registra las publicaciones de una página
+
+        Returns:
+            list: Solo las publicaciones que no se habían visto antes en el lote
+        """
+        new_estates = []
+        with self._lock:
+            for estate in estates:
+                if estate.posting_id in self._seen:
+                    self.duplicates += 1
+                    continue
+                self._seen.add(estate.posting_id)
+                new_estates.append(estate)
+        return new_estates
+
+    def release(self, estates):
+        """
+        Libera publicaciones reclamadas con claim que no se llegaron a guardar
+        """
+        with self._lock:
+            for estate in estates:
+                self._seen.discard(estate.posting_id)
+
+    def __len__(self):
+        return len(self._seen)
+
+
+class BatchScraper:
+    """
+    Ejecuta el scraping de varias URLs de ZonaProp en paralelo
+
+    Uso:
+        batch = BatchScraper(browser, urls, workers=4, session_factory=get_session)
+        result = batch.run(on_page=exporter.write_page)
+    """
+
+    def __init__(self, browser, urls, workers=DEFAULT_BATCH_WORKERS, session_factory=None,
+                 prepare_scraper=None, progress_callback=None, db_writer_queue_size=DEFAULT_WRITER_QUEUE_SIZE):
+        """
+        Args:
+            browser: Browser compartido por todas las búsquedas
+            urls: URLs de ZonaProp (las repetidas se scrapean una sola vez)
+            workers: Búsquedas scrapeadas en paralelo
+            session_factory: Si se indica, cada búsqueda guarda en BD con su
+                             propia sesión (las sesiones no son thread-safe)
+            prepare_scraper: Función opcional que recibe cada Scraper antes de
+                             empezar (checkpoints, instantáneas, etc.)
+            progress_callback: Opcional, recibe (pages_done, pages_total, listings_saved)
+                               sumados sobre todo el lote
+            db_writer_queue_size: Páginas en cola del DatabaseWriter de cada
+                                  búsqueda (0 = guardar en línea)
+        """
+        self.browser = browser
+        self.base_urls = list(dict.fromkeys(utils.parse_zonaprop_url(url) for url in urls))
+        self.workers = max(1, int(workers))
+        self.session_factory = session_factory
+        self.prepare_scraper = prepare_scraper
+        self.progress_callback = progress_callback
+        self.db_writer_queue_size = db_writer_queue_size
+        self.registry = PostingRegistry()
+        self._progress = {}  # {base_url: (pages_done, pages_total, listings_saved)}
+        self._lock = threading.Lock()
+
+    def report_progress(self, base_url, pages_done, pages_total, listings_saved):
+        with self._lock:
+            self._progress[base_url] = (pages_done, pages_total, listings_saved)
+            totals = [sum(values) for values in zip(*self._progress.values())]
+        if self.progress_callback:
+            self.progress_callback(*totals)
+
+    def scrap_url(self, base_url, on_page):
+        """
+        Scrapea una búsqueda del lote
+
+        Returns:
+            dict: Resultado de la búsqueda (páginas, publicaciones, nuevas,
+                  contadores de BD o error)
+        """
+        scraper = Scraper(self.browser, base_url)
+        scraper.posting_registry = self.registry
+        scraper.progress_callback = lambda *progress: self.report_progress(base_url, *progress)
+
+        db_session = self.session_factory() if self.session_factory else None
+        if db_session is not None:
+            scraper.enable_database_save(db_session, self.db_writer_queue_size)
+
+        result = {'url': base_url, 'pages': 0, 'count': 0, 'error': None}
+        try:
+            if self.prepare_scraper:
+                self.prepare_scraper(scraper)
+
+            for page_estates in scraper.iter_pages():
+                result['pages'] += 1
+                result['count'] += len(page_estates)
+                if on_page:
+                    with self._lock:
+                        on_page(page_estates)
+        except Exception as e:
+            print(f'[{base_url}] Error durante scraping: {e}')
+            result['error'] = str(e)
+        finally:
+            if db_session is not None:
+                db_session.close()
+
+        result['pages_unchanged'] = scraper.pages_unchanged
+        result['db_stats'] = scraper.save_stats.as_dict() if scraper.save_stats else None
+        return result
+
+    def run(self, on_page=None):
+        """
+        Scrapea todas las búsquedas del lote
+
+        Args:
+            on_page: Función opcional que recibe las publicaciones nuevas de
+                     cada página (se llama de a una, p. ej. para exportar)
+
+        Returns:
+            dict: Resultados por búsqueda y totales del lote (publicaciones
+                  únicas, duplicadas y throughput)
+        """
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(lambda base_url: self.scrap_url(base_url, on_page), self.base_urls))
+        elapsed = time.monotonic() - start
+
+        pages = sum(result['pages'] + result['pages_unchanged'] for result in results)
+        listings = len(self.registry) + self.registry.duplicates
+        db_stats = None
+        if self.session_factory:
+            from src.database import SaveStats
+            total_stats = SaveStats()
+            for result in results:
+                if result['db_stats']:
+                    total_stats.add(SaveStats.from_dict(result['db_stats']))
+            db_stats = total_stats.as_dict()
+
+        return {
+            'urls': results,
+            'count': sum(result['count'] for result in results),
+            'duplicates': self.registry.duplicates,
+            'failed_urls': sum(1 for result in results if result['error']),
+            'db_stats': db_stats,
+            'throughput': {
+                'elapsed_seconds': round(elapsed, 3),
+                'pages': pages,
+                'listings': listings,
+                'pages_per_second': round(pages / elapsed, 3) if elapsed else None,
+                'listings_per_second': round(listings / elapsed, 3) if elapsed else None
+            }
+        }
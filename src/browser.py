@@ -1,16 +1,223 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
 import cloudscraper
+import requests
+
+from src.metrics import metrics
+from src.throttle import RateLimiter
+
+# Equivalente al time.sleep(3) que se hacía entre páginas
+DEFAULT_REQUESTS_PER_SECOND = 1 / 3
+DEFAULT_TIMEOUT = 30  # segundos por request
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF_BASE = 2.0  # segundos, se duplica en cada reintento
+DEFAULT_BACKOFF_MAX = 60.0
+
+# Respuestas que indican que hay que bajar la tasa de requests
+THROTTLE_STATUSES = (429, 503)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class BrowserError(Exception):
+    """
+    Error al descargar una URL tras agotar los reintentos
+    """
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def parse_retry_after(value):
+    """
+    Interpreta el header Retry-After (segundos o fecha HTTP)
+
+    Returns:
+        float: Segundos a esperar, o None si no se pudo interpretar
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
 
 
 class Browser():
-    def __init__(self):
-        self.scraper = cloudscraper.create_scraper()
+    """
+    Cliente HTTP con política de requests: límite de tasa adaptativo,
+    timeout por request y reintentos con backoff exponencial acotado y
+    jitter. Una misma instancia se comparte entre todos los threads.
+    """
+
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, timeout=DEFAULT_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_max=DEFAULT_BACKOFF_MAX, session=None, cache=None, cache_only=False):
+        """
+        Args:
+            requests_per_second: Tasa máxima de requests (None desactiva el límite)
+            timeout: Timeout de cada request en segundos
+            max_retries: Reintentos ante timeouts, errores de conexión y 429/5xx
+            backoff_base: Espera antes del primer reintento (se duplica en cada uno)
+            backoff_max: Espera máxima entre reintentos
+            session: Sesión de cloudscraper a usar (p. ej. de un SessionPool).
+                     Si no se indica, se crea una nueva
+            cache: ResponseCache para get_text (None desactiva el cache)
+            cache_only: Si es True no se accede a la red: solo se sirven
+                        respuestas del cache (replay de un job)
+        """
+        self.scraper = session or cloudscraper.create_scraper()
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self.cache_only = cache_only
+        # Contadores de este browser (el job que lo usa); también van al registro de métricas
+        self.requests = 0
+        self.retries = 0
+        self.bytes_downloaded = 0
+        self._stats_lock = threading.Lock()
+
+    def count(self, requests=0, retries=0, bytes_downloaded=0):
+        with self._stats_lock:
+            self.requests += requests
+            self.retries += retries
+            self.bytes_downloaded += bytes_downloaded
+        if requests:
+            metrics.inc('zonaprop_http_requests_total', requests)
+        if retries:
+            metrics.inc('zonaprop_http_retries_total', retries)
+        if bytes_downloaded:
+            metrics.inc('zonaprop_http_bytes_downloaded_total', bytes_downloaded)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Requests hechos, reintentos y bytes descargados
+        """
+        with self._stats_lock:
+            return {
+                'http_requests': self.requests,
+                'http_retries': self.retries,
+                'bytes_downloaded': self.bytes_downloaded,
+            }
 
-    def get(self, url):
-        return self.scraper.get(url)
+    def get_backoff(self, attempt, retry_after=None):
+        """
+        Espera antes del reintento número attempt (desde 0): exponencial
+        acotada con jitter completo, y nunca menor al Retry-After
+        """
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(backoff, retry_after or 0)
+
+    def get(self, url, headers=None):
+        """
+        GET con límite de tasa, timeout y reintentos
+
+        Returns:
+            Response: Respuesta exitosa (2xx/3xx)
+
+        Raises:
+            BrowserError: Si la respuesta es un error no reintentable o se
+                          agotaron los reintentos
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait()
+            retry_after = None
+
+            try:
+                response = self.scraper.get(url, headers=headers, timeout=self.timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                self.count(requests=1)
+                error = BrowserError(f'Error de red en {url}: {e}')
+            else:
+                self.count(requests=1, bytes_downloaded=len(response.content))
+                if response.status_code < 400:
+                    self.rate_limiter.reward()
+                    return response
+
+                error = BrowserError(f'HTTP {response.status_code} en {url}', response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+
+                if response.status_code in THROTTLE_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    self.rate_limiter.penalize(retry_after)
+
+            if attempt == self.max_retries:
+                break
+
+            backoff = self.get_backoff(attempt, retry_after)
+            self.count(retries=1)
+            print(f'{error}. Reintento {attempt + 1}/{self.max_retries} en {backoff:.1f}s')
+            time.sleep(backoff)
+
+        raise error
+
+    def get_conditional(self, url, etag=None, last_modified=None):
+        """
+        GET condicional con If-None-Match / If-Modified-Since. Igual que
+        get_text, sirve la respuesta del cache si está (con los validadores
+        con los que se guardó) y en modo solo cache no accede a la red
+
+        Returns:
+            tuple: (texto, etag, last_modified). El texto es None si el
+                   servidor respondió 304 (sin cambios desde la última vez)
+        """
+        if self.cache is not None:
+            entry = self.cache.get_entry(url)
+            if entry is not None:
+                return entry
+            if self.cache_only:
+                raise BrowserError(f'{url} no está en el cache (modo solo cache)')
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        response = self.get(url, headers=headers or None)
+        if response.status_code == 304:
+            return None, etag, last_modified
+
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        if self.cache is not None:
+            self.cache.set(url, response.text, etag, last_modified)
+        return response.text, etag, last_modified
 
     def post(self, url, data):
-        return self.scraper.post(url, data)
+        return self.scraper.post(url, data, timeout=self.timeout)
 
     def get_text(self, url):
-        return self.scraper.get(url).text
+        """
+        Texto de la respuesta, desde el cache si está habilitado y la URL
+        está guardada (sin consumir turnos del límite de tasa)
+        """
+        if self.cache is None:
+            return self.get(url).text
+
+        text = self.cache.get(url)
+        if text is not None:
+            return text
+        if self.cache_only:
+            raise BrowserError(f'{url} no está en el cache (modo solo cache)')
 
+        text = self.get(url).text
+        self.cache.set(url, text)
+        return text
@@ -0,0 +1,289 @@
+"""
+Checkpoints de scraping persistidos en SQLite
+
+Registran, por URL de búsqueda y job, las páginas ya procesadas y el último
+paging.total visto, para que un scraping interrumpido (bloqueo, timeout,
+reinicio) pueda continuar desde la primera página sin terminar.
+
+Guardan además una instantánea de cada página de resultados: los postingId
+vistos con su huella de contenido (content_hash) y los headers
+ETag/Last-Modified de la respuesta. En un re-scrape incremental permiten
+pedir la página de forma condicional y detectar páginas sin publicaciones
+nuevas ni modificadas.
+
+El dueño de un checkpoint registra un latido (heartbeat_at, ver
+src/heartbeat.py) mientras corre, así otra ejecución puede saber si ese
+scraping sigue vivo antes de reanudarlo.
+"""
+import json
+import time
+from datetime import datetime
+
+from src.heartbeat import DEFAULT_HEARTBEAT_TIMEOUT, is_stale
+from src.sqlite_store import SQLiteStore
+
+CREATE_CHECKPOINTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    base_url TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    output_file TEXT,
+    total INTEGER,
+    pages_total INTEGER,
+    finished INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    heartbeat_at REAL,
+    PRIMARY KEY (base_url, job_id)
+)
+"""
+
+CREATE_CHECKPOINT_PAGES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS checkpoint_pages (
+    base_url TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    estates INTEGER NOT NULL,
+    completed_at TEXT NOT NULL,
+    PRIMARY KEY (base_url, job_id, page)
+)
+"""
+
+CREATE_PAGE_SNAPSHOTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS page_snapshots (
+    base_url TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    postings TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (base_url, page)
+)
+"""
+
+
+class CheckpointStore(SQLiteStore):
+    """
+    Registro de checkpoints e instantáneas de páginas en SQLite
+    """
+
+    TABLES = (CREATE_CHECKPOINTS_TABLE_SQL, CREATE_CHECKPOINT_PAGES_TABLE_SQL, CREATE_PAGE_SNAPSHOTS_TABLE_SQL)
+    MIGRATION_COLUMNS = {
+        'checkpoints': {
+            'heartbeat_at': 'REAL',
+        },
+    }
+
+    def create(self, base_url, job_id, output_file=None):
+        """
+        Crea el checkpoint de un job (o lo reinicia si ya existía)
+
+        Returns:
+            dict: Checkpoint creado
+        """
+        now = datetime.now().isoformat()
+        with self._connect() as connection:
+            connection.execute(
+                'DELETE FROM checkpoint_pages WHERE base_url = ? AND job_id = ?', (base_url, job_id)
+            )
+            connection.execute(
+                'INSERT OR REPLACE INTO checkpoints '
+                '(base_url, job_id, output_file, created_at, updated_at, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (base_url, job_id, output_file, now, now, time.time())
+            )
+        return self.get(base_url, job_id)
+
+    def update_total(self, base_url, job_id, total, pages_total):
+        """
+        Registra el último paging.total visto y la cantidad de páginas
+        """
+        with self._connect() as connection:
+            connection.execute(
+                'UPDATE checkpoints SET total = ?, pages_total = ?, updated_at = ? '
+                'WHERE base_url = ? AND job_id = ?',
+                (total, pages_total, datetime.now().isoformat(), base_url, job_id)
+            )
+
+    def mark_page_done(self, base_url, job_id, page, estates):
+        """
+        Marca una página como procesada (guardada en BD y exportada)
+
+        Args:
+            page: Número de página
+            estates: Cantidad de propiedades de la página
+        """
+        now = datetime.now().isoformat()
+        with self._transaction() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO checkpoint_pages (base_url, job_id, page, estates, completed_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (base_url, job_id, page, estates, now)
+            )
+            connection.execute(
+                'UPDATE checkpoints SET updated_at = ? WHERE base_url = ? AND job_id = ?',
+                (now, base_url, job_id)
+            )
+
+    def finish(self, base_url, job_id):
+        """
+        Marca el checkpoint como terminado: ya no se ofrece para reanudar
+        """
+        with self._connect() as connection:
+            connection.execute(
+                'UPDATE checkpoints SET finished = 1, updated_at = ? WHERE base_url = ? AND job_id = ?',
+                (datetime.now().isoformat(), base_url, job_id)
+            )
+
+    def heartbeat(self, base_url, job_id):
+        """
+        Registra un latido del dueño del checkpoint
+        """
+        with self._connect() as connection:
+            connection.execute(
+                'UPDATE checkpoints SET heartbeat_at = ? WHERE base_url = ? AND job_id = ?',
+                (time.time(), base_url, job_id)
+            )
+
+    def is_stale(self, base_url, job_id, timeout=DEFAULT_HEARTBEAT_TIMEOUT):
+        """
+        Indica si el dueño de un checkpoint dejó de latir (o nunca lo hizo)
+
+        Args:
+            timeout: Segundos sin latido tras los que el dueño se da por caído
+
+        Returns:
+            bool: True si pasaron más de timeout segundos desde el último
+                  latido o si el checkpoint no existe
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT heartbeat_at FROM checkpoints WHERE base_url = ? AND job_id = ?', (base_url, job_id)
+            ).fetchone()
+        return is_stale(row['heartbeat_at'] if row else None, timeout)
+
+    def completed_pages(self, base_url, job_id):
+        """
+        Returns:
+            dict: {número de página: cantidad de propiedades} de las páginas procesadas
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT page, estates FROM checkpoint_pages WHERE base_url = ? AND job_id = ?',
+                (base_url, job_id)
+            ).fetchall()
+        return {row['page']: row['estates'] for row in rows}
+
+    def get(self, base_url, job_id):
+        """
+        Returns:
+            dict: Checkpoint con sus páginas procesadas, o None si no existe
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT * FROM checkpoints WHERE base_url = ? AND job_id = ?', (base_url, job_id)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def find_resumable(self, base_url, job_id=None, is_abandoned=None):
+        """
+        Busca un checkpoint sin terminar para reanudar: el del job indicado
+        si existe, o si no el más reciente de la misma URL de búsqueda cuyo
+        job ya no lo usa. Un checkpoint de otro job pasa a ser de job_id,
+        así dos jobs no pueden reanudar el mismo
+
+        Args:
+            base_url: URL de búsqueda
+            job_id: ID del job que reanuda
+            is_abandoned: Función que recibe el ID del job dueño de un
+                          checkpoint y devuelve True si ese job terminó, falló
+                          o quedó huérfano. Sin ella solo se reanuda el
+                          checkpoint de job_id
+
+        Returns:
+            dict: Checkpoint a reanudar, o None si no hay ninguno. Si era de
+                  otro job, 'resumed_from' tiene el ID de ese job
+        """
+        if job_id:
+            checkpoint = self.get(base_url, job_id)
+            if checkpoint and not checkpoint['finished']:
+                return checkpoint
+
+        if not job_id or is_abandoned is None:
+            return None
+
+        with self._transaction() as connection:
+            rows = connection.execute(
+                'SELECT job_id FROM checkpoints WHERE base_url = ? AND finished = 0 AND job_id != ? '
+                'ORDER BY updated_at DESC',
+                (base_url, job_id)
+            ).fetchall()
+            owner = next((row['job_id'] for row in rows if is_abandoned(row['job_id'])), None)
+
+            if owner is not None:
+                for table in ('checkpoints', 'checkpoint_pages'):
+                    connection.execute(
+                        f'UPDATE {table} SET job_id = ? WHERE base_url = ? AND job_id = ?',
+                        (job_id, base_url, owner)
+                    )
+                # Late por el nuevo dueño: otra ejecución no lo toma antes de su primer latido
+                connection.execute(
+                    'UPDATE checkpoints SET heartbeat_at = ? WHERE base_url = ? AND job_id = ?',
+                    (time.time(), base_url, job_id)
+                )
+
+        if owner is None:
+            return None
+
+        checkpoint = self.get(base_url, job_id)
+        checkpoint['resumed_from'] = owner
+        return checkpoint
+
+    def load_snapshots(self, base_url):
+        """
+        Returns:
+            dict: Instantáneas de las páginas de la búsqueda:
+                  {número de página: {'postings': {postingId: content_hash},
+                   'etag': str, 'last_modified': str}}
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT page, postings, etag, last_modified FROM page_snapshots WHERE base_url = ?', (base_url,)
+            ).fetchall()
+        return {
+            row['page']: {
+                'postings': json.loads(row['postings']),
+                'etag': row['etag'],
+                'last_modified': row['last_modified']
+            }
+            for row in rows
+        }
+
+    def save_snapshot(self, base_url, page, postings, etag=None, last_modified=None):
+        """
+        Guarda la instantánea de una página
+
+        Args:
+            postings: {postingId: content_hash} de las publicaciones de la página
+            etag: Header ETag de la respuesta
+            last_modified: Header Last-Modified de la respuesta
+        """
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO page_snapshots (base_url, page, postings, etag, last_modified, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (base_url, page, json.dumps(postings), etag, last_modified, datetime.now().isoformat())
+            )
+
+    def _to_dict(self, row):
+        return {
+            'base_url': row['base_url'],
+            'job_id': row['job_id'],
+            'output_file': row['output_file'],
+            'total': row['total'],
+            'pages_total': row['pages_total'],
+            'finished': bool(row['finished']),
+            'resumed_from': None,
+            'completed_pages': self.completed_pages(row['base_url'], row['job_id']),
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'heartbeat_at': row['heartbeat_at']
+        }
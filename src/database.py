@@ -1,7 +1,11 @@
 import os
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, select, delete, insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import scoped_session, sessionmaker
 from src.models import Base, SourceData, Publisher, Property, Image
 from datetime import datetime
 
@@ -18,16 +22,248 @@ DB_PASSWORD = os.getenv('DB_PASSWORD', 'root')
 # Crear la URL de conexión
 DATABASE_URL = f"mysql+pymysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_DATABASE}?charset=utf8mb4"
 
-# Crear engine y session
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Pool de conexiones por proceso. Conexiones abiertas como máximo por proceso:
+# DB_POOL_SIZE + DB_MAX_OVERFLOW (multiplicar por los workers de Gunicorn y
+# comparar con max_connections de MySQL)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))  # segundos esperando una conexión libre
+# Reciclar las conexiones antes del wait_timeout de MySQL (default del servidor: 8 horas)
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # segundos
+# Verificar la conexión al tomarla del pool (descarta las que cerró el servidor)
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+ENGINE_OPTIONS = {
+    'echo': False,
+    'pool_size': DB_POOL_SIZE,
+    'max_overflow': DB_MAX_OVERFLOW,
+    'pool_timeout': DB_POOL_TIMEOUT,
+    'pool_recycle': DB_POOL_RECYCLE,
+    'pool_pre_ping': DB_POOL_PRE_PING,
+}
+
+# Sesiones sin engine fijo: get_engine() le asigna el del proceso al crearlo
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# Una sesión por thread (cada job y cada búsqueda de un lote corre en su propio thread)
+ScopedSession = scoped_session(SessionLocal)
+
+# El engine se crea en el primer uso, no al importar: los workers de Gunicorn
+# (o cualquier fork) no heredan conexiones abiertas del proceso padre
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Engine del proceso actual, creado en el primer uso
+
+    Returns:
+        Engine: Engine de SQLAlchemy con el pool configurado por DB_POOL_*
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(DATABASE_URL, **ENGINE_OPTIONS)
+                SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def _reset_after_fork():
+    """
+    En el proceso hijo de un fork: descarta el pool heredado sin cerrar sus
+    conexiones (siguen siendo del padre) y las sesiones del thread que hizo
+    el fork. El hijo abre conexiones propias en el primer uso.
+    """
+    global _engine_lock
+    _engine_lock = threading.Lock()
+    if _engine is not None:
+        _engine.dispose(close=False)
+    ScopedSession.registry.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def dispose_engine():
+    """
+    Cierra todas las conexiones del pool del proceso (p. ej. al terminar)
+    """
+    if _engine is not None:
+        _engine.dispose()
+
+
+def pool_stats():
+    """
+    Estado del pool de conexiones del proceso
+
+    Returns:
+        dict: Conexiones del pool, en uso, de overflow y tamaño configurado
+    """
+    if _engine is None:
+        return {'size': DB_POOL_SIZE, 'checked_in': 0, 'checked_out': 0, 'overflow': 0}
+    pool = _engine.pool
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+    }
+
+# Cantidad de propiedades por transacción en save_page_to_db
+DEFAULT_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', '100'))
+
+# Columnas que se actualizan cuando una propiedad ya existe
+PROPERTY_UPDATE_COLUMNS = (
+    'updated_at', 'sell_price', 'rent_price', 'sell_currency', 'rent_currency',
+    'expenses', 'expenses_currency', 'title', 'description', 'url', 'content_hash'
+)
+PUBLISHER_UPDATE_COLUMNS = ('name', 'url', 'logo_url', 'phone')
+
+
+class SaveStats:
+    """
+    Contadores de escritura en BD de un job
+    """
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+
+    @property
+    def saved(self):
+        """Propiedades persistidas o confirmadas como sin cambios"""
+        return self.inserted + self.updated + self.unchanged
+
+    def add(self, other):
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        self.failed += other.failed
+        return self
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for key, value in data.items():
+            setattr(stats, key, value)
+        return stats
+
+    def as_dict(self):
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'failed': self.failed
+        }
+
+    def __repr__(self):
+        return f"<SaveStats({self.as_dict()})>"
+
+
+class IdentityCache:
+    """
+    Cache en proceso de IDs que ya existen en la BD (fuentes y publishers)
+
+    Evicción LRU por cantidad de entradas y TTL opcional. Es thread-safe y
+    se comparte entre todas las páginas (y jobs) del proceso, de modo que
+    un ID conocido no cuesta ninguna consulta SQL.
+    """
+
+    def __init__(self, max_size=4096, ttl=None):
+        """
+        Args:
+            max_size: Cantidad máxima de entradas antes de desalojar la menos usada
+            ttl: Segundos de validez de cada entrada (None: sin vencimiento)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contains(self, kind, entity_id):
+        """
+        Indica si el ID está en cache (y lo cuenta como hit o miss)
+
+        Args:
+            kind: Tipo de entidad ('source', 'publisher')
+            entity_id: ID de la entidad
+        """
+        key = (kind, entity_id)
+        with self._lock:
+            stored_at = self._entries.get(key)
+            if stored_at is not None and self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                stored_at = None
+
+            if stored_at is None:
+                self.misses += 1
+                return False
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def add(self, kind, entity_id):
+        """
+        Registra un ID que ya está confirmado (commiteado) en la BD
+        """
+        key = (kind, entity_id)
+        with self._lock:
+            self._entries[key] = time.monotonic()
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: {'hits', 'misses', 'size'}
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+identity_cache = IdentityCache(
+    max_size=int(os.getenv('IDENTITY_CACHE_SIZE', '4096')),
+    ttl=float(os.getenv('IDENTITY_CACHE_TTL', '0')) or None
+)
 
 
 def get_session():
     """
-    Obtiene una nueva sesión de base de datos
+    Sesión de base de datos del thread actual (la misma en cada llamada
+    desde el mismo thread, hasta release_session)
+
+    Las conexiones se toman del pool solo mientras dura cada transacción,
+    así que una sesión abierta durante todo un job no retiene una conexión
+    (ni la deja vencer por el wait_timeout de MySQL) entre páginas.
+
+    Returns:
+        Session: Sesión de SQLAlchemy
+    """
+    get_engine()
+    return ScopedSession()
+
+
+def release_session():
+    """
+    Cierra la sesión del thread actual y la descarta, devolviendo su
+    conexión al pool. La próxima get_session() del thread crea una nueva.
     """
-    return SessionLocal()
+    ScopedSession.remove()
 
 
 def get_or_create_source(session, source_id=1, name='ZonaProp', portal_url='https://www.zonaprop.com.ar'):
@@ -118,139 +354,433 @@ def location_id_to_int(location_id_str):
     return abs(hash(location_id_str)) % (10 ** 8)
 
 
+def get_source_id(session, source_id=1):
+    """
+    Devuelve el ID de la fuente asegurando que exista, sin tocar la BD si
+    ya está en identity_cache
+
+    Args:
+        session: Sesión de SQLAlchemy
+        source_id: ID de la fuente (default: 1)
+
+    Returns:
+        int: ID de la fuente
+    """
+    if not identity_cache.contains('source', source_id):
+        get_or_create_source(session, source_id)
+        identity_cache.add('source', source_id)
+    return source_id
+
+
+def get_publisher_id(session, publisher_data):
+    """
+    Devuelve el ID del publisher asegurando que exista, sin tocar la BD si
+    ya está en identity_cache
+
+    Args:
+        session: Sesión de SQLAlchemy
+        publisher_data: Dict con datos del publisher
+
+    Returns:
+        int: ID del publisher
+    """
+    publisher_id = int(publisher_data.get('publisher_id') or 0)
+    if not identity_cache.contains('publisher', publisher_id):
+        publisher_id = get_or_create_publisher(session, publisher_data).id
+        identity_cache.add('publisher', publisher_id)
+    return publisher_id
+
+
+def build_publisher_values(estate_data):
+    """
+    Arma las columnas del publisher a partir de una propiedad parseada
+
+    Args:
+        estate_data: Estate con todos los datos de la propiedad
+
+    Returns:
+        dict: Valores de la tabla publisher
+    """
+    return {
+        'id': int(estate_data.publisher_id or 0),
+        'name': estate_data.publisher_name,
+        'url': estate_data.publisher_url,
+        'logo_url': estate_data.publisher_logo_url,
+        'phone': estate_data.publisher_phone,
+        'address': None
+    }
+
+
+def build_property_values(estate_data, source_id, publisher_id):
+    """
+    Arma las columnas de la tabla properties a partir de una propiedad parseada
+
+    Args:
+        estate_data: Estate con todos los datos de la propiedad
+        source_id: ID de la fuente de datos
+        publisher_id: ID del publisher
+
+    Returns:
+        dict: Valores de la tabla properties
+    """
+    return {
+        'publication_id': int(estate_data.posting_id),
+        'source_id': source_id,
+        'updated_at': datetime.now(),
+        'created_at': estate_data.created_at,
+        'sell_price': estate_data.sell_price,
+        'rent_price': estate_data.rent_price,
+        'sell_currency': estate_data.sell_currency,
+        'rent_currency': estate_data.rent_currency,
+        'expenses': estate_data.expenses_value,
+        'expenses_currency': estate_data.expenses_currency,
+        'publisher_id': publisher_id,
+        'location_id': location_id_to_int(estate_data.location_id_raw),
+        'location_description': estate_data.location[:255],
+        'garage_quantity': estate_data.cocheras if estate_data.cocheras else None,
+        'property_type': estate_data.property_type[:255],
+        'url': estate_data.url[:255],
+        'title': estate_data.title[:255],
+        'enviroments': estate_data.ambientes if estate_data.ambientes else None,
+        'bedrooms': estate_data.dormitorios if estate_data.dormitorios else None,
+        'bathrooms': estate_data.baños if estate_data.baños else None,
+        'antiquity': estate_data.antiguedad[:255] if estate_data.antiguedad else None,
+        'address': estate_data.address[:255],
+        'description': estate_data.description[:255],
+        'content_hash': estate_data.content_hash
+    }
+
+
+def build_estate_values(estate_data, source_id):
+    """
+    Convierte una propiedad a sus filas de publisher y properties,
+    validando los campos obligatorios
+
+    Args:
+        estate_data: Estate con todos los datos de la propiedad
+        source_id: ID de la fuente de datos
+
+    Returns:
+        tuple: (valores de publisher, valores de properties)
+
+    Raises:
+        ValueError, TypeError, AttributeError: Si la propiedad no tiene
+            posting_id o publisher_id válidos, o algún campo tiene un tipo
+            inesperado
+    """
+    publisher_values = build_publisher_values(estate_data)
+    if not publisher_values['id']:
+        raise ValueError('publisher_id is required')
+
+    property_values = build_property_values(estate_data, source_id, publisher_values['id'])
+    if not property_values['publication_id']:
+        raise ValueError('posting_id is required')
+    return publisher_values, property_values
+
+
 def save_property_to_db(session, estate_data):
     """
     Guarda una propiedad en la base de datos junto con sus imágenes
 
     Args:
         session: Sesión de SQLAlchemy
-        estate_data: Dict con todos los datos de la propiedad
+        estate_data: Estate con todos los datos de la propiedad
 
     Returns:
         Property: Objeto de la propiedad guardada
     """
     # Asegurar que existe la fuente de datos
-    source = get_or_create_source(session)
+    source_id = get_source_id(session)
 
     # Obtener o crear el publisher
     publisher_data = {
-        'publisher_id': estate_data.get('publisher_id'),
-        'name': estate_data.get('publisher_name'),
-        'url': estate_data.get('publisher_url'),
-        'logo_url': estate_data.get('publisher_logo_url'),
-        'phone': estate_data.get('publisher_phone'),
+        'publisher_id': estate_data.publisher_id,
+        'name': estate_data.publisher_name,
+        'url': estate_data.publisher_url,
+        'logo_url': estate_data.publisher_logo_url,
+        'phone': estate_data.publisher_phone,
         'address': None
     }
-    publisher = get_or_create_publisher(session, publisher_data)
-
-    # Convertir location_id a int
-    location_id = location_id_to_int(estate_data.get('location_id_raw', ''))
+    publisher_id = get_publisher_id(session, publisher_data)
 
     # Preparar datos de la propiedad
-    publication_id = int(estate_data.get('posting_id', 0))
+    publication_id = int(estate_data.posting_id)
 
     # Verificar si la propiedad ya existe
     existing_property = session.query(Property).filter_by(
         publication_id=publication_id,
-        source_id=source.id
+        source_id=source_id
     ).first()
 
+    if existing_property and existing_property.content_hash == estate_data.content_hash:
+        print(f"Propiedad {publication_id} sin cambios, se omite")
+        return existing_property
+
     if existing_property:
         print(f"Propiedad {publication_id} ya existe, actualizando...")
         # Actualizar campos
         existing_property.updated_at = datetime.now()
-        existing_property.sell_price = estate_data.get('sell_price')
-        existing_property.rent_price = estate_data.get('rent_price')
-        existing_property.sell_currency = estate_data.get('sell_currency')
-        existing_property.rent_currency = estate_data.get('rent_currency')
-        existing_property.expenses = estate_data.get('expenses_value')
-        existing_property.expenses_currency = estate_data.get('expenses_currency')
-        existing_property.title = estate_data.get('title', '')[:255]
-        existing_property.description = estate_data.get('description', '')[:255]
-        existing_property.url = estate_data.get('url', '')[:255]
+        existing_property.sell_price = estate_data.sell_price
+        existing_property.rent_price = estate_data.rent_price
+        existing_property.sell_currency = estate_data.sell_currency
+        existing_property.rent_currency = estate_data.rent_currency
+        existing_property.expenses = estate_data.expenses_value
+        existing_property.expenses_currency = estate_data.expenses_currency
+        existing_property.title = estate_data.title[:255]
+        existing_property.description = estate_data.description[:255]
+        existing_property.url = estate_data.url[:255]
+        existing_property.content_hash = estate_data.content_hash
 
         session.commit()
         property_obj = existing_property
     else:
         # Crear nueva propiedad
-        property_obj = Property(
-            publication_id=publication_id,
-            source_id=source.id,
-            updated_at=datetime.now(),
-            created_at=estate_data.get('created_at', str(datetime.now())),
-            sell_price=estate_data.get('sell_price'),
-            rent_price=estate_data.get('rent_price'),
-            sell_currency=estate_data.get('sell_currency'),
-            rent_currency=estate_data.get('rent_currency'),
-            expenses=estate_data.get('expenses_value'),
-            expenses_currency=estate_data.get('expenses_currency'),
-            publisher_id=publisher.id,
-            location_id=location_id,
-            location_description=estate_data.get('location', '')[:255],
-            garage_quantity=estate_data.get('cocheras') if estate_data.get('cocheras') else None,
-            property_type=estate_data.get('property_type', '')[:255],
-            url=estate_data.get('url', '')[:255],   
-            title=estate_data.get('title', '')[:255],
-            enviroments=estate_data.get('ambientes') if estate_data.get('ambientes') else None,
-            bedrooms=estate_data.get('dormitorios') if estate_data.get('dormitorios') else None,
-            bathrooms=estate_data.get('baños') if estate_data.get('baños') else None,
-            antiquity=estate_data.get('antiguedad', '')[:255] if estate_data.get('antiguedad') else None,
-            address=estate_data.get('address', '')[:255],
-            description=estate_data.get('description', '')[:255]
-        )
+        property_obj = Property(**build_property_values(estate_data, source_id, publisher_id))
 
         session.add(property_obj)
         session.commit()
         print(f"Propiedad guardada: {property_obj.title} (ID: {property_obj.id})")
 
     # Guardar imágenes
-    images_data = estate_data.get('images', [])
+    images_data = estate_data.images
     if images_data:
-        # Eliminar imágenes existentes si hay
-        session.query(Image).filter_by(
-            property_id=property_obj.id,
-            source_id=source.id
-        ).delete()
-
-        for img in images_data:
-            image = Image(
-                property_id=property_obj.id,
-                source_id=source.id,
-                image_url=img.get('url', '')[:255],
-                order=img.get('order')
-            )
-            session.add(image)
-
+        inserted, deleted = sync_images(session, source_id, {property_obj.id: images_data})
         session.commit()
-        print(f"{len(images_data)} imágenes guardadas para la propiedad {property_obj.id}")
+        print(f"Imágenes de la propiedad {property_obj.id}: {inserted} nuevas, {deleted} eliminadas")
 
     return property_obj
 
 
+def sync_images(session, source_id, images_by_property):
+    """
+    Sincroniza las imágenes guardadas con las scrapeadas comparando
+    conjuntos de (url, order): inserta solo las nuevas y borra solo las
+    que ya no están. Todas las escrituras van en un DELETE y un INSERT
+    multi-fila, sin importar la cantidad de propiedades. No hace commit.
+
+    Args:
+        session: Sesión de SQLAlchemy
+        source_id: ID de la fuente de datos
+        images_by_property: Dict {property_id: lista de EstateImage scrapeadas}
+
+    Returns:
+        tuple: (imágenes insertadas, imágenes eliminadas)
+    """
+    if not images_by_property:
+        return 0, 0
+
+    scraped = {
+        property_id: {(image.url[:255], image.order) for image in images_data}
+        for property_id, images_data in images_by_property.items()
+    }
+
+    stored_rows = session.execute(
+        select(Image.id, Image.property_id, Image.image_url, Image.order).where(
+            Image.source_id == source_id,
+            Image.property_id.in_(scraped.keys())
+        )
+    ).all()
+
+    # Filas a borrar: las que ya no se scrapean y los duplicados
+    ids_to_delete = []
+    stored = {property_id: set() for property_id in scraped}
+    for image_id, property_id, image_url, order in stored_rows:
+        key = (image_url, order)
+        if key in scraped[property_id] and key not in stored[property_id]:
+            stored[property_id].add(key)
+        else:
+            ids_to_delete.append(image_id)
+
+    rows_to_insert = [
+        {'property_id': property_id, 'source_id': source_id, 'image_url': image_url, 'order': order}
+        for property_id, images in scraped.items()
+        for image_url, order in sorted(images - stored[property_id], key=lambda image: image[1] or 0)
+    ]
+
+    if ids_to_delete:
+        session.execute(delete(Image).where(Image.id.in_(ids_to_delete)))
+    if rows_to_insert:
+        session.execute(insert(Image).values(rows_to_insert))
+
+    return len(rows_to_insert), len(ids_to_delete)
+
+
+def upsert_statement(model, rows, update_columns):
+    """
+    Arma un INSERT multi-fila con ON DUPLICATE KEY UPDATE
+
+    Args:
+        model: Modelo SQLAlchemy destino
+        rows: Lista de dicts con los valores a insertar
+        update_columns: Columnas a actualizar si la fila ya existe
+
+    Returns:
+        Insert: Statement listo para session.execute
+    """
+    statement = mysql_insert(model).values(rows)
+    return statement.on_duplicate_key_update(
+        {column: statement.inserted[column] for column in update_columns}
+    )
+
+
+def save_batch_to_db(session, estates_data):
+    """
+    Guarda un lote de propiedades en una sola transacción: un upsert
+    multi-fila para publishers, otro para propiedades y la sincronización
+    de imágenes del lote completo. Hace un único commit.
+
+    Las propiedades cuya huella (content_hash) coincide con la guardada
+    no se escriben: ni la fila, ni updated_at, ni sus imágenes.
+
+    Args:
+        session: Sesión de SQLAlchemy
+        estates_data: Lista de Estate con datos de propiedades
+
+    Returns:
+        SaveStats: Propiedades insertadas, actualizadas, sin cambios y fallidas
+    """
+    stats = SaveStats()
+    source_id = get_source_id(session)
+
+    # Cada fila se convierte antes del upsert: una propiedad mal formada (sin
+    # publisher, que es FK obligatoria, o con IDs no numéricos) se descarta
+    # sola, sin hacer fallar el resto del lote
+    estates = {}
+    for estate in estates_data:
+        try:
+            publisher_values, property_values = build_estate_values(estate, source_id)
+        except (ValueError, TypeError, AttributeError) as e:
+            stats.failed += 1
+            print(f"Error guardando propiedad {getattr(estate, 'posting_id', None)}: {e}")
+            continue
+        # Si una publicación se repite en el lote gana la última
+        estates[property_values['publication_id']] = (estate, publisher_values, property_values)
+
+    if not estates:
+        return stats
+
+    # Huellas guardadas, cargadas en bloque para todo el lote
+    stored = {
+        publication_id: (property_id, content_hash)
+        for publication_id, property_id, content_hash in session.execute(
+            select(Property.publication_id, Property.id, Property.content_hash).where(
+                Property.source_id == source_id,
+                Property.publication_id.in_(estates.keys())
+            )
+        ).all()
+    }
+
+    changed = {}
+    for publication_id, (estate, publisher_values, property_values) in estates.items():
+        if publication_id not in stored:
+            stats.inserted += 1
+        elif stored[publication_id][1] != estate.content_hash:
+            stats.updated += 1
+        else:
+            stats.unchanged += 1
+            continue
+        changed[publication_id] = (estate, publisher_values, property_values)
+
+    if not changed:
+        # Termina la transacción de lectura (no hay nada que confirmar): la
+        # conexión vuelve al pool en vez de quedar retenida hasta la próxima página
+        session.rollback()
+        return stats
+
+    # Publishers nuevos (deduplicados dentro del lote, los conocidos no cuestan SQL)
+    publishers = {}
+    for _, publisher_values, _ in changed.values():
+        if publisher_values['id'] not in publishers and not identity_cache.contains('publisher', publisher_values['id']):
+            publishers[publisher_values['id']] = publisher_values
+    if publishers:
+        session.execute(upsert_statement(Publisher, list(publishers.values()), PUBLISHER_UPDATE_COLUMNS))
+
+    properties = [property_values for _, _, property_values in changed.values()]
+    session.execute(upsert_statement(Property, properties, PROPERTY_UPDATE_COLUMNS))
+
+    # IDs internos (necesarios para las imágenes): los nuevos se consultan tras el insert
+    property_ids = {publication_id: values[0] for publication_id, values in stored.items()}
+    new_with_images = [
+        publication_id for publication_id, (estate, _, _) in changed.items()
+        if publication_id not in property_ids and estate.images
+    ]
+    if new_with_images:
+        property_ids.update(session.execute(
+            select(Property.publication_id, Property.id).where(
+                Property.source_id == source_id,
+                Property.publication_id.in_(new_with_images)
+            )
+        ).all())
+
+    # Imágenes (solo de las propiedades que traen fotos en el scrape)
+    images_by_property = {
+        property_ids[publication_id]: estate.images
+        for publication_id, (estate, _, _) in changed.items() if estate.images
+    }
+    sync_images(session, source_id, images_by_property)
+
+    session.commit()
+
+    # Solo se cachean IDs confirmados: si el lote hace rollback no quedan en cache
+    for publisher_id in publishers:
+        identity_cache.add('publisher', publisher_id)
+
+    return stats
+
+
+def save_page_to_db(session, estates_data, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Guarda una página (o cualquier lista) de propiedades por lotes,
+    con una transacción por lote
+
+    Las propiedades mal formadas se descartan y cuentan como fallidas, pero
+    si falla la escritura de un lote (conexión perdida, deadlock, etc.) se
+    hace rollback y la excepción se propaga: quien guarda la página no debe
+    darla por guardada (ni marcarla en el checkpoint). Los lotes anteriores
+    ya confirmados quedan guardados; volver a guardarlos es un upsert.
+
+    Args:
+        session: Sesión de SQLAlchemy
+        estates_data: Lista de Estate con datos de propiedades
+        batch_size: Cantidad de propiedades por transacción
+
+    Returns:
+        SaveStats: Propiedades insertadas, actualizadas, sin cambios y fallidas
+
+    Raises:
+        Exception: El error de la BD del lote que no se pudo guardar
+    """
+    stats = SaveStats()
+
+    for start in range(0, len(estates_data), batch_size):
+        batch = estates_data[start:start + batch_size]
+        try:
+            stats.add(save_batch_to_db(session, batch))
+        except Exception as e:
+            print(f"Error guardando lote de {len(batch)} propiedades: {e}")
+            session.rollback()
+            raise
+
+    return stats
+
+
 def save_estates_to_db(estates_data):
     """
     Guarda múltiples propiedades en la base de datos
 
     Args:
-        estates_data: Lista de dicts con datos de propiedades
+        estates_data: Lista de Estate con datos de propiedades
 
     Returns:
         int: Número de propiedades guardadas
     """
     session = get_session()
-    saved_count = 0
 
     try:
-        for estate in estates_data:
-            try:
-                save_property_to_db(session, estate)
-                saved_count += 1
-            except Exception as e:
-                print(f"Error guardando propiedad {estate.get('posting_id')}: {e}")
-                session.rollback()
-
-        print(f"\nTotal de propiedades guardadas en BD: {saved_count}")
-        return saved_count
+        stats = save_page_to_db(session, estates_data)
+
+        print(f"\nTotal de propiedades guardadas en BD: {stats.saved} {stats.as_dict()}")
+        return stats.saved
 
     finally:
         session.close()
@@ -0,0 +1,169 @@
+"""
+Escritura en BD en segundo plano (write-behind)
+
+Guardar cada página en el mismo thread que descarga frena el scraping
+mientras MySQL responde: la latencia de la BD se suma al tiempo del job.
+El DatabaseWriter recibe las páginas en una cola acotada y las guarda
+desde su propio thread, agrupando las páginas que esperan en la cola en
+transacciones de hasta DB_BATCH_SIZE propiedades, mientras el job sigue
+descargando, parseando y exportando. Si la BD no da abasto la cola se
+llena y submit bloquea al job (backpressure) en lugar de acumular páginas
+en memoria.
+"""
+import queue
+import threading
+import time
+
+DEFAULT_WRITER_QUEUE_SIZE = 8  # Páginas en espera de guardarse (0 = guardar en línea)
+POLL_INTERVAL = 0.1  # Segundos entre chequeos de error mientras se espera lugar en la cola
+
+_STOP = object()
+
+
+class DatabaseWriterError(Exception):
+    """
+    El thread escritor falló y dejó de guardar páginas
+    """
+
+
+class DatabaseWriter:
+    """
+    Thread escritor de propiedades en BD alimentado por una cola acotada
+
+    Las páginas se guardan en el orden en que se encolan, así que
+    pages_saved >= n indica que las primeras n páginas encoladas ya están
+    confirmadas en la BD.
+
+    Uso:
+        writer = DatabaseWriter(session).start()
+        writer.submit(page_estates)  # espera si la cola está llena
+        ...
+        writer.drain()  # espera a que se guarde todo lo encolado
+    """
+
+    def __init__(self, session, queue_size=DEFAULT_WRITER_QUEUE_SIZE, batch_size=None, stats=None,
+                 job_metrics=None):
+        """
+        Args:
+            session: Sesión de SQLAlchemy, usada solo desde el thread escritor
+                     mientras está corriendo
+            queue_size: Páginas en espera como máximo antes de bloquear submit
+            batch_size: Propiedades por transacción (default: DB_BATCH_SIZE)
+            stats: SaveStats donde acumular los contadores (default: uno nuevo)
+            job_metrics: JobMetrics opcional donde registrar cada escritura
+        """
+        from src.database import DEFAULT_BATCH_SIZE, SaveStats
+
+        self.session = session
+        self.batch_size = max(1, int(batch_size or DEFAULT_BATCH_SIZE))
+        self.stats = stats if stats is not None else SaveStats()
+        self.job_metrics = job_metrics
+        self.submitted = 0  # Páginas encoladas
+        self.pages_saved = 0  # Páginas guardadas (las primeras encoladas)
+        self.writes = 0  # Escrituras hechas (cada una agrupa una o más páginas)
+        self.error = None
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, estates):
+        """
+        Encola las propiedades de una página. Si la cola está llena espera
+        a que el writer libere lugar
+
+        Raises:
+            DatabaseWriterError: Si el thread escritor falló
+        """
+        while True:
+            self.raise_error()
+            try:
+                self._queue.put(estates, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        self.submitted += 1
+
+    def drain(self):
+        """
+        Espera a que se guarden todas las páginas encoladas y termina el thread
+
+        Returns:
+            SaveStats: Contadores de todo lo guardado
+
+        Raises:
+            DatabaseWriterError: Si el thread escritor falló
+        """
+        self.close()
+        self.raise_error()
+        return self.stats
+
+    def close(self):
+        """
+        Termina el thread después de guardar lo que ya estaba en la cola (sin
+        propagar errores del writer, para usar en un finally)
+        """
+        if self._thread is None:
+            return
+        while self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        self._thread.join()
+        self._thread = None
+
+    def raise_error(self):
+        if self.error is not None:
+            raise DatabaseWriterError(f'Falló la escritura en BD en segundo plano: {self.error}') from self.error
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            page = self._queue.get()
+            if page is _STOP:
+                break
+
+            # Agrupa las páginas que ya esperan en la cola, hasta completar un lote
+            pages = [page]
+            estates_count = len(page)
+            while estates_count < self.batch_size:
+                try:
+                    page = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if page is _STOP:
+                    stopping = True
+                    break
+                pages.append(page)
+                estates_count += len(page)
+
+            try:
+                self.write(pages)
+            except Exception as e:
+                print(f'Error en el writer de BD: {e}')
+                self.error = e
+                return
+
+    def write(self, pages):
+        """
+        Guarda juntas varias páginas, en transacciones de batch_size propiedades
+        """
+        from src.database import save_page_to_db
+
+        estates = [estate for page in pages for estate in page]
+        start = time.perf_counter()
+        batch_stats = save_page_to_db(self.session, estates, self.batch_size)
+        seconds = time.perf_counter() - start
+
+        self.stats.add(batch_stats)
+        self.writes += 1
+        self.pages_saved += len(pages)
+        print(f"[OK] {batch_stats.saved}/{len(estates)} propiedades guardadas en BD "
+              f"({len(pages)} páginas) {batch_stats.as_dict()}")
+        if self.job_metrics is not None:
+            self.job_metrics.record_db_write(seconds, batch_stats.inserted + batch_stats.updated)
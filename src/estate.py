@@ -0,0 +1,119 @@
+"""
+Registro compacto de una propiedad parseada
+
+Estate y EstateImage usan __slots__: sin un dict por instancia, cada
+propiedad en memoria ocupa una fracción de lo que ocupaba el dict de ~35
+claves (ver benchmarks/bench_estate_memory.py). La BD y los exportadores
+leen los atributos directamente; to_dict() queda para compatibilidad.
+"""
+
+# Campos en el orden de exportación (columnas del CSV)
+ESTATE_FIELDS = (
+    'posting_id',
+    'title',
+    'generated_title',
+    'url',
+    'sell_price',
+    'sell_currency',
+    'rent_price',
+    'rent_currency',
+    'price_value',
+    'price_currency',
+    'expenses_value',
+    'expenses_currency',
+    'superficie_total',
+    'superficie_cubierta',
+    'ambientes',
+    'dormitorios',
+    'baños',
+    'cocheras',
+    'antiguedad',
+    'publisher_name',
+    'publisher_id',
+    'publisher_url',
+    'publisher_logo_url',
+    'publisher_phone',
+    'address',
+    'location',
+    'location_id_raw',
+    'city',
+    'description',
+    'property_type',
+    'created_at',
+    'images',
+    'content_hash',
+)
+
+# Campos cuyo valor por defecto es None (el resto: '' o lista vacía)
+NULLABLE_FIELDS = frozenset(('sell_price', 'sell_currency', 'rent_price', 'rent_currency', 'content_hash'))
+
+
+class EstateImage:
+    """
+    Imagen de una propiedad
+    """
+    __slots__ = ('url', 'order')
+
+    def __init__(self, url='', order=0):
+        self.url = url
+        self.order = order
+
+    def to_dict(self):
+        return {'url': self.url, 'order': self.order}
+
+    def __eq__(self, other):
+        if not isinstance(other, EstateImage):
+            return NotImplemented
+        return self.url == other.url and self.order == other.order
+
+    def __repr__(self):
+        return f"<EstateImage(url={self.url!r}, order={self.order})>"
+
+
+class Estate:
+    """
+    Propiedad parseada de una publicación de ZonaProp
+
+    Uso:
+        estate = Estate(posting_id='123', title='Depto 2 amb')
+        estate.images.append(EstateImage('https://...', 0))
+    """
+    __slots__ = ESTATE_FIELDS
+
+    def __init__(self, **fields):
+        """
+        Args:
+            **fields: Valores iniciales (los campos no indicados quedan en
+                      '' o None, e images en una lista vacía)
+        """
+        for name in ESTATE_FIELDS:
+            if name in fields:
+                value = fields.pop(name)
+            elif name == 'images':
+                value = []
+            elif name in NULLABLE_FIELDS:
+                value = None
+            else:
+                value = ''
+            setattr(self, name, value)
+
+        if fields:
+            raise TypeError(f"Campos desconocidos para Estate: {', '.join(fields)}")
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: Propiedad como dict (mismo formato que antes de Estate,
+                  con las imágenes como dicts {'url', 'order'})
+        """
+        data = {name: getattr(self, name) for name in ESTATE_FIELDS}
+        data['images'] = [image.to_dict() for image in self.images]
+        return data
+
+    def __eq__(self, other):
+        if not isinstance(other, Estate):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in ESTATE_FIELDS)
+
+    def __repr__(self):
+        return f"<Estate(posting_id={self.posting_id!r}, title={self.title!r})>"
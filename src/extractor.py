@@ -0,0 +1,97 @@
+import json
+
+PRELOADED_STATE_MARKER = 'window.__PRELOADED_STATE__ = '
+SCRIPT_ID_ATTRIBUTES = ('id="preloadedData"', "id='preloadedData'")
+SCRIPT_END_TAG = '</script>'
+
+_decoder = json.JSONDecoder()
+
+
+def find_preloaded_json(page):
+    """
+    Ubica el JSON de window.__PRELOADED_STATE__ sin construir el árbol HTML
+
+    Busca el tag <script id="preloadedData"> y el marcador por búsqueda de
+    substrings, y devuelve el índice donde empieza el objeto JSON.
+
+    Args:
+        page: HTML de la página (str)
+
+    Returns:
+        tuple: (json_start, script_end), o None si no se encontró
+    """
+    for script_id in SCRIPT_ID_ATTRIBUTES:
+        tag_index = page.find(script_id)
+        if tag_index != -1:
+            break
+    else:
+        print("No se encontró el tag script con id='preloadedData'")
+        return None
+
+    script_end = page.find(SCRIPT_END_TAG, tag_index)
+    if script_end == -1:
+        script_end = len(page)
+
+    marker_index = page.find(PRELOADED_STATE_MARKER, tag_index, script_end)
+    if marker_index == -1:
+        print("No se encontró window.__PRELOADED_STATE__")
+        return None
+
+    return marker_index + len(PRELOADED_STATE_MARKER), script_end
+
+
+def has_preloaded_state(page):
+    """
+    Validador del cache de respuestas: solo se guardan las páginas con un
+    PRELOADED_STATE (no las de challenge o bloqueo, ni las cortadas)
+
+    Se llama en cada escritura del cache, así que es un chequeo barato por
+    substrings, sin decodificar el JSON (eso se hace al parsear la página):
+    el tag del script, el marcador seguido de un objeto y el </script> que
+    cierra el script (una respuesta cortada no lo tiene).
+    """
+    if isinstance(page, bytes):
+        page = page.decode('utf-8', errors='replace')
+
+    location = find_preloaded_json(page)
+    if location is None:
+        return False
+
+    json_start, script_end = location
+    return page.startswith(SCRIPT_END_TAG, script_end) and page[json_start:json_start + 64].lstrip().startswith('{')
+
+
+def extract_preloaded_state(page):
+    """
+    Extrae y decodifica el JSON de window.__PRELOADED_STATE__
+
+    El final del objeto lo determina json.JSONDecoder.raw_decode, que respeta
+    strings y escapes (llaves dentro de descripciones, comillas escapadas, etc.)
+    y decodifica directamente sobre el HTML, sin copiar el script.
+
+    Args:
+        page: HTML de la página (str o bytes UTF-8)
+
+    Returns:
+        dict: Estado de la página, o None si no se encontró
+    """
+    if isinstance(page, bytes):
+        page = page.decode('utf-8', errors='replace')
+
+    location = find_preloaded_json(page)
+    if location is None:
+        return None
+
+    json_start, script_end = location
+
+    try:
+        data, json_end = _decoder.raw_decode(page, json_start)
+    except json.JSONDecodeError as e:
+        print(f"Error al parsear JSON: {e}")
+        return None
+
+    if json_end > script_end:
+        print("No se pudo encontrar el final del JSON")
+        return None
+
+    return data
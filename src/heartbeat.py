@@ -0,0 +1,69 @@
+"""
+Latido (heartbeat) del proceso dueño de un scraping en curso
+
+Un job de la API o una ejecución del CLI registran cada cierto intervalo la
+hora de su último latido. Si el latido tiene más de `timeout` segundos, el
+dueño se da por caído. No se usa el PID: en contenedores cada arranque
+reutiliza los mismos PIDs, así que un PID "vivo" puede ser de otro proceso.
+"""
+import threading
+import time
+
+DEFAULT_HEARTBEAT_INTERVAL = 10  # Segundos entre latidos
+DEFAULT_HEARTBEAT_TIMEOUT = 60  # Segundos sin latido tras los que el dueño se da por caído
+
+
+def is_stale(heartbeat_at, timeout=DEFAULT_HEARTBEAT_TIMEOUT):
+    """
+    Args:
+        heartbeat_at: Último latido (segundos desde epoch, time.time()), o
+                      None si nunca se registró
+        timeout: Segundos sin latido tras los que el dueño se da por caído
+
+    Returns:
+        bool: True si el dueño dejó de latir
+    """
+    return heartbeat_at is None or time.time() - heartbeat_at > timeout
+
+
+class Heartbeat:
+    """
+    Thread que llama a beat() cada `interval` segundos hasta stop()
+
+    Uso:
+        heartbeat = Heartbeat(lambda: store.heartbeat(job_id)).start()
+        ...
+        heartbeat.stop()
+    """
+
+    def __init__(self, beat, interval=DEFAULT_HEARTBEAT_INTERVAL, name='heartbeat'):
+        """
+        Args:
+            beat: Función que registra el latido (y cualquier otra tarea periódica)
+            interval: Segundos entre latidos
+            name: Nombre del thread
+        """
+        self.beat = beat
+        self.interval = interval
+        self.name = name
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.beat()
+            except Exception as e:
+                # Un latido fallido (p. ej. SQLite bloqueado) se reintenta en el próximo
+                print(f'Error registrando el latido ({self.name}): {e}')
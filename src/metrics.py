@@ -0,0 +1,498 @@
+"""
+Instrumentación del scraping: tiempos por etapa, contadores y logs JSON
+
+Cada página registra cuánto tardó en cada etapa (descarga, extracción del
+PRELOADED_STATE, parseo, escritura en BD y exportación) y cada job suma sus
+páginas y los contadores de reintentos, bytes descargados y filas escritas.
+
+Los valores se acumulan en un MetricsRegistry por proceso. Con un
+MetricsStore configurado, cada proceso vuelca su acumulado a un archivo
+SQLite compartido, así que /metrics (formato de texto de Prometheus) suma
+todos los workers de Gunicorn aunque el request lo atienda uno solo.
+
+Los volcados hacen además de latido del proceso (ver src/heartbeat.py). Los
+contadores e histogramas de un proceso que dejó de latir, o cuyo PID ya usa
+otro proceso, se suman a una fila de procesos terminados; sus gauges se
+descartan, porque describen un estado que ya no existe.
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.heartbeat import DEFAULT_HEARTBEAT_TIMEOUT, Heartbeat, is_stale
+from src.sqlite_store import SQLiteStore
+
+# db_queue: espera del job por lugar en la cola del DatabaseWriter (backpressure);
+# db_write: tiempo de la BD (en el thread escritor si hay DatabaseWriter)
+STAGES = ('fetch', 'extract', 'parse', 'db_queue', 'db_write', 'export')
+
+# Buckets (segundos) de los histogramas de duración
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+JOB_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# Métricas conocidas: {nombre: (tipo, ayuda, buckets)}
+METRICS = {
+    'zonaprop_stage_duration_seconds': (HISTOGRAM, 'Duración de cada etapa por página', STAGE_BUCKETS),
+    'zonaprop_job_duration_seconds': (HISTOGRAM, 'Duración total de los jobs de scraping', JOB_BUCKETS),
+    'zonaprop_jobs_total': (COUNTER, 'Jobs de scraping terminados, por estado', None),
+    'zonaprop_jobs_running': (GAUGE, 'Jobs de scraping en curso', None),
+    'zonaprop_pages_total': (COUNTER, 'Páginas de resultados procesadas', None),
+    'zonaprop_listings_total': (COUNTER, 'Publicaciones parseadas', None),
+    'zonaprop_http_requests_total': (COUNTER, 'Requests HTTP a ZonaProp (sin contar el cache)', None),
+    'zonaprop_http_retries_total': (COUNTER, 'Reintentos de requests HTTP', None),
+    'zonaprop_http_bytes_downloaded_total': (COUNTER, 'Bytes descargados de ZonaProp', None),
+    'zonaprop_rows_written_total': (COUNTER, 'Filas escritas, por destino (db/export)', None),
+}
+
+GAUGES = tuple(name for name, (kind, _, _) in METRICS.items() if kind == GAUGE)
+
+DEFAULT_FLUSH_INTERVAL = 5.0  # segundos entre volcados al MetricsStore
+
+# pid de las filas con los contadores e histogramas de los procesos terminados
+RETIRED_PID = 0
+
+CREATE_METRICS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS metrics (
+    pid INTEGER NOT NULL,
+    sample TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    process TEXT,
+    updated_at REAL,
+    PRIMARY KEY (pid, sample, labels)
+)
+"""
+
+
+def format_labels(labels):
+    """
+    Etiquetas en formato Prometheus: {a="1",b="2"} (vacío si no hay)
+    """
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsStore(SQLiteStore):
+    """
+    Acumulados de métricas de cada proceso en SQLite
+
+    Cada volcado registra la hora (updated_at) y el proceso (process, un ID
+    único por arranque: los PIDs se reutilizan). Un proceso sin volcados por
+    heartbeat_timeout segundos se da por terminado.
+    """
+
+    TABLES = (CREATE_METRICS_TABLE_SQL,)
+    MIGRATION_COLUMNS = {
+        'metrics': {
+            'process': 'TEXT',
+            'updated_at': 'REAL',
+        },
+    }
+
+    def __init__(self, path, heartbeat_timeout=DEFAULT_HEARTBEAT_TIMEOUT):
+        """
+        Args:
+            path: Ruta del archivo SQLite
+            heartbeat_timeout: Segundos sin volcados tras los que un proceso
+                               se da por terminado (debe ser bastante mayor
+                               que el flush_interval de los registros)
+        """
+        self.heartbeat_timeout = heartbeat_timeout
+        super().__init__(path)
+
+    def save(self, pid, samples, process=None):
+        """
+        Reemplaza los acumulados del proceso pid y retira los de los procesos
+        terminados
+
+        Args:
+            samples: Lista de (nombre de la muestra, etiquetas, valor)
+            process: ID del arranque del proceso. Si el pid tiene filas de
+                     otro arranque, se retiran en lugar de pisarlas
+        """
+        now = time.time()
+        rows = [(pid, sample, json.dumps(labels), value, process, now) for sample, labels, value in samples]
+        with self._transaction() as connection:
+            owners = connection.execute(
+                'SELECT pid, process, MAX(updated_at) AS updated_at FROM metrics WHERE pid != ? '
+                'GROUP BY pid, process',
+                (RETIRED_PID,)
+            ).fetchall()
+            # Procesos terminados: dejaron de latir o su pid ya es de otro arranque
+            retired = [
+                owner['pid'] for owner in owners
+                if (owner['pid'] == pid and owner['process'] != process)
+                or (owner['pid'] != pid and is_stale(owner['updated_at'], self.heartbeat_timeout))
+            ]
+            if retired:
+                self._retire(connection, retired, now)
+
+            connection.execute('DELETE FROM metrics WHERE pid = ?', (pid,))
+            connection.executemany(
+                'INSERT INTO metrics (pid, sample, labels, value, process, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+    def _retire(self, connection, pids, now):
+        """
+        Suma los contadores e histogramas de los procesos pids a las filas de
+        RETIRED_PID y borra sus filas (los gauges se descartan)
+        """
+        placeholders = ', '.join('?' * len(pids))
+        totals = connection.execute(
+            f'SELECT sample, labels, SUM(value) FROM metrics WHERE pid IN ({placeholders}) '
+            f'GROUP BY sample, labels',
+            pids
+        ).fetchall()
+        connection.executemany(
+            'INSERT INTO metrics (pid, sample, labels, value, updated_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (pid, sample, labels) DO UPDATE SET value = value + excluded.value, '
+            'updated_at = excluded.updated_at',
+            [(RETIRED_PID, sample, labels, value, now) for sample, labels, value in totals if sample not in GAUGES]
+        )
+        connection.execute(f'DELETE FROM metrics WHERE pid IN ({placeholders})', pids)
+
+    def load(self):
+        """
+        Returns:
+            list: (nombre de la muestra, etiquetas, valor) sumados entre
+                  procesos. Los gauges son solo los de procesos vivos
+        """
+        placeholders = ', '.join('?' * len(GAUGES))
+        with self._connect() as connection:
+            rows = connection.execute(
+                f'SELECT sample, labels, SUM(value) FROM metrics '
+                f'WHERE sample NOT IN ({placeholders}) OR updated_at >= ? GROUP BY sample, labels',
+                GAUGES + (time.time() - self.heartbeat_timeout,)
+            ).fetchall()
+        return [(sample, tuple(tuple(label) for label in json.loads(labels)), value) for sample, labels, value in rows]
+
+
+class MetricsRegistry:
+    """
+    Contadores, gauges e histogramas del proceso (thread-safe)
+
+    Uso:
+        registry.inc('zonaprop_pages_total')
+        registry.add('zonaprop_jobs_running', -1)
+        registry.observe('zonaprop_stage_duration_seconds', 0.8, stage='fetch')
+        text = registry.render_all()
+    """
+
+    def __init__(self, store=None, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """
+        Args:
+            store: MetricsStore donde volcar los acumulados (None: solo en memoria)
+            flush_interval: Segundos mínimos entre volcados automáticos
+        """
+        self.store = store
+        self.flush_interval = flush_interval
+        self._counters = {}  # {(nombre, etiquetas): valor}
+        self._gauges = {}  # {(nombre, etiquetas): valor}
+        self._histograms = {}  # {(nombre, etiquetas): [conteos por bucket, suma, cantidad]}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._process = None  # (pid, ID del arranque)
+        self._heartbeat = None
+
+    def configure(self, store, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """
+        Configura el MetricsStore y vuelca los acumulados cada flush_interval
+        segundos desde un thread, así un proceso sin actividad sigue latiendo
+        """
+        self.store = store
+        self.flush_interval = flush_interval
+        if self._heartbeat is not None:
+            self._heartbeat.stop()
+        self._heartbeat = Heartbeat(self.flush, flush_interval, name='metrics-flush').start()
+
+    def process_id(self):
+        """
+        Returns:
+            str: ID único del arranque del proceso (se renueva en un fork)
+        """
+        pid = os.getpid()
+        if self._process is None or self._process[0] != pid:
+            self._process = (pid, uuid.uuid4().hex)
+        return self._process[1]
+
+    def _key(self, name, kind, labels):
+        if METRICS.get(name, (None,))[0] != kind:
+            raise ValueError(f'Métrica desconocida o de otro tipo: {name}')
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, COUNTER, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self.maybe_flush()
+
+    def add(self, name, value, **labels):
+        """
+        Suma value (positivo o negativo) a un gauge
+        """
+        key = self._key(name, GAUGE, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+        self.maybe_flush()
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, HISTOGRAM, labels)
+        buckets = METRICS[name][2]
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+        self.maybe_flush()
+
+    def samples(self):
+        """
+        Muestras del proceso en formato Prometheus (los buckets son acumulativos)
+
+        Returns:
+            list: (nombre de la muestra, etiquetas, valor)
+        """
+        with self._lock:
+            counters = list(self._counters.items()) + list(self._gauges.items())
+            histograms = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._histograms.items()]
+
+        samples = [(name, labels, value) for (name, labels), value in counters]
+        for (name, labels), (counts, total, count) in histograms:
+            for bound, bucket_count in zip(METRICS[name][2], counts):
+                samples.append((f'{name}_bucket', labels + (('le', format_value(bound)),), bucket_count))
+            samples.append((f'{name}_bucket', labels + (('le', '+Inf'),), count))
+            samples.append((f'{name}_sum', labels, total))
+            samples.append((f'{name}_count', labels, count))
+        return samples
+
+    def flush(self):
+        """
+        Vuelca los acumulados del proceso al MetricsStore, si hay uno
+        """
+        self._last_flush = time.monotonic()
+        if self.store is None:
+            return
+        try:
+            self.store.save(os.getpid(), self.samples(), self.process_id())
+        except sqlite3.Error as e:
+            print(f'Error guardando métricas: {e}')
+
+    def maybe_flush(self):
+        if self.store is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def render_all(self):
+        """
+        Texto para /metrics: los acumulados de todos los procesos si hay un
+        MetricsStore, o solo los de este proceso
+
+        Returns:
+            str: Exposición en formato de texto de Prometheus
+        """
+        if self.store is None:
+            return render(self.samples())
+        self.flush()
+        return render(self.store.load())
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+def render(samples):
+    """
+    Formato de texto de Prometheus (HELP/TYPE por métrica y una línea por muestra)
+    """
+    by_metric = {}
+    for sample, labels, value in samples:
+        metric = sample
+        for suffix in ('_bucket', '_sum', '_count'):
+            if sample.endswith(suffix) and sample[:-len(suffix)] in METRICS:
+                metric = sample[:-len(suffix)]
+        by_metric.setdefault(metric, []).append((sample, labels, value))
+
+    lines = []
+    for metric in sorted(by_metric):
+        kind, help_text, _ = METRICS.get(metric, ('untyped', '', None))
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for sample, labels, value in sorted(by_metric[metric], key=sample_sort_key):
+            lines.append(f'{sample}{format_labels(labels)} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def sample_sort_key(sample):
+    name, labels, _ = sample
+    # Buckets en orden de límite (+Inf al final), no alfabético
+    other_labels = tuple(label for label in labels if label[0] != 'le')
+    bound = dict(labels).get('le')
+    return name, other_labels, float('inf') if bound == '+Inf' else float(bound or 0)
+
+
+@contextmanager
+def timed(timings, stage):
+    """
+    Mide el bloque y suma su duración (segundos) a timings[stage]
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def set_json_logs(enabled):
+    global json_logs_enabled
+    json_logs_enabled = bool(enabled)
+
+
+def log_event(event, **fields):
+    """
+    Escribe un evento como una línea JSON en stdout
+
+    Se escribe con una sola llamada a write, así las líneas de distintos
+    threads o workers de Gunicorn no se mezclan entre sí.
+    """
+    if not json_logs_enabled:
+        return
+    record = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'event': event, 'pid': os.getpid()}
+    record.update(fields)
+    sys.stdout.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+    sys.stdout.flush()
+
+
+class JobMetrics:
+    """
+    Tiempos por etapa y contadores de un job. Un lote comparte una sola
+    instancia entre sus búsquedas, por eso es thread-safe.
+    """
+
+    def __init__(self, job_id=None, registry=None):
+        self.job_id = job_id
+        self.registry = registry or metrics
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.pages = 0
+        self.listings = 0
+        self.rows_written = {'db': 0, 'export': 0}
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self.registry.add('zonaprop_jobs_running', 1)
+
+    def record_page(self, url, page_number, timings, listings, rows_written=None):
+        """
+        Registra una página terminada
+
+        Args:
+            url: URL de la búsqueda
+            page_number: Número de página
+            timings: {etapa: segundos} de la página
+            listings: Publicaciones parseadas de la página
+            rows_written: {destino: filas} escritas para la página
+        """
+        rows_written = rows_written or {}
+        with self._lock:
+            self.pages += 1
+            self.listings += listings
+            for stage, seconds in timings.items():
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            for target, rows in rows_written.items():
+                self.rows_written[target] = self.rows_written.get(target, 0) + rows
+
+        for stage, seconds in timings.items():
+            self.registry.observe('zonaprop_stage_duration_seconds', seconds, stage=stage)
+        self.registry.inc('zonaprop_pages_total')
+        self.registry.inc('zonaprop_listings_total', listings)
+        for target, rows in rows_written.items():
+            self.registry.inc('zonaprop_rows_written_total', rows, target=target)
+
+        log_event(
+            'page', job_id=self.job_id, url=url, page=page_number, listings=listings,
+            seconds={stage: round(seconds, 4) for stage, seconds in timings.items()},
+            rows_written=rows_written
+        )
+
+    def record_db_write(self, seconds, rows):
+        """
+        Registra una escritura en BD hecha fuera de las páginas (el
+        DatabaseWriter agrupa varias páginas en cada escritura)
+
+        Args:
+            seconds: Duración de la escritura
+            rows: Filas de propiedades insertadas o actualizadas
+        """
+        with self._lock:
+            self.stage_seconds['db_write'] += seconds
+            self.rows_written['db'] += rows
+
+        self.registry.observe('zonaprop_stage_duration_seconds', seconds, stage='db_write')
+        self.registry.inc('zonaprop_rows_written_total', rows, target='db')
+        log_event('db_write', job_id=self.job_id, seconds=round(seconds, 4), rows_written=rows)
+
+    def as_dict(self, browser=None):
+        """
+        Returns:
+            dict: Totales del job (segundos por etapa, páginas, publicaciones,
+                  filas escritas y, si se indica el browser, requests,
+                  reintentos y bytes descargados)
+        """
+        with self._lock:
+            data = {
+                'elapsed_seconds': round(time.monotonic() - self._start, 3),
+                'stage_seconds': {stage: round(seconds, 3) for stage, seconds in self.stage_seconds.items()},
+                'pages': self.pages,
+                'listings': self.listings,
+                'rows_written': dict(self.rows_written),
+            }
+        if browser is not None:
+            data.update(browser.stats())
+        return data
+
+    def finish(self, status, browser=None):
+        """
+        Registra el fin del job y escribe su resumen en el log JSON
+
+        Returns:
+            dict: Totales del job (ver as_dict)
+        """
+        data = self.as_dict(browser)
+        self.registry.observe('zonaprop_job_duration_seconds', data['elapsed_seconds'])
+        self.registry.inc('zonaprop_jobs_total', status=status)
+        self.registry.add('zonaprop_jobs_running', -1)
+        log_event('job', job_id=self.job_id, status=status, **data)
+        self.registry.flush()
+        return data
+
+
+# Registro del proceso (api/scraper_service le configura el MetricsStore)
+metrics = MetricsRegistry()
+
+# Logs JSON por página y por job (se habilitan desde la API o con --json-logs)
+json_logs_enabled = False
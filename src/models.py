@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DECIMAL, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -51,8 +51,12 @@ class Property(Base):
     Tabla: properties
     Representa las propiedades scrapeadas
     Tiene clave primaria compuesta: (id, publication_id, source_id, publisher_id, location_id)
+    y clave única (publication_id, source_id) para los upserts por lote
     """
     __tablename__ = 'properties'
+    __table_args__ = (
+        UniqueConstraint('publication_id', 'source_id', name='properties_publication_source_unique'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     publication_id = Column(Integer, primary_key=True)
@@ -78,6 +82,7 @@ class Property(Base):
     antiquity = Column(String(255), default='')
     address = Column(String(255), default='')
     description = Column(String(255), default='')
+    content_hash = Column(String(40))  # Huella del contenido scrapeado
 
     # Relaciones
     source = relationship('SourceData', back_populates='properties')
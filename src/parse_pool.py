@@ -0,0 +1,87 @@
+"""
+Etapa de parseo en procesos separados
+
+Extraer el PRELOADED_STATE (varios MB de JSON) y parsear las publicaciones
+es trabajo de CPU que retiene el GIL: con varios threads de descarga, el
+parseo termina serializado. El ParsePool lo corre en un ProcessPoolExecutor
+y el thread que descargó la página solo espera el resultado (sin el GIL).
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class ParsePool:
+    """
+    Pool de procesos para parsear páginas, compartido entre threads y jobs
+
+    Al proceso de parseo se le pasa el texto de la página tal como llegó
+    (un único pickle del str) y vuelve solo el resultado ya parseado, nunca
+    el PRELOADED_STATE completo.
+
+    Uso:
+        parse_pool = ParsePool(workers=8)
+        scraper.parse_pool = parse_pool
+    """
+
+    def __init__(self, workers=0):
+        """
+        Args:
+            workers: Procesos de parseo (0 = parsear en el mismo thread que
+                     descargó la página, sin procesos extra)
+        """
+        self.workers = max(0, int(workers))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Los procesos se crean recién al primer uso (en Gunicorn, ya dentro
+        # de cada worker) y con spawn: hacer fork de un proceso con threads
+        # puede copiar locks tomados
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def run(self, function, argument):
+        """
+        Ejecuta function(argument) en un proceso del pool
+
+        Args:
+            function: Función a nivel de módulo (debe poder serializarse con pickle)
+            argument: Argumento de la función (p. ej. el texto de la página)
+
+        Returns:
+            El resultado de function(argument)
+        """
+        if not self.workers:
+            return function(argument)
+
+        executor = self._get_executor()
+        try:
+            return executor.submit(function, argument).result()
+        except BrokenProcessPool as e:
+            # Un proceso murió (p. ej. por memoria): se recrea el pool en el
+            # próximo uso y esta página se parsea acá
+            print(f'Pool de parseo caído ({e}): se parsea en el proceso principal')
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            return function(argument)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
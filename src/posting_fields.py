@@ -0,0 +1,379 @@
+"""
+Mapeo declarativo de las publicaciones de ZonaProp (listPostings) a Estate
+
+Cada campo se describe con una ruta en el JSON de la publicación, un valor
+por defecto y una conversión opcional. Las rutas se separan en tuplas de
+claves una sola vez, al importar el módulo: cada tramo compartido se lee una
+sola vez por publicación y los campos se leen todos juntos, sin un paso de
+Python por campo (ver compile_fields). Cuando ZonaProp agrega o mueve un
+campo, alcanza con tocar POSTING_FIELDS.
+
+Además de parsear de a una publicación (parse_posting), parse_postings_columns
+convierte todas las publicaciones de una página a columnas (una lista por
+campo) en una pasada, para exportarlas sin armar un Estate por fila.
+"""
+import hashlib
+import json
+from collections import deque
+from itertools import repeat
+from json.encoder import c_make_encoder, encode_basestring
+from operator import itemgetter
+
+from src.estate import Estate, EstateImage, ESTATE_FIELDS
+
+ZONAPROP_URL = 'https://www.zonaprop.com.ar'
+
+# Tipos de operación de priceOperationTypes
+OPERATION_TYPE_SELL = '1'
+OPERATION_TYPE_RENT = '2'
+
+PRICE_PATH = 'priceOperationTypes.0.prices.0'
+OPERATION_TYPE_PATH = 'priceOperationTypes.0.operationType.operationTypeId'
+
+
+def absolute_url(path):
+    return ZONAPROP_URL + (path or '')
+
+
+def absolute_url_or_empty(path):
+    return ZONAPROP_URL + path if path else ''
+
+
+def parse_images(pictures):
+    return [EstateImage(picture.get('url730x532', ''), picture.get('order', 0)) for picture in pictures or []]
+
+
+# (columna, ruta en el JSON, valor por defecto, conversión). Las rutas usan
+# puntos e índices numéricos para listas; si falta un tramo intermedio (o es
+# null) el campo toma el valor por defecto
+POSTING_FIELDS = (
+    ('posting_id', 'postingId', '', None),
+    ('title', 'title', '', None),
+    ('generated_title', 'generatedTitle', '', None),
+    ('url', 'url', '', absolute_url),
+
+    # Precio: venta y alquiler separados para la BD; price_value/price_currency para el CSV
+    ('sell_price', f'{PRICE_PATH}.amount', None, None),
+    ('sell_currency', f'{PRICE_PATH}.currency', None, None),
+    ('rent_price', f'{PRICE_PATH}.amount', None, None),
+    ('rent_currency', f'{PRICE_PATH}.currency', None, None),
+    ('price_value', f'{PRICE_PATH}.amount', '', None),
+    ('price_currency', f'{PRICE_PATH}.currency', '', None),
+
+    ('expenses_value', 'expenses.amount', '', None),
+    ('expenses_currency', 'expenses.currency', '', None),
+
+    # Características principales
+    ('superficie_total', 'mainFeatures.CFT100.value', '', None),
+    ('superficie_cubierta', 'mainFeatures.CFT101.value', '', None),
+    ('ambientes', 'mainFeatures.CFT1.value', '', None),
+    ('dormitorios', 'mainFeatures.CFT2.value', '', None),
+    ('baños', 'mainFeatures.CFT3.value', '', None),
+    ('cocheras', 'mainFeatures.CFT7.value', '', None),
+    ('antiguedad', 'mainFeatures.CFT5.value', '', None),
+
+    # Publisher (inmobiliaria)
+    ('publisher_name', 'publisher.name', '', None),
+    ('publisher_id', 'publisher.publisherId', '', None),
+    ('publisher_url', 'publisher.url', '', absolute_url_or_empty),
+    ('publisher_logo_url', 'publisher.urlLogo', '', None),
+    ('publisher_phone', 'whatsApp', '', None),
+
+    # Ubicación
+    ('address', 'postingLocation.address.name', '', None),
+    ('location', 'postingLocation.location.name', '', None),
+    ('location_id_raw', 'postingLocation.location.locationId', '', None),  # Se convierte a int en database.py
+    ('city', 'postingLocation.location.parent.name', '', None),
+
+    ('description', 'descriptionNormalized', '', None),
+    ('property_type', 'realEstateType.name', '', None),
+    ('created_at', 'modified_date', '', None),
+    ('images', 'visiblePictures.pictures', None, parse_images),
+)
+
+# Campos que solo se completan si otra ruta tiene el valor indicado (si no, None)
+POSTING_FIELD_CONDITIONS = {
+    'sell_price': (OPERATION_TYPE_PATH, OPERATION_TYPE_SELL),
+    'sell_currency': (OPERATION_TYPE_PATH, OPERATION_TYPE_SELL),
+    'rent_price': (OPERATION_TYPE_PATH, OPERATION_TYPE_RENT),
+    'rent_currency': (OPERATION_TYPE_PATH, OPERATION_TYPE_RENT),
+}
+
+EMPTY = {}
+
+
+def split_path(path):
+    return tuple(int(key) if key.isdigit() else key for key in path.split('.'))
+
+
+def compile_step(key):
+    """
+    Returns:
+        function: step(node, default) -> hijo key de node (default si no está)
+    """
+    if isinstance(key, int):
+        def step(node, default):
+            return node[key] if len(node) > key else default
+    else:
+        def step(node, default):
+            return node.get(key, default)
+    return step
+
+
+def compile_parent(keys):
+    """
+    Returns:
+        function: read(posting) -> nodo en la ruta keys. Un tramo que falta
+                  o es null se reemplaza por un dict vacío, así que no se
+                  usan excepciones: en las publicaciones faltan campos seguido
+                  y atraparlas es caro
+    """
+    steps = tuple(compile_step(key) for key in keys)
+
+    def read(posting):
+        node = posting
+        for step in steps:
+            node = step(node, EMPTY) or EMPTY
+        return node
+
+    return read
+
+
+def compile_path(path, default):
+    """
+    Args:
+        path: Ruta con puntos (ej: 'publisher.name')
+        default: Valor si falta algún tramo
+
+    Returns:
+        function: read(posting) -> valor de la ruta
+    """
+    keys = split_path(path)
+    read_parent = compile_parent(keys[:-1])
+    last = compile_step(keys[-1])
+
+    def read(posting):
+        return last(read_parent(posting), default)
+
+    return read
+
+
+def compile_nodes(parents):
+    """
+    Numera los tramos intermedios de las rutas: cada tramo se lee una sola
+    vez por publicación, a partir de su tramo padre (mainFeatures, por
+    ejemplo, se lee una vez para los siete CFT)
+
+    Args:
+        parents: Rutas padre (tuplas de claves)
+
+    Returns:
+        tuple: (pasos, índices). Los pasos son (índice del padre, clave, es
+               índice de lista), en orden; índices es {ruta: posición en la
+               lista de nodos}, con la publicación en la posición 0
+    """
+    indexes = {(): 0}
+    steps = []
+    for keys in parents:
+        for end in range(1, len(keys) + 1):
+            prefix = keys[:end]
+            if prefix not in indexes:
+                indexes[prefix] = len(steps) + 1
+                steps.append((indexes[prefix[:-1]], prefix[-1], isinstance(prefix[-1], int)))
+    return tuple(steps), indexes
+
+
+def compile_fields(fields, conditions):
+    """
+    Compila los campos para leerlos sin un paso de Python por campo: los
+    tramos padre se leen una vez por publicación (ver compile_nodes) y los
+    campos con una clave de dict se leen todos juntos, con un map de
+    dict.get sobre (nodo, clave, default). Las condiciones y conversiones se
+    aplican después, solo sobre los campos que las tienen
+
+    Returns:
+        tuple: (pasos de los nodos, campos con clave, campos con índice de
+                lista, condiciones, conversiones, columnas en el orden de
+                extracción). Los campos con clave son tres tuplas paralelas
+                (nodos, claves, defaults); los campos con índice, (nodo,
+                índice, default); las condiciones, (nodo, clave, valor
+                esperado, posiciones); las conversiones, (posición,
+                función). Las posiciones son las del valor en la lista
+                extraída
+    """
+    keyed = []
+    indexed = []
+    for column, path, default, convert in fields:
+        keys = split_path(path)
+        (keyed if isinstance(keys[-1], str) else indexed).append((column, keys, default))
+
+    columns = tuple(column for column, _, _ in keyed + indexed)
+    positions = {column: position for position, column in enumerate(columns)}
+
+    conditional = {}
+    for column, (path, expected) in conditions.items():
+        conditional.setdefault((split_path(path), expected), []).append(positions[column])
+
+    paths = [keys for _, keys, _ in keyed + indexed] + [keys for keys, _ in conditional]
+    node_steps, node_indexes = compile_nodes(keys[:-1] for keys in paths)
+
+    return (
+        node_steps,
+        (
+            tuple(node_indexes[keys[:-1]] for _, keys, _ in keyed),
+            tuple(keys[-1] for _, keys, _ in keyed),
+            tuple(default for _, _, default in keyed),
+        ),
+        tuple((node_indexes[keys[:-1]], keys[-1], default) for _, keys, default in indexed),
+        tuple(
+            (node_indexes[keys[:-1]], keys[-1], expected, tuple(found))
+            for (keys, expected), found in conditional.items()
+        ),
+        tuple((positions[column], convert) for column, _, _, convert in fields if convert is not None),
+        columns,
+    )
+
+
+# Se compila una sola vez, al importar el módulo
+NODE_STEPS, KEYED_FIELDS, INDEXED_FIELDS, FIELD_CONDITIONS, FIELD_CONVERSIONS, EXTRACTED_COLUMNS = compile_fields(
+    POSTING_FIELDS, POSTING_FIELD_CONDITIONS
+)
+KEYED_NODES, KEYED_KEYS, KEYED_DEFAULTS = KEYED_FIELDS
+HASHED_COLUMNS = tuple(column for column, _, _, _ in POSTING_FIELDS)
+
+if HASHED_COLUMNS + ('content_hash',) != ESTATE_FIELDS:
+    raise ValueError('POSTING_FIELDS debe tener los campos de ESTATE_FIELDS, en el mismo orden')
+
+
+def make_hash_encoder(sort_keys):
+    """
+    Returns:
+        function: encode(content) -> el mismo texto que json.dumps(content,
+                  sort_keys=sort_keys, ensure_ascii=False, default=str).
+                  Usa el encoder de C de json creado una sola vez
+                  (JSONEncoder.encode lo vuelve a crear en cada llamada)
+    """
+    if c_make_encoder is None:
+        return json.JSONEncoder(sort_keys=sort_keys, ensure_ascii=False, check_circular=False, default=str).encode
+
+    iterencode = c_make_encoder(None, str, encode_basestring, None, ': ', ', ', sort_keys, False, True)
+
+    def encode(content):
+        return ''.join(iterencode(content, 0))
+
+    return encode
+
+
+# Huella: json.dumps(sort_keys=True, ensure_ascii=False, default=str) del dict
+# de la propiedad. El dict se arma con las claves ya ordenadas (también las de
+# cada imagen), así que si todos los campos son escalares no hace falta volver
+# a ordenarlas; un campo con un dict, una lista u otro tipo usa el encoder que
+# ordena (por ejemplo, un dict anidado)
+encode_sorted = make_hash_encoder(sort_keys=True)
+encode_presorted = make_hash_encoder(sort_keys=False)
+SCALAR_TYPES = frozenset((str, int, float, bool, type(None)))
+
+SORTED_COLUMNS = tuple(sorted(EXTRACTED_COLUMNS))
+get_sorted_values = itemgetter(*(EXTRACTED_COLUMNS.index(column) for column in SORTED_COLUMNS))
+get_scalar_values = itemgetter(*(index for index, column in enumerate(EXTRACTED_COLUMNS) if column != 'images'))
+IMAGES_INDEX = EXTRACTED_COLUMNS.index('images')
+
+
+def extract_values(posting):
+    """
+    Returns:
+        list: Valores de la publicación en el orden de EXTRACTED_COLUMNS
+              (imágenes como lista de EstateImage)
+    """
+    nodes = [posting]
+    for parent, key, is_index in NODE_STEPS:
+        node = nodes[parent]
+        if is_index:
+            node = node[key] if len(node) > key else None
+        else:
+            node = node.get(key)
+        nodes.append(node or EMPTY)
+
+    values = list(map(dict.get, map(nodes.__getitem__, KEYED_NODES), KEYED_KEYS, KEYED_DEFAULTS))
+    for node, index, default in INDEXED_FIELDS:
+        node = nodes[node]
+        values.append(node[index] if len(node) > index else default)
+
+    for node, key, expected, positions in FIELD_CONDITIONS:
+        if nodes[node].get(key) != expected:
+            for position in positions:
+                values[position] = None
+
+    for position, convert in FIELD_CONVERSIONS:
+        values[position] = convert(values[position])
+    return values
+
+
+def compute_values_hash(values):
+    """
+    Huella estable del contenido de una propiedad: cambia solo si cambia
+    algún campo (precio, textos, imágenes, etc.)
+
+    Args:
+        values: Valores en el orden de EXTRACTED_COLUMNS (ver extract_values)
+
+    Returns:
+        str: SHA-1 hexadecimal (40 caracteres)
+    """
+    # Se calcula sobre el dict (imágenes como {'url', 'order'}): la huella es
+    # la misma que se guardó en BD antes de que existiera Estate
+    content = dict(zip(SORTED_COLUMNS, get_sorted_values(values)))
+    content['images'] = [{'order': image.order, 'url': image.url} for image in values[IMAGES_INDEX]]
+    encode = encode_presorted if SCALAR_TYPES.issuperset(map(type, get_scalar_values(values))) else encode_sorted
+    return hashlib.sha1(encode(content).encode('utf-8')).hexdigest()
+
+
+def compute_content_hash(estate):
+    """
+    Args:
+        estate: Estate
+
+    Returns:
+        str: Huella del contenido de la propiedad (ver compute_values_hash)
+    """
+    return compute_values_hash([getattr(estate, column) for column in EXTRACTED_COLUMNS])
+
+
+def parse_posting(posting):
+    """
+    Parsea una publicación de listPostings
+
+    Returns:
+        Estate: Propiedad parseada, con su content_hash
+    """
+    values = extract_values(posting)
+
+    # Sin Estate.__init__: todos los campos se asignan acá, en un solo map
+    # (el deque de largo 0 lo consume sin un paso de Python por campo)
+    estate = Estate.__new__(Estate)
+    deque(map(setattr, repeat(estate, len(values)), EXTRACTED_COLUMNS, values), maxlen=0)
+    estate.content_hash = compute_values_hash(values)
+    return estate
+
+
+def parse_postings_columns(postings):
+    """
+    Modo por página: parsea todas las publicaciones de una página a
+    columnas en una sola pasada, sin armar un Estate por publicación
+
+    Args:
+        postings: listPostings de una página
+
+    Returns:
+        dict: {columna: lista de valores} con las columnas de ESTATE_FIELDS,
+              listo para StreamingExporter.write_columns. Las imágenes quedan
+              como listas de dicts {'url', 'order'} (un struct de Arrow) y
+              content_hash coincide con el de parse_posting
+    """
+    rows = [extract_values(posting) for posting in postings]
+
+    extracted = dict(zip(EXTRACTED_COLUMNS, zip(*rows)))
+    columns = {column: list(extracted.get(column, ())) for column in HASHED_COLUMNS}
+    columns['images'] = [[{'url': image.url, 'order': image.order} for image in images] for images in columns['images']]
+    columns['content_hash'] = [compute_values_hash(values) for values in rows]
+    return columns
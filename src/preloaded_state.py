@@ -0,0 +1,61 @@
+from src.extractor import extract_preloaded_state
+
+
+class PreloadedState:
+    """
+    Estado de una página de resultados (window.__PRELOADED_STATE__)
+
+    Se obtiene con una sola descarga y un solo parseo, y expone juntos
+    el paging y las publicaciones (listPostings) para que ningún
+    consumidor tenga que volver a descargar la misma página.
+    """
+
+    def __init__(self, data=None):
+        self.data = data
+
+    @classmethod
+    def from_html(cls, page):
+        """
+        Construye el estado a partir del HTML de una página de resultados
+
+        Args:
+            page: HTML de la página
+
+        Returns:
+            PreloadedState: Estado de la página (vacío si no se pudo extraer)
+        """
+        return cls(extract_preloaded_state(page))
+
+    @property
+    def found(self):
+        return self.data is not None
+
+    @property
+    def list_store(self):
+        return (self.data or {}).get('listStore', {})
+
+    @property
+    def paging(self):
+        return self.list_store.get('paging', {})
+
+    @property
+    def total(self):
+        """Cantidad total de propiedades de la búsqueda"""
+        return self.paging.get('total', 0)
+
+    @property
+    def page_size(self):
+        """Cantidad de propiedades por página"""
+        return self.paging.get('limit', 0)
+
+    @property
+    def total_pages(self):
+        return self.paging.get('totalPages', 0)
+
+    @property
+    def postings(self):
+        return self.list_store.get('listPostings', [])
+
+    def __repr__(self):
+        return f"<PreloadedState(total={self.total}, postings={len(self.postings)})>"
+
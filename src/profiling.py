@@ -0,0 +1,198 @@
+"""
+Perfilado opcional de un job de scraping
+
+JobProfiler combina dos perfiladores:
+- cProfile sobre el thread que ejecuta el job (parseo con concurrencia 1,
+  escritura en BD, exportación): cantidad exacta de llamadas y tiempos por
+  función, guardados como .pstats
+- un muestreador de stacks de los threads que el job crea mientras corre
+  (descargas concurrentes, búsquedas de un lote), que cProfile no ve,
+  guardado como stacks colapsados (.collapsed, el formato de flamegraph.pl
+  y speedscope)
+
+Los procesos del ParsePool no se perfilan; sus tiempos de extracción y
+parseo quedan en las métricas del job.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+
+DEFAULT_SAMPLE_INTERVAL = 0.005  # segundos entre muestras de stacks
+DEFAULT_TOP_FUNCTIONS = 15
+
+
+def frame_label(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """
+    Muestrea periódicamente los stacks de un conjunto de threads desde un
+    thread propio (sys._current_frames), sin instrumentar las llamadas
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        Args:
+            interval: Segundos entre muestras
+        """
+        self.interval = interval
+        self.stacks = Counter()  # {"thread;f1 (a.py:1);f2 (b.py:9)": muestras}
+        self.samples = 0
+        self._ignored_threads = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, thread_ident=None):
+        """
+        Empieza a muestrear el thread indicado y todos los que se creen a
+        partir de ahora (los threads que ya existían, como otros workers
+        ociosos, se ignoran)
+
+        Args:
+            thread_ident: Thread principal a muestrear (default: el actual)
+        """
+        thread_ident = thread_ident or threading.get_ident()
+        self._ignored_threads = {thread.ident for thread in threading.enumerate()} - {thread_ident}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident or ident in self._ignored_threads:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f'thread-{ident}'))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, filename):
+        """
+        Guarda los stacks en formato colapsado (una línea "a;b;c N" por stack)
+        """
+        with open(filename, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+    def top_functions(self, limit=DEFAULT_TOP_FUNCTIONS):
+        """
+        Funciones en las que más muestras cayeron (tiempo propio, en la
+        cima del stack)
+
+        Returns:
+            list: [{'function', 'samples', 'percent'}]
+        """
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [
+            {'function': function, 'samples': count, 'percent': round(100 * count / total, 1)}
+            for function, count in leaves.most_common(limit)
+        ]
+
+
+class JobProfiler:
+    """
+    Perfila un bloque de código (un job) y guarda los resultados junto a
+    su CSV
+
+    Uso:
+        with JobProfiler('data/busqueda-2026-01-15.csv') as profiler:
+            ...  # scraping
+        result['profile'] = profiler.summary()
+    """
+
+    def __init__(self, output_filename, sample_interval=DEFAULT_SAMPLE_INTERVAL, top=DEFAULT_TOP_FUNCTIONS):
+        """
+        Args:
+            output_filename: Archivo de salida del job (p. ej. el CSV); los
+                             perfiles se guardan con el mismo nombre y
+                             extensiones .pstats y .collapsed
+            sample_interval: Segundos entre muestras de stacks
+            top: Cantidad de funciones en el resumen
+        """
+        base_filename = os.path.splitext(output_filename)[0]
+        self.pstats_filename = f'{base_filename}.pstats'
+        self.collapsed_filename = f'{base_filename}.collapsed'
+        self.top = top
+        self.profile = cProfile.Profile()
+        self.profile_enabled = False
+        self.sampler = StackSampler(sample_interval)
+
+    def start(self):
+        self.sampler.start()
+        try:
+            self.profile.enable()
+            self.profile_enabled = True
+        except ValueError as e:
+            # Solo puede haber un perfilador activo a la vez (p. ej. otro job perfilado)
+            print(f'cProfile no disponible, solo se muestrean stacks: {e}')
+
+    def stop(self):
+        if self.profile_enabled:
+            self.profile.disable()
+        self.sampler.stop()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.pstats_filename)), exist_ok=True)
+        if self.profile_enabled:
+            self.profile.dump_stats(self.pstats_filename)
+        self.sampler.write_collapsed(self.collapsed_filename)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def top_profiled_functions(self):
+        """
+        Returns:
+            list: Funciones con más tiempo propio según cProfile
+                  [{'function', 'calls', 'tottime', 'cumtime'}]
+        """
+        if not self.profile_enabled:
+            return []
+
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        rows = []
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                'function': f'{name} ({os.path.basename(filename)}:{line})' if line else name,
+                'calls': calls,
+                'tottime': round(tottime, 4),
+                'cumtime': round(cumtime, 4),
+            })
+        rows.sort(key=lambda row: row['tottime'], reverse=True)
+        return rows[:self.top]
+
+    def summary(self):
+        """
+        Returns:
+            dict: Archivos generados y funciones principales de cada perfilador
+        """
+        return {
+            'pstats_file': self.pstats_filename if self.profile_enabled else None,
+            'collapsed_file': self.collapsed_filename,
+            'samples': self.sampler.samples,
+            'top_functions': self.top_profiled_functions(),
+            'top_sampled_functions': self.sampler.top_functions(self.top),
+        }
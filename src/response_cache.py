@@ -0,0 +1,216 @@
+"""
+Cache en disco de respuestas HTTP (páginas de resultados)
+
+Los cuerpos se guardan comprimidos con gzip y direccionados por contenido
+(blobs/<sha256>.gz): dos URLs con la misma respuesta comparten el archivo.
+Un índice SQLite mapea cada URL a su blob con la fecha de guardado (TTL) y
+de último acceso (desalojo LRU cuando se supera el tamaño máximo).
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from src.sqlite_store import SQLiteStore
+
+CREATE_RESPONSES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    blob TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+)
+"""
+
+# Columnas agregadas después de crear la tabla (índices de caches anteriores)
+RESPONSES_MIGRATION_COLUMNS = {'etag': 'TEXT', 'last_modified': 'TEXT'}
+
+
+class ResponseCache(SQLiteStore):
+    """
+    Cache de respuestas por URL, con TTL y tamaño máximo en disco
+
+    Uso:
+        cache = ResponseCache('data/http_cache', ttl=6 * 3600, validator=has_preloaded_state)
+        browser = Browser(cache=cache)
+    """
+
+    TABLES = (CREATE_RESPONSES_TABLE_SQL,)
+    MIGRATION_COLUMNS = {'responses': RESPONSES_MIGRATION_COLUMNS}
+
+    def __init__(self, directory, ttl=None, max_bytes=None, validator=None):
+        """
+        Args:
+            directory: Directorio del cache (se crea si no existe)
+            ttl: Segundos de validez de una respuesta (None = no vence)
+            max_bytes: Tamaño máximo comprimido; al superarlo se desalojan
+                       las respuestas usadas hace más tiempo (None = sin límite)
+            validator: Función opcional validator(texto) -> bool. Las respuestas
+                       que no la cumplen no se guardan (p. ej. páginas de
+                       challenge o bloqueo de Cloudflare con status 200)
+        """
+        self.directory = directory
+        self.blobs_directory = os.path.join(directory, 'blobs')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.validator = validator
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+        os.makedirs(self.blobs_directory, exist_ok=True)
+        super().__init__(os.path.join(directory, 'index.sqlite3'))
+
+    def _blob_path(self, blob):
+        return os.path.join(self.blobs_directory, f'{blob}.gz')
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, url):
+        """
+        Returns:
+            str: Respuesta guardada para la URL, o None si no está o venció
+        """
+        entry = self.get_entry(url)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, url):
+        """
+        Returns:
+            tuple: (respuesta, etag, last_modified) guardados para la URL, o
+                   None si no está o venció
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT blob, stored_at, etag, last_modified FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None or (self.ttl is not None and time.time() - row['stored_at'] > self.ttl):
+                self._count(hit=False)
+                return None
+            connection.execute('UPDATE responses SET accessed_at = ? WHERE url = ?', (time.time(), url))
+
+        try:
+            with gzip.open(self._blob_path(row['blob']), 'rt', encoding='utf-8') as f:
+                text = f.read()
+        except (FileNotFoundError, OSError, EOFError):
+            # Blob borrado o truncado: se trata como ausente
+            self._count(hit=False)
+            return None
+
+        self._count(hit=True)
+        return text, row['etag'], row['last_modified']
+
+    def set(self, url, text, etag=None, last_modified=None):
+        """
+        Guarda la respuesta de una URL, con los validadores HTTP (ETag y
+        Last-Modified) si los hay, para los GET condicionales
+
+        Returns:
+            bool: False si el validator rechazó la respuesta y no se guardó
+        """
+        if self.validator is not None and not self.validator(text):
+            print(f'Respuesta de {url} no guardada en el cache (no pasó la validación)')
+            return False
+
+        data = text.encode('utf-8')
+        blob = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(blob)
+
+        if not os.path.exists(path):
+            # Escritura atómica: otro thread o proceso nunca lee un blob a medio escribir
+            temporary_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with gzip.open(temporary_path, 'wb', compresslevel=6) as f:
+                f.write(data)
+            os.replace(temporary_path, path)
+
+        now = time.time()
+        with self._connect() as connection:
+            previous = connection.execute('SELECT blob FROM responses WHERE url = ?', (url,)).fetchone()
+            connection.execute(
+                'INSERT OR REPLACE INTO responses (url, blob, size, stored_at, accessed_at, etag, last_modified) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, blob, os.path.getsize(path), now, now, etag, last_modified)
+            )
+            if previous and previous['blob'] != blob:
+                self._remove_orphan_blob(connection, previous['blob'])
+
+        if self.max_bytes is not None:
+            self.evict()
+        return True
+
+    def _remove_orphan_blob(self, connection, blob):
+        """
+        Borra el blob si ninguna URL lo referencia
+
+        Returns:
+            bool: True si se borró
+        """
+        referenced = connection.execute('SELECT 1 FROM responses WHERE blob = ? LIMIT 1', (blob,)).fetchone()
+        if referenced is not None:
+            return False
+        try:
+            os.remove(self._blob_path(blob))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def size(self):
+        """
+        Returns:
+            int: Bytes ocupados por los blobs (cada blob se cuenta una vez)
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT COALESCE(SUM(size), 0) AS total FROM (SELECT DISTINCT blob, size FROM responses)'
+            ).fetchone()
+        return row['total']
+
+    def evict(self):
+        """
+        Desaloja las respuestas usadas hace más tiempo hasta quedar por
+        debajo de max_bytes
+
+        Returns:
+            int: Cantidad de URLs desalojadas
+        """
+        total = self.size()
+        if self.max_bytes is None or total <= self.max_bytes:
+            return 0
+
+        evicted = 0
+        with self._connect() as connection:
+            rows = connection.execute('SELECT url, blob, size FROM responses ORDER BY accessed_at').fetchall()
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                connection.execute('DELETE FROM responses WHERE url = ?', (row['url'],))
+                if self._remove_orphan_blob(connection, row['blob']):
+                    total -= row['size']
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._connect() as connection:
+            blobs = [row['blob'] for row in connection.execute('SELECT DISTINCT blob FROM responses')]
+            connection.execute('DELETE FROM responses')
+        for blob in blobs:
+            try:
+                os.remove(self._blob_path(blob))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size_bytes': self.size()
+        }
@@ -1,13 +1,24 @@
 import re
-import time
-import json
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from functools import reduce
 
-from bs4 import BeautifulSoup
+from src.db_writer import DatabaseWriter, DEFAULT_WRITER_QUEUE_SIZE
+from src.metrics import timed
+from src.posting_fields import parse_posting
+from src.preloaded_state import PreloadedState
 
 PAGE_URL_SUFFIX = '-pagina-'
 HTML_EXTENSION = '.html'
 
+# Páginas vacías seguidas (bloqueo, captcha, HTML sin preloadedData) antes de abortar
+DEFAULT_MAX_EMPTY_PAGES = 3
+
+# Modo incremental: páginas seguidas sin publicaciones nuevas o modificadas tras
+# las que se da por terminado el re-scrape (0 = solo saltear esas páginas)
+DEFAULT_STOP_AFTER_UNCHANGED = 3
+
 FEATURE_UNIT_DICT = {
     'm²': 'square_meters_area',
     'amb': 'rooms',
@@ -24,318 +35,595 @@ LABEL_DICT = {
     'POSTING_CARD_DESCRIPTION' : 'description',
 }
 
+
+class ParsedPage:
+    """
+    Resultado de la etapa de parseo de una página: el paging, las
+    propiedades ya parseadas (sin el PRELOADED_STATE completo) y los
+    segundos de cada etapa
+    """
+
+    def __init__(self, total=0, page_size=0, estates=None, timings=None):
+        self.total = total
+        self.page_size = page_size
+        self.estates = estates if estates is not None else []
+        self.timings = timings if timings is not None else {}  # {etapa: segundos}
+
+    def __repr__(self):
+        return f"<ParsedPage(total={self.total}, estates={len(self.estates)})>"
+
+
+def parse_page(page):
+    """
+    Etapa de parseo: extrae el PRELOADED_STATE del HTML y parsea sus
+    publicaciones. Es una función de módulo para poder correr en un
+    proceso del ParsePool
+
+    Args:
+        page: HTML de la página
+
+    Returns:
+        ParsedPage: Paging, propiedades parseadas y tiempos de extracción
+                    y parseo de la página (medidos en el proceso que parsea)
+    """
+    timings = {}
+    with timed(timings, 'extract'):
+        state = PreloadedState.from_html(page)
+
+    parser = Scraper(None, '')
+    with timed(timings, 'parse'):
+        estates = [parser.parse_estate(estate_post) for estate_post in state.postings]
+
+    return ParsedPage(total=state.total, page_size=state.page_size, estates=estates, timings=timings)
+
+
+class EmptyPagesError(Exception):
+    """
+    Demasiadas páginas seguidas sin propiedades dentro del rango de la búsqueda
+    """
+
+
 class Scraper:
-    def __init__(self, browser, base_url):
+    def __init__(self, browser, base_url, concurrency=1, max_empty_pages=DEFAULT_MAX_EMPTY_PAGES):
+        """
+        Args:
+            browser: Cliente HTTP (Browser, que aplica el límite de tasa y los reintentos)
+            base_url: URL de búsqueda sin extensión .html
+            concurrency: Cantidad máxima de páginas descargadas en paralelo
+            max_empty_pages: Páginas vacías seguidas tras las que se aborta el scraping
+        """
         self.browser = browser
         self.base_url = base_url
         self.db_session = None  # Será inicializada si se habilita guardado en BD
-
-    def enable_database_save(self, session):
+        self.save_stats = None  # Contadores de BD del job (insertadas/actualizadas/sin cambios)
+        self.db_writer_queue_size = 0  # Páginas en cola del DatabaseWriter (0 = guardar en línea)
+        self.db_writer = None  # DatabaseWriter mientras corre iter_pages
+        self.unsaved_pages = deque()  # (envío al writer, página, propiedades, nuevas) exportadas sin guardar aún
+        self.concurrency = max(1, int(concurrency))
+        self.max_empty_pages = max_empty_pages
+        self.first_page_state = None
+        self.progress_callback = None  # callback(pages_done, pages_total, listings_saved)
+        self.pages_total = 0
+        self.checkpoint_store = None  # Será inicializado si se habilitan checkpoints
+        self.checkpoint_job_id = None
+        self.completed_pages = {}  # {número de página: propiedades} ya procesadas
+        self.snapshot_store = None  # CheckpointStore, si se habilitan las instantáneas
+        self.page_snapshots = {}  # {número de página: instantánea de la corrida anterior}
+        self.known_postings = {}  # {postingId: content_hash} de la corrida anterior
+        self.page_validators = {}  # {número de página: (etag, last_modified)}
+        self.incremental = False
+        self.stop_after_unchanged = DEFAULT_STOP_AFTER_UNCHANGED
+        self.pages_unchanged = 0
+        self.posting_registry = None  # PostingRegistry compartido en scrapings por lote
+        self.parse_pool = None  # ParsePool: si está, el parseo corre en otros procesos
+        self.job_metrics = None  # JobMetrics: si está, se registran los tiempos de cada página
+        self.page_timings = {}  # {número de página: {etapa: segundos}}
+
+    def enable_database_save(self, session, writer_queue_size=DEFAULT_WRITER_QUEUE_SIZE):
         """
         Habilita guardado automático en BD durante scraping
 
         Args:
             session: Sesión de SQLAlchemy para guardar en BD
+            writer_queue_size: Páginas que pueden esperar a guardarse en el
+                               DatabaseWriter (en segundo plano) antes de frenar
+                               las descargas. 0 = guardar cada página en línea
         """
+        from src.database import SaveStats
         self.db_session = session
+        self.save_stats = SaveStats()
+        self.db_writer_queue_size = max(0, int(writer_queue_size or 0))
 
-    def scrap_page(self, page_number):
-        if page_number == 1:
-            page_url = f'{self.base_url}{HTML_EXTENSION}'
-        else:
-            page_url = f'{self.base_url}{PAGE_URL_SUFFIX}{page_number}{HTML_EXTENSION}'
-
-        print(f'URL: {page_url}')
-
-        page = self.browser.get_text(page_url)
-
-        soup = BeautifulSoup(page, 'lxml')
-        script_tag = soup.find('script', id="preloadedData")
-
-        if not script_tag:
-            print("No se encontró el tag script con id='preloadedData'")
-            return []
+    def enable_checkpoints(self, store, job_id, resume=False, output_file=None, is_abandoned=None):
+        """
+        Habilita el registro de páginas procesadas en un CheckpointStore
 
-        # Extraer el texto del script y parsear el JSON
-        script_text = script_tag.text.strip()
+        Args:
+            store: CheckpointStore
+            job_id: ID del job (o de la ejecución) actual
+            resume: Si es True, continúa el checkpoint sin terminar de esta
+                    búsqueda (el de job_id o, si no hay, el más reciente de
+                    un job abandonado)
+            output_file: Archivo de salida a registrar en un checkpoint nuevo
+            is_abandoned: Ver CheckpointStore.find_resumable
+
+        Returns:
+            dict: Checkpoint en uso (el reanudado o uno nuevo)
+        """
+        checkpoint = store.find_resumable(self.base_url, job_id, is_abandoned) if resume else None
+        if checkpoint:
+            print(f"Reanudando checkpoint {checkpoint['resumed_from'] or job_id}: "
+                  f"{len(checkpoint['completed_pages'])} páginas ya procesadas")
+        else:
+            checkpoint = store.create(self.base_url, job_id, output_file)
 
-        # Buscar específicamente window.__PRELOADED_STATE__ =
-        preloaded_state_marker = 'window.__PRELOADED_STATE__ = '
-        start_index = script_text.find(preloaded_state_marker)
+        self.checkpoint_store = store
+        self.checkpoint_job_id = checkpoint['job_id']
+        self.completed_pages = dict(checkpoint['completed_pages'])
+        return checkpoint
 
-        if start_index == -1:
-            print("No se encontró window.__PRELOADED_STATE__")
-            return []
+    def enable_page_snapshots(self, store, incremental=False, stop_after_unchanged=DEFAULT_STOP_AFTER_UNCHANGED):
+        """
+        Registra una instantánea de cada página procesada (postingIds con su
+        content_hash y ETag/Last-Modified) para el próximo re-scrape
 
-        # Empezar después del marcador
-        start_index += len(preloaded_state_marker)
+        Args:
+            store: CheckpointStore
+            incremental: Si es True, las páginas se piden de forma condicional
+                         y las que no tienen publicaciones nuevas ni modificadas
+                         respecto de la corrida anterior no se guardan ni exportan
+            stop_after_unchanged: En modo incremental, páginas seguidas sin
+                                  cambios tras las que se termina (0 = nunca)
+        """
+        self.snapshot_store = store
+        self.page_snapshots = store.load_snapshots(self.base_url)
+        self.known_postings = {}
+        for snapshot in self.page_snapshots.values():
+            self.known_postings.update(snapshot['postings'])
+        self.incremental = incremental
+        self.stop_after_unchanged = stop_after_unchanged
+
+    def get_page_url(self, page_number):
+        if page_number == 1:
+            return f'{self.base_url}{HTML_EXTENSION}'
+        return f'{self.base_url}{PAGE_URL_SUFFIX}{page_number}{HTML_EXTENSION}'
 
-        # Encontrar el final del objeto JSON (el próximo ;)
-        json_start = start_index
-        brace_count = 0
-        json_end = -1
+    def get_page_text(self, page_url):
+        return self.browser.get_text(page_url)
 
-        for i in range(json_start, len(script_text)):
-            if script_text[i] == '{':
-                brace_count += 1
-            elif script_text[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    json_end = i + 1
-                    break
+    def parse_page_text(self, page):
+        """
+        Pasa el texto de la página a la etapa de parseo (en el ParsePool si
+        está configurado, o en este mismo thread)
 
-        if json_end == -1:
-            print("No se pudo encontrar el final del JSON")
-            return []
+        Returns:
+            ParsedPage: Paging y propiedades parseadas de la página
+        """
+        if self.parse_pool is None:
+            return parse_page(page)
+        return self.parse_pool.run(parse_page, page)
 
-        json_text = script_text[json_start:json_end]
+    def fetch_page_state(self, page_number):
+        """
+        Descarga una página y la parsea una sola vez
 
-        try:
-            data = json.loads(json_text)
-        except json.JSONDecodeError as e:
-            print(f"Error al parsear JSON: {e}")
-            return []
+        Con instantáneas habilitadas, las páginas 2..N se piden de forma
+        condicional (la página 1 siempre completa: de ella sale el paging)
 
-        # Extraer las propiedades de la estructura JSON
-        estate_posts = data.get('listStore', {}).get('listPostings', [])
+        Returns:
+            ParsedPage: Paging y propiedades de la página, o None si el
+                        servidor respondió que no cambió (304)
+        """
+        page_url = self.get_page_url(page_number)
 
-        print(f"Encontradas {len(estate_posts)} propiedades")
+        print(f'URL: {page_url}')
 
-        estates = []
-        for estate_post in estate_posts:
-            estate = self.parse_estate(estate_post)
+        timings = {}
+        self.page_timings[page_number] = timings
+
+        if self.snapshot_store is None or page_number == 1:
+            with timed(timings, 'fetch'):
+                page = self.get_page_text(page_url)
+            state = self.parse_page_text(page)
+            timings.update(state.timings)
+            return state
+
+        etag, last_modified = None, None
+        if self.incremental:
+            snapshot = self.page_snapshots.get(page_number, {})
+            etag, last_modified = snapshot.get('etag'), snapshot.get('last_modified')
+
+        with timed(timings, 'fetch'):
+            page, etag, last_modified = self.browser.get_conditional(page_url, etag, last_modified)
+        self.page_validators[page_number] = (etag, last_modified)
+        if page is None:
+            return None
+        state = self.parse_page_text(page)
+        timings.update(state.timings)
+        return state
+
+    def get_first_page_state(self):
+        """
+        Estado de la página 1, descargado una única vez por job y
+        compartido entre get_estates_quantity y scrap_page(1)
+        """
+        if self.first_page_state is None:
+            self.first_page_state = self.fetch_page_state(1)
+        return self.first_page_state
 
-            # Guardar en BD si está habilitado
-            if self.db_session:
-                try:
-                    from src.database import save_property_to_db
-                    save_property_to_db(self.db_session, estate)
-                    print(f"[OK] Propiedad {estate.get('posting_id')} guardada en BD")
-                except Exception as e:
-                    print(f"[ERROR] Error guardando {estate.get('posting_id')}: {e}")
-                    # No detener el scraping por error de BD
-
-            estates.append(estate)
+    def scrap_page(self, page_number):
+        estates = self.fetch_page(page_number)
+        self.save_estates(estates)
         return estates
 
-    def scrap_website(self):
-        page_number = 1
-        estates = []
-        estates_scraped = 0
-        estates_quantity = self.get_estates_quantity()
-        while estates_quantity > estates_scraped:
-            print(f'Page: {page_number}')
-            estates += self.scrap_page(page_number)
-            page_number += 1
-            estates_scraped = len(estates)
-            time.sleep(3)
+    def fetch_page(self, page_number):
+        """
+        Descarga y parsea una página de resultados sin tocar la BD,
+        por lo que puede ejecutarse desde cualquier thread
 
-        return estates
+        Returns:
+            list: Propiedades parseadas de la página, o None si la página
+                  no cambió desde la corrida anterior (304)
+        """
+        if page_number == 1:
+            state = self.get_first_page_state()
+        else:
+            state = self.fetch_page_state(page_number)
 
+        if state is None:
+            print('Página sin cambios (304)')
+            return None
 
-    def get_estates_quantity(self):
-        page_url = f'{self.base_url}{HTML_EXTENSION}'
-        page = self.browser.get_text(page_url)
-        soup = BeautifulSoup(page, 'lxml')
+        print(f"Encontradas {len(state.estates)} propiedades")
 
-        # Extraer el JSON del script tag
-        script_tag = soup.find('script', id="preloadedData")
+        return state.estates
 
-        if not script_tag:
-            print("No se encontró el tag script con id='preloadedData'")
-            return 0
+    def save_estates(self, estates):
+        """
+        Guarda en BD las propiedades de una página si está habilitado, en una
+        sola transacción. Se ejecuta siempre en el thread principal (la sesión
+        no es thread-safe). Con el DatabaseWriter corriendo, la página solo se
+        encola y la guarda el thread escritor
+
+        Returns:
+            SaveStats: Contadores de la página, o None si no se guardó nada
+                       (o si quedó encolada)
+        """
+        if not self.db_session or not estates:
+            return None
 
-        script_text = script_tag.text.strip()
+        if self.db_writer is not None:
+            self.db_writer.submit(estates)
+            return None
 
-        # Buscar específicamente window.__PRELOADED_STATE__ =
-        preloaded_state_marker = 'window.__PRELOADED_STATE__ = '
-        start_index = script_text.find(preloaded_state_marker)
+        from src.database import save_page_to_db
+        page_stats = save_page_to_db(self.db_session, estates)
+        self.save_stats.add(page_stats)
+        print(f"[OK] {page_stats.saved}/{len(estates)} propiedades guardadas en BD {page_stats.as_dict()}")
+        return page_stats
 
-        if start_index == -1:
-            print("No se encontró window.__PRELOADED_STATE__")
-            return 0
+    def report_progress(self, pages_done, estates_scraped):
+        """
+        Informa el avance del job al progress_callback, si hay uno
 
-        # Empezar después del marcador
-        start_index += len(preloaded_state_marker)
-
-        # Encontrar el final del objeto JSON
-        json_start = start_index
-        brace_count = 0
-        json_end = -1
-
-        for i in range(json_start, len(script_text)):
-            if script_text[i] == '{':
-                brace_count += 1
-            elif script_text[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    json_end = i + 1
-                    break
-
-        if json_end == -1:
-            print("No se pudo encontrar el final del JSON")
-            return 0
+        Args:
+            pages_done: Páginas procesadas hasta ahora
+            estates_scraped: Cantidad de propiedades scrapeadas hasta ahora
+        """
+        if not self.progress_callback:
+            return
 
-        json_text = script_text[json_start:json_end]
+        listings_saved = self.save_stats.saved if self.save_stats else estates_scraped
+        self.progress_callback(pages_done, self.pages_total, listings_saved)
 
-        try:
-            data = json.loads(json_text)
-        except json.JSONDecodeError as e:
-            print(f"Error al parsear JSON: {e}")
+    def get_pages_quantity(self, estates_quantity, page_size=None):
+        """
+        Cantidad de páginas de la búsqueda según el paging de la página 1
+        """
+        page_size = self.get_first_page_state().page_size or page_size
+        if not page_size:
             return 0
+        return math.ceil(estates_quantity / page_size)
 
-        # Obtener la cantidad total de propiedades del paging
-        paging = data.get('listStore', {}).get('paging', {})
-        estates_quantity = paging.get('total', 0)
-
-        print(f"Total de propiedades encontradas: {estates_quantity}")
-        return estates_quantity
+    def scrap_website(self):
+        return list(self.iter_estates())
 
-    def parse_estate(self, estate_post):
+    def iter_estates(self):
         """
-        Parsea un diccionario JSON de una propiedad y extrae la información relevante
-        """
-        estate = {}
-
-        # ID y títulos
-        estate['posting_id'] = estate_post.get('postingId', '')
-        estate['title'] = estate_post.get('title', '')
-        estate['generated_title'] = estate_post.get('generatedTitle', '')
-
-        # URL
-        estate['url'] = 'https://www.zonaprop.com.ar' + estate_post.get('url', '')
-
-        # Precio y tipo de operación
-        price_operations = estate_post.get('priceOperationTypes', [])
-        estate['sell_price'] = None
-        estate['sell_currency'] = None
-        estate['rent_price'] = None
-        estate['rent_currency'] = None
-        estate['price_value'] = ''  # Para CSV
-        estate['price_currency'] = ''  # Para CSV
-
-        if price_operations and len(price_operations) > 0:
-            operation = price_operations[0]
-            operation_type = operation.get('operationType', {})
-            operation_type_id = operation_type.get('operationTypeId', '')
-
-            prices = operation.get('prices', [])
-            if prices and len(prices) > 0:
-                amount = prices[0].get('amount', '')
-                currency = prices[0].get('currency', '')
-
-                # Para CSV (compatibilidad)
-                estate['price_value'] = amount
-                estate['price_currency'] = currency
-
-                # Para BD: diferenciar venta/alquiler
-                if operation_type_id == '1':  # Venta
-                    estate['sell_price'] = amount
-                    estate['sell_currency'] = currency
-                elif operation_type_id == '2':  # Alquiler
-                    estate['rent_price'] = amount
-                    estate['rent_currency'] = currency
-
-        # Expensas
-        expenses = estate_post.get('expenses')
-        if expenses:
-            estate['expenses_value'] = expenses.get('amount', '')
-            estate['expenses_currency'] = expenses.get('currency', '')
-        else:
-            estate['expenses_value'] = ''
-            estate['expenses_currency'] = ''
-
-        # Características principales
-        main_features = estate_post.get('mainFeatures', {})
-
-        # Superficie total
-        if 'CFT100' in main_features:
-            estate['superficie_total'] = main_features['CFT100'].get('value', '')
-        else:
-            estate['superficie_total'] = ''
+        Generador de propiedades: las produce página por página a medida que
+        se scrapean, sin acumular la búsqueda completa en memoria
+        """
+        for page_estates in self.iter_pages():
+            yield from page_estates
 
-        # Superficie cubierta
-        if 'CFT101' in main_features:
-            estate['superficie_cubierta'] = main_features['CFT101'].get('value', '')
-        else:
-            estate['superficie_cubierta'] = ''
+    def iter_pages(self):
+        """
+        Generador de páginas scrapeadas, en orden. Cada página ya está
+        guardada en BD (si está habilitado) cuando se produce, y se marca
+        en el checkpoint (si está habilitado) cuando el consumidor la pide
+        siguiente, es decir, después de exportarla.
+
+        Con el DatabaseWriter (writer_queue_size > 0) la página se produce
+        apenas se encola para guardarse, y el checkpoint y la instantánea
+        esperan a que el writer la confirme en BD. El generador termina
+        recién cuando el writer guardó todas las páginas.
+
+        Las páginas que el checkpoint ya tiene como procesadas se saltean,
+        igual que en modo incremental las que no tienen cambios. Con un
+        posting_registry, cada página trae solo las publicaciones que no se
+        vieron antes en el lote.
+
+        Yields:
+            list: Propiedades de una página
+        """
+        estates_quantity = self.get_estates_quantity()
+        self.pages_total = self.get_pages_quantity(estates_quantity)
+        self.update_checkpoint_total(estates_quantity)
 
-        # Ambientes
-        if 'CFT1' in main_features:
-            estate['ambientes'] = main_features['CFT1'].get('value', '')
+        if self.concurrency > 1:
+            pages = self.iter_pages_concurrently(estates_quantity)
         else:
-            estate['ambientes'] = ''
+            pages = self.iter_pages_sequentially(estates_quantity)
 
-        # Dormitorios
-        if 'CFT2' in main_features:
-            estate['dormitorios'] = main_features['CFT2'].get('value', '')
-        else:
-            estate['dormitorios'] = ''
+        if self.db_session is not None and self.db_writer_queue_size:
+            self.db_writer = DatabaseWriter(
+                self.db_session, self.db_writer_queue_size, stats=self.save_stats, job_metrics=self.job_metrics
+            ).start()
 
-        # Baños
-        if 'CFT3' in main_features:
-            estate['baños'] = main_features['CFT3'].get('value', '')
-        else:
-            estate['baños'] = ''
+        try:
+            estates_scraped = sum(self.completed_pages.values())
+            empty_pages = 0
+            unchanged_pages = 0
+            for page_number, page_estates in pages:
+                empty_pages = 0 if page_estates != [] else empty_pages + 1
+                if empty_pages >= self.max_empty_pages:
+                    raise EmptyPagesError(
+                        f'{empty_pages} páginas seguidas sin propiedades (última: {page_number}). '
+                        f'Posible bloqueo del sitio'
+                    )
+
+                timings = self.page_timings.pop(page_number, {})
+
+                if self.incremental and self.is_page_unchanged(page_estates):
+                    unchanged_pages += 1
+                    self.pages_unchanged += 1
+                    estates_scraped += len(page_estates) if page_estates else 0
+                    print(f'Página {page_number} sin publicaciones nuevas ni modificadas')
+                    self.report_progress(page_number, estates_scraped)
+                    self.checkpoint_page(page_number, page_estates or [])
+                    # Sin instantánea nueva: la anterior conserva sus validadores
+                    self.page_validators.pop(page_number, None)
+                    self.record_page_metrics(page_number, timings, len(page_estates or []))
+                    if self.stop_after_unchanged and unchanged_pages >= self.stop_after_unchanged:
+                        print(f'{unchanged_pages} páginas seguidas sin cambios: fin del re-scrape incremental')
+                        break
+                    continue
+                unchanged_pages = 0
+
+                # En un lote, las publicaciones ya vistas en otra búsqueda no se
+                # vuelven a guardar ni exportar
+                new_estates = page_estates
+                if self.posting_registry is not None:
+                    new_estates = self.posting_registry.claim(page_estates)
+
+                # Con el writer solo se mide la espera por lugar en la cola
+                # (backpressure); el tiempo de la BD lo registra el writer
+                try:
+                    with timed(timings, 'db_queue' if self.db_writer is not None else 'db_write'):
+                        page_stats = self.save_estates(new_estates)
+                except Exception:
+                    self.release_postings(new_estates)
+                    raise
+                estates_scraped += len(page_estates)
+                self.report_progress(page_number, estates_scraped)
+
+                # El consumidor exporta la página antes de pedir la siguiente
+                with timed(timings, 'export'):
+                    yield new_estates
+                if self.db_writer is not None and new_estates:
+                    self.unsaved_pages.append((self.db_writer.submitted, page_number, page_estates, new_estates))
+                else:
+                    self.complete_page(page_number, page_estates)
+                self.complete_saved_pages()
+
+                rows_written = {'export': len(new_estates)}
+                if page_stats is not None:
+                    rows_written['db'] = page_stats.inserted + page_stats.updated
+                self.record_page_metrics(page_number, timings, len(page_estates), rows_written)
+
+            if self.db_writer is not None:
+                self.db_writer.drain()
+                self.complete_saved_pages()
+        finally:
+            # Ante un error (o si el consumidor corta), se guarda lo que ya
+            # estaba encolado y se marcan las páginas que quedaron guardadas
+            if self.db_writer is not None:
+                self.db_writer.close()
+                self.complete_saved_pages()
+                # Lo que el writer no llegó a guardar (falló la BD) se libera
+                for _, _, _, new_estates in self.unsaved_pages:
+                    self.release_postings(new_estates)
+                self.unsaved_pages.clear()
+                self.db_writer = None
+            # Validadores de páginas descargadas que no llegaron a su instantánea
+            # (el consumidor cortó, o quedaron en espera al terminar)
+            self.page_validators.clear()
+
+        if self.checkpoint_store:
+            self.checkpoint_store.finish(self.base_url, self.checkpoint_job_id)
+
+    def complete_page(self, page_number, page_estates):
+        """
+        Marca una página exportada (y guardada) en el checkpoint y en las
+        instantáneas de páginas
+        """
+        self.checkpoint_page(page_number, page_estates)
+        self.snapshot_page(page_number, page_estates)
 
-        # Cocheras
-        if 'CFT7' in main_features:
-            estate['cocheras'] = main_features['CFT7'].get('value', '')
-        else:
-            estate['cocheras'] = ''
+    def complete_saved_pages(self):
+        """
+        Completa, en orden, las páginas exportadas que el DatabaseWriter ya
+        guardó. Hasta entonces no se marcan: si el job se corta, al reanudar
+        se vuelven a scrapear y guardar
+        """
+        while self.unsaved_pages and self.unsaved_pages[0][0] <= self.db_writer.pages_saved:
+            _, page_number, page_estates, _ = self.unsaved_pages.popleft()
+            self.complete_page(page_number, page_estates)
 
-        # Antigüedad
-        if 'CFT5' in main_features:
-            estate['antiguedad'] = main_features['CFT5'].get('value', '')
-        else:
-            estate['antiguedad'] = ''
+    def release_postings(self, estates):
+        """
+        Libera en el posting_registry del lote las publicaciones de una
+        página que no se llegó a guardar, para que otra búsqueda que las
+        traiga pueda guardarlas
+        """
+        if self.posting_registry is not None and estates:
+            self.posting_registry.release(estates)
 
-        # Publisher (inmobiliaria)
-        publisher = estate_post.get('publisher', {})
-        estate['publisher_name'] = publisher.get('name', '')
-        estate['publisher_id'] = publisher.get('publisherId', '')
-        estate['publisher_url'] = 'https://www.zonaprop.com.ar' + publisher.get('url', '') if publisher.get('url') else ''
-        estate['publisher_logo_url'] = publisher.get('urlLogo', '')
-        estate['publisher_phone'] = estate_post.get('whatsApp', '')
+    def record_page_metrics(self, page_number, timings, listings, rows_written=None):
+        if self.job_metrics is not None:
+            self.job_metrics.record_page(self.base_url, page_number, timings, listings, rows_written)
 
-        # Ubicación
-        posting_location = estate_post.get('postingLocation') or {}
+    def is_page_unchanged(self, page_estates):
+        """
+        Una página no tiene cambios si respondió 304 o si todas sus
+        publicaciones ya se vieron en la corrida anterior (en cualquier
+        página: al aparecer publicaciones nuevas el resto se corre de
+        página) con el mismo content_hash
+        """
+        if page_estates is None:
+            return True
+        if not page_estates:
+            return False
+        return all(
+            self.known_postings.get(estate.posting_id) == estate.content_hash
+            for estate in page_estates
+        )
+
+    def snapshot_page(self, page_number, page_estates):
+        if not self.snapshot_store:
+            return
+
+        etag, last_modified = self.page_validators.pop(page_number, (None, None))
+        postings = {estate.posting_id: estate.content_hash for estate in page_estates}
+        self.snapshot_store.save_snapshot(self.base_url, page_number, postings, etag, last_modified)
+
+    def update_checkpoint_total(self, estates_quantity):
+        if not self.checkpoint_store:
+            return
+
+        checkpoint = self.checkpoint_store.get(self.base_url, self.checkpoint_job_id)
+        if checkpoint['total'] is not None and checkpoint['total'] != estates_quantity:
+            print(f"El total de propiedades cambió desde el checkpoint: "
+                  f"{checkpoint['total']} -> {estates_quantity}")
+        self.checkpoint_store.update_total(
+            self.base_url, self.checkpoint_job_id, estates_quantity, self.pages_total
+        )
+
+    def checkpoint_page(self, page_number, page_estates):
+        self.completed_pages[page_number] = len(page_estates)
+        if self.checkpoint_store:
+            self.checkpoint_store.mark_page_done(
+                self.base_url, self.checkpoint_job_id, page_number, len(page_estates)
+            )
+
+    def iter_pages_sequentially(self, estates_quantity):
+        """
+        Descarga las páginas de a una hasta alcanzar el total de propiedades
 
-        # Dirección
-        address = posting_location.get('address') or {}
-        estate['address'] = address.get('name', '')
+        Yields:
+            tuple: (número de página, propiedades de la página)
+        """
+        page_number = 1
+        estates_scraped = sum(self.completed_pages.values())
+        while estates_quantity > estates_scraped:
+            if page_number in self.completed_pages:
+                page_number += 1
+                continue
 
-        # Barrio/zona
-        location = posting_location.get('location') or {}
-        estate['location'] = location.get('name', '')
-        estate['location_id_raw'] = location.get('locationId', '')  # Para convertir a int en database.py
+            print(f'Page: {page_number}')
+            page_estates = self.fetch_page(page_number)
+            if page_estates == [] and self.pages_total and page_number >= self.pages_total:
+                # La búsqueda se achicó mientras se scrapeaba: no hay más páginas
+                print(f'Página {page_number} vacía: fin de los resultados')
+                return
+
+            if page_estates is None:
+                # 304: la página tiene las mismas publicaciones que la corrida anterior
+                estates_scraped += len(self.page_snapshots.get(page_number, {}).get('postings', {}))
+            else:
+                estates_scraped += len(page_estates)
+            yield page_number, page_estates
+            page_number += 1
 
-        # Ciudad
-        parent_location = location.get('parent') or {}
-        estate['city'] = parent_location.get('name', '')
+    def iter_pages_concurrently(self, estates_quantity):
+        """
+        Descarga la página 1 y luego las páginas 2..N con un pool acotado
+        de threads. Las páginas se producen en orden, y nunca hay más de
+        2 * concurrency páginas descargadas en espera, así que la memoria
+        no crece con el tamaño de la búsqueda.
 
-        # Descripción
-        estate['description'] = estate_post.get('descriptionNormalized', '')
+        Args:
+            estates_quantity: Total de propiedades informado por el paging
 
-        # Tipo de propiedad
-        real_estate_type = estate_post.get('realEstateType', {})
-        estate['property_type'] = real_estate_type.get('name', '')
+        Yields:
+            tuple: (número de página, propiedades de la página)
+        """
+        if 1 in self.completed_pages:
+            first_page_size = len(self.get_first_page_state().estates)
+        else:
+            print('Page: 1')
+            first_page = self.fetch_page(1)
+            if not first_page:
+                return
+            first_page_size = len(first_page)
+            yield 1, first_page
+
+        # El tamaño de página viene del paging (o se deduce de la primera página)
+        pages_quantity = self.get_pages_quantity(estates_quantity, page_size=first_page_size)
+        self.pages_total = pages_quantity
+        pages_to_fetch = deque(
+            page for page in range(2, pages_quantity + 1) if page not in self.completed_pages
+        )
+        print(f'Páginas a descargar: {len(pages_to_fetch)} (concurrencia: {self.concurrency})')
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pending = deque()
+            try:
+                while pages_to_fetch or pending:
+                    while pages_to_fetch and len(pending) < 2 * self.concurrency:
+                        next_page = pages_to_fetch.popleft()
+                        pending.append((next_page, executor.submit(self.fetch_page, next_page)))
+
+                    page_number, future = pending.popleft()
+                    page_estates = future.result()
+                    print(f'Page: {page_number}')
+                    if page_estates == [] and page_number >= self.pages_total:
+                        # La búsqueda se achicó mientras se scrapeaba: no hay más páginas
+                        print(f'Página {page_number} vacía: fin de los resultados')
+                        return
+                    yield page_number, page_estates
+            finally:
+                # Si el consumidor corta antes (error o fin incremental), no
+                # descargar las páginas que todavía no empezaron
+                for _, future in pending:
+                    future.cancel()
 
-        # Fecha de creación/modificación
-        estate['created_at'] = estate_post.get('modified_date', '')
+    def get_estates_quantity(self):
+        # Obtener la cantidad total de propiedades del paging
+        estates_quantity = self.get_first_page_state().total
 
-        # Imágenes
-        visible_pictures = estate_post.get('visiblePictures', {})
-        pictures = visible_pictures.get('pictures', [])
-        estate['images'] = []
+        print(f"Total de propiedades encontradas: {estates_quantity}")
+        return estates_quantity
 
-        for pic in pictures:
-            estate['images'].append({
-                'url': pic.get('url730x532', ''),
-                'order': pic.get('order', 0)
-            })
+    def parse_estate(self, estate_post):
+        """
+        Parsea un diccionario JSON de una propiedad con los extractores
+        de POSTING_FIELDS (ver src/posting_fields.py)
 
-        return estate
+        Returns:
+            Estate: Propiedad parseada, con su content_hash
+        """
+        return parse_posting(estate_post)
 
     def parse_currency_value(self, text):
         try:
@@ -369,4 +657,4 @@ class Scraper:
             except:
                 feature_unit = feature[1]
             features[feature_unit] = feature[0]
-        return features
\ No newline at end of file
+        return features
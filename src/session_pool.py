@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import cloudscraper
+
+
+class SessionPool:
+    """
+    Pool de sesiones de cloudscraper compartido entre jobs del mismo proceso
+
+    Las sesiones conservan las cookies del challenge de Cloudflare y las
+    conexiones keep-alive, así que un job que toma una sesión ya usada no
+    paga el handshake TLS ni vuelve a resolver el challenge. Las sesiones
+    más viejas que max_age se descartan para no usar cookies vencidas.
+
+    Uso:
+        with session_pool.checkout() as session:
+            browser = Browser(session=session)
+    """
+
+    def __init__(self, size=2, max_age=None, factory=cloudscraper.create_scraper):
+        """
+        Args:
+            size: Máximo de sesiones ociosas que se conservan
+            max_age: Segundos de vida de una sesión (None = sin vencimiento)
+            factory: Función que crea una sesión nueva
+        """
+        self.size = size
+        self.max_age = max_age
+        self.factory = factory
+        self._idle = deque()  # (sesión, creada en)
+        self._created_at = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def _is_expired(self, created_at):
+        return self.max_age is not None and time.monotonic() - created_at > self.max_age
+
+    def _discard(self, session):
+        self.discarded += 1
+        self._created_at.pop(id(session), None)
+        session.close()
+
+    def acquire(self):
+        """
+        Toma la sesión ociosa más reciente (la más "caliente") o crea una nueva
+
+        Returns:
+            Session: Sesión de cloudscraper
+        """
+        with self._lock:
+            while self._idle:
+                session, created_at = self._idle.pop()
+                if self._is_expired(created_at):
+                    self._discard(session)
+                    continue
+                self.reused += 1
+                return session
+            self.created += 1
+
+        session = self.factory()
+        with self._lock:
+            self._created_at[id(session)] = time.monotonic()
+        return session
+
+    def release(self, session, discard=False):
+        """
+        Devuelve una sesión al pool
+
+        Args:
+            discard: Si es True la sesión se cierra en lugar de reutilizarse
+                     (p. ej. si quedó bloqueada)
+        """
+        with self._lock:
+            created_at = self._created_at.get(id(session), time.monotonic())
+            if discard or len(self._idle) >= self.size or self._is_expired(created_at):
+                self._discard(session)
+                return
+            self._idle.append((session, created_at))
+
+    @contextmanager
+    def checkout(self):
+        """
+        Context manager que toma una sesión y la devuelve al terminar. Si el
+        bloque termina con error, la sesión se descarta.
+        """
+        session = self.acquire()
+        try:
+            yield session
+        except Exception:
+            self.release(session, discard=True)
+            raise
+        self.release(session)
+
+    def warm_up(self, url):
+        """
+        Completa el pool con sesiones que ya visitaron url (y resolvieron el
+        challenge), para que el primer job tampoco pague esa latencia
+        """
+        sessions = [self.acquire() for _ in range(self.size)]
+        for session in sessions:
+            try:
+                session.get(url, timeout=30)
+            except Exception as e:
+                print(f'No se pudo precalentar una sesión: {e}')
+        for session in sessions:
+            self.release(session)
+
+    def clear(self):
+        with self._lock:
+            while self._idle:
+                session, _ = self._idle.pop()
+                self._discard(session)
+
+    def stats(self):
+        return {
+            'idle': len(self._idle),
+            'created': self.created,
+            'reused': self.reused,
+            'discarded': self.discarded
+        }
@@ -0,0 +1,65 @@
+"""
+Base de los registros persistidos en archivos SQLite locales (cola de jobs,
+checkpoints, cache de respuestas y métricas)
+
+Cada operación abre su propia conexión, por lo que un registro puede usarse
+desde cualquier thread o proceso (incluidos distintos workers de Gunicorn).
+El archivo usa WAL para que las lecturas no esperen a las escrituras.
+"""
+import os
+import sqlite3
+from contextlib import contextmanager
+
+
+class SQLiteStore:
+    """
+    Registro en un archivo SQLite
+
+    Las subclases definen sus tablas en TABLES (sentencias CREATE TABLE IF
+    NOT EXISTS) y, en MIGRATION_COLUMNS, las columnas agregadas después de
+    la primera versión de cada tabla: {tabla: {columna: tipo}}
+    """
+
+    TABLES = ()
+    MIGRATION_COLUMNS = {}
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            for create_table_sql in self.TABLES:
+                connection.execute(create_table_sql)
+
+            # Bases creadas con versiones anteriores
+            for table, migration_columns in self.MIGRATION_COLUMNS.items():
+                columns = {row['name'] for row in connection.execute(f'PRAGMA table_info({table})')}
+                for column, column_type in migration_columns.items():
+                    if column not in columns:
+                        connection.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+
+    @contextmanager
+    def _connect(self):
+        # isolation_level=None: autocommit, las transacciones se abren explícitamente
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Conexión con una transacción de escritura abierta (BEGIN IMMEDIATE):
+        se confirma al salir del bloque y se descarta si hay una excepción
+        """
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
@@ -0,0 +1,78 @@
+import threading
+import time
+
+# Ajuste adaptativo de la tasa (AIMD): ante un 429/503 se reduce a la mitad
+# y con cada respuesta OK se recupera de a un 10% de la tasa configurada
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 0.1
+# Piso de la tasa al reducirla, como fracción de la tasa configurada
+MIN_RATE_FRACTION = 1 / 8
+
+
+class RateLimiter:
+    """
+    Limitador de tasa global (requests por segundo) compartido entre threads
+
+    Es un token bucket (implementado como GCRA): cada request reserva el
+    próximo turno disponible, de modo que la tasa total se respeta sin
+    importar cuántos workers estén descargando en paralelo, y se admiten
+    hasta `burst` requests seguidos si hubo tiempo ocioso.
+
+    La tasa se adapta a las respuestas del servidor: penalize() la reduce
+    (y respeta un Retry-After) y reward() la recupera gradualmente hasta
+    la tasa configurada.
+    """
+
+    def __init__(self, requests_per_second=None, burst=1):
+        """
+        Args:
+            requests_per_second: Tasa máxima de requests. None o 0 desactiva el límite
+            burst: Requests que pueden salir seguidos tras un período ocioso
+        """
+        self.max_rate = requests_per_second or 0.0
+        self.rate = self.max_rate
+        self.min_rate = self.max_rate * MIN_RATE_FRACTION
+        self.burst = max(1, int(burst))
+        self._theoretical_arrival = 0.0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self):
+        return 1.0 / self.rate if self.rate else 0.0
+
+    def wait(self):
+        """
+        Bloquea hasta que el request actual tenga turno
+        """
+        with self._lock:
+            now = time.monotonic()
+            interval = self.interval
+            arrival = max(self._theoretical_arrival, now, self._blocked_until)
+            slot = max(now, self._blocked_until, arrival - (self.burst - 1) * interval)
+            self._theoretical_arrival = arrival + interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def penalize(self, retry_after=None):
+        """
+        Reduce la tasa tras una respuesta 429/503
+
+        Args:
+            retry_after: Segundos durante los que no se debe enviar ningún request
+        """
+        with self._lock:
+            if self.rate:
+                self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def reward(self):
+        """
+        Recupera gradualmente la tasa tras una respuesta exitosa
+        """
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * INCREASE_STEP)
@@ -1,3 +1,4 @@
+import csv
 import datetime
 import os
 import re
@@ -7,14 +8,189 @@ def remove_host_from_url(url):
     host_regex = r'(^https?://)(.*/)'
     return re.sub(host_regex, '', url)
 
-def get_filename_from_datetime(base_url, extension):
+def get_filename_from_datetime(base_url, extension, job_id=None):
     base_url_without_host = remove_host_from_url(base_url)
-    return f'data/{base_url_without_host}-{datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")}.{extension}'
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    # Con job_id, dos jobs de la misma URL en el mismo segundo no pisan su archivo
+    suffix = f'-{job_id}' if job_id else ''
+    return f'data/{base_url_without_host}-{timestamp}{suffix}.{extension}'
 
 def save_df_to_csv(df, filename):
     create_root_directory(filename)
     df.to_csv(filename, index=False)
 
+def get_estate_value(estate, column):
+    """
+    Valor de una columna para exportar
+
+    Args:
+        estate: Estate (o dict con el mismo formato)
+        column: Nombre del campo
+
+    Returns:
+        Valor del campo (None si no está). Las imágenes se devuelven como
+        lista de dicts {'url', 'order'}
+    """
+    if isinstance(estate, dict):
+        value = estate.get(column)
+    else:
+        value = getattr(estate, column, None)
+    if column == 'images' and value:
+        value = [image if isinstance(image, dict) else image.to_dict() for image in value]
+    return value
+
+
+COLUMNAR_FORMATS = {
+    'parquet': 'parquet',
+    'arrow': 'arrows',  # Arrow IPC stream
+}
+
+
+class StreamingExporter:
+    """
+    Exportador incremental de propiedades: agrega cada página al CSV (y
+    opcionalmente a un archivo columnar Parquet o Arrow IPC) apenas se
+    scrapea, con un esquema de columnas fijo.
+
+    La memoria usada no depende del tamaño de la búsqueda y, si el proceso
+    se corta, el CSV conserva todas las páginas ya escritas. El Arrow IPC
+    también es legible hasta la última página escrita; el Parquet, en
+    cambio, solo es válido después de close().
+
+    Uso:
+        with StreamingExporter('data/x.csv', ESTATE_FIELDS, columnar_format='parquet') as exporter:
+            for page_estates in scraper.iter_pages():
+                exporter.write_page(page_estates)
+    """
+
+    def __init__(self, csv_filename, columns, columnar_format=None):
+        """
+        Args:
+            csv_filename: Ruta del CSV
+            columns: Columnas a exportar, en orden (ej: ESTATE_FIELDS)
+            columnar_format: None, 'parquet' o 'arrow'
+        """
+        if columnar_format and columnar_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Formato columnar no soportado: {columnar_format}")
+
+        self.csv_filename = csv_filename
+        self.columns = list(columns)
+        self.columnar_format = columnar_format
+        self.columnar_filename = None
+        self.rows_written = 0
+
+        create_root_directory(csv_filename)
+        is_new = not os.path.exists(csv_filename) or os.path.getsize(csv_filename) == 0
+        self._csv_file = open(csv_filename, 'a', newline='', encoding='utf-8')
+        self._csv_writer = csv.writer(self._csv_file)
+        if is_new:
+            self._csv_writer.writerow(self.columns)
+            self._csv_file.flush()
+
+        self._columnar_writer = None
+        self._columnar_schema = None
+        if columnar_format:
+            self._open_columnar_writer()
+
+    def _open_columnar_writer(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("La exportación columnar requiere pyarrow: pip install pyarrow")
+
+        # Todo se exporta como texto salvo las imágenes, que son una lista de structs
+        image_type = pa.list_(pa.struct([('url', pa.string()), ('order', pa.int64())]))
+        self._columnar_schema = pa.schema([
+            (column, image_type if column == 'images' else pa.string())
+            for column in self.columns
+        ])
+
+        # Parquet y Arrow no admiten agregar a un archivo cerrado: al reanudar
+        # un job se escribe una parte nueva junto a la anterior
+        root, _ = os.path.splitext(self.csv_filename)
+        extension = COLUMNAR_FORMATS[self.columnar_format]
+        self.columnar_filename = f'{root}.{extension}'
+        part = 2
+        while os.path.exists(self.columnar_filename):
+            self.columnar_filename = f'{root}-part{part}.{extension}'
+            part += 1
+        if self.columnar_format == 'parquet':
+            self._columnar_writer = pa.parquet.ParquetWriter(self.columnar_filename, self._columnar_schema)
+        else:
+            self._columnar_writer = pa.ipc.new_stream(self.columnar_filename, self._columnar_schema)
+
+    def _write_columnar(self, columns):
+        import pyarrow as pa
+
+        def to_text(value):
+            return None if value is None else str(value)
+
+        arrays = {
+            column: values if column == 'images' else [to_text(value) for value in values]
+            for column, values in columns.items()
+        }
+
+        # Una página = un row group (Parquet) o un record batch (Arrow)
+        batch = pa.RecordBatch.from_pydict(arrays, schema=self._columnar_schema)
+        if self.columnar_format == 'parquet':
+            self._columnar_writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self._columnar_writer.write_batch(batch)
+
+    def write_page(self, estates):
+        """
+        Agrega las propiedades de una página a los archivos de salida
+
+        Returns:
+            int: Cantidad de filas escritas
+        """
+        return self.write_columns({
+            column: [get_estate_value(estate, column) for estate in estates] for column in self.columns
+        })
+
+    def write_columns(self, columns):
+        """
+        Agrega una página ya pasada a columnas (ver
+        posting_fields.parse_postings_columns)
+
+        Args:
+            columns: dict {columna: lista de valores}; las columnas que no
+                     se exportan se ignoran
+
+        Returns:
+            int: Cantidad de filas escritas
+        """
+        columns = {column: columns[column] for column in self.columns}
+        rows = len(columns[self.columns[0]]) if self.columns else 0
+        if not rows:
+            return 0
+
+        self._csv_writer.writerows(zip(*columns.values()))
+        self._csv_file.flush()
+
+        if self._columnar_writer:
+            self._write_columnar(columns)
+
+        self.rows_written += rows
+        return rows
+
+    def close(self):
+        if self._csv_file:
+            self._csv_file.close()
+            self._csv_file = None
+        if self._columnar_writer:
+            self._columnar_writer.close()
+            self._columnar_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 def parse_zonaprop_url(url):
     return url.replace('.html', '')
 
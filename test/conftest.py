@@ -1,4 +1,5 @@
 import codecs
+import os
 
 import pandas as pd
 import pytest
@@ -7,9 +8,9 @@ import pytest
 @pytest.fixture
 def html_page():
     # 'utf-8' codec can't decode byte 0xed in position 19806: invalid continuation byte
-    with codecs.open('test\\mock\\html_page.html', 'r', encoding='latin-1') as f:
+    with codecs.open(os.path.join('test', 'mock', 'html_page.html'), 'r', encoding='latin-1') as f:
         return f.read()
 
 @pytest.fixture
 def df_estates():
-    return pd.read_csv('test\\mock\\df_estates.csv')
+    return pd.read_csv(os.path.join('test', 'mock', 'df_estates.csv'))
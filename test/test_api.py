@@ -0,0 +1,121 @@
+import os
+import tempfile
+
+import pytest
+import pytest_mock
+
+# Sin workers al importar la app: los jobs solo se encolan
+os.environ.setdefault('JOB_WORKERS', '0')
+os.environ.setdefault('JOBS_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3'))
+
+import api.app
+from api.job_queue import JobStore, STATUS_QUEUED, KIND_BATCH
+
+URL = 'https://www.zonaprop.com.ar/departamentos-alquiler-palermo.html'
+
+
+@pytest.fixture
+def job_store(tmp_path, mocker: pytest_mock.MockFixture):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    mocker.patch.object(api.app, 'job_store', store)
+    mocker.patch.object(api.app, 'job_runner')
+    return store
+
+
+@pytest.fixture
+def client(job_store):
+    api.app.app.config['TESTING'] = True
+    return api.app.app.test_client()
+
+
+def test_scrape_enqueues_job(client, job_store):
+    response = client.post('/api/scrape', json={'url': URL, 'webhook_url': 'https://example.com/hook'})
+
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['status'] == STATUS_QUEUED
+    assert body['status_url'] == f'/api/jobs/{body["job_id"]}'
+    assert job_store.get(body['job_id'])['url'] == URL
+    api.app.job_runner.notify.assert_called_once()
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'data': 'url=x'},
+    {'json': {}},
+    {'json': {'url': 'https://www.example.com/'}},
+])
+def test_scrape_rejects_invalid_requests(client, job_store, kwargs):
+    response = client.post('/api/scrape', **kwargs)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert job_store.list_jobs((STATUS_QUEUED,)) == []
+
+
+def test_get_job(client):
+    job_id = client.post('/api/scrape', json={'url': URL, 'webhook_url': 'https://example.com/hook'}).get_json()['job_id']
+
+    response = client.get(f'/api/jobs/{job_id}')
+    assert response.status_code == 200
+    job = response.get_json()
+    assert job['job_id'] == job_id
+    assert job['status'] == STATUS_QUEUED
+    assert job['progress'] == {'pages_done': 0, 'pages_total': 0, 'listings_saved': 0}
+    assert 'webhook_url' not in job
+
+
+def test_get_job_not_found(client):
+    response = client.get('/api/jobs/job_inexistente')
+
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Job not found'}
+
+
+def test_list_jobs(client, job_store):
+    job_store.enqueue('job_01', URL, webhook_url='https://example.com/hook')
+    job_store.enqueue('job_02', URL)
+    job_store.claim_next(os.getpid())
+    job_store.complete('job_01', {'count': 10})
+
+    response = client.get('/api/jobs?limit=5')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [job['job_id'] for job in body['active']] == ['job_02']
+    assert [job['job_id'] for job in body['recent']] == ['job_01']
+    assert 'webhook_url' not in body['recent'][0]
+
+
+def test_scrape_batch_enqueues_unique_urls(client, job_store):
+    other_url = 'https://www.zonaprop.com.ar/casas-venta-belgrano.html'
+    response = client.post('/api/scrape/batch', json={'urls': [URL, other_url, URL]})
+
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['urls'] == 2
+    job = job_store.get(body['job_id'])
+    assert job['kind'] == KIND_BATCH
+    assert job['urls'] == [URL, other_url]
+
+
+@pytest.mark.parametrize('payload, error', [
+    ({}, 'urls must be a non-empty list'),
+    ({'urls': URL}, 'urls must be a non-empty list'),
+    ({'urls': [URL, 'https://www.example.com/']}, 'All URLs must be from zonaprop.com.ar'),
+    ({'urls': [URL, 42]}, 'All URLs must be from zonaprop.com.ar'),
+])
+def test_scrape_batch_validation(client, job_store, payload, error):
+    response = client.post('/api/scrape/batch', json=payload)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+    assert job_store.list_jobs((STATUS_QUEUED,)) == []
+
+
+def test_scrape_batch_limits_urls(client, mocker: pytest_mock.MockFixture):
+    mocker.patch.object(api.app.Config, 'BATCH_MAX_URLS', 2)
+    urls = [f'https://www.zonaprop.com.ar/p{i}.html' for i in range(3)]
+
+    response = client.post('/api/scrape/batch', json={'urls': urls})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'At most 2 URLs per batch'
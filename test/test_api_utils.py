@@ -0,0 +1,34 @@
+import threading
+
+from api.utils import generate_job_id, CROCKFORD_BASE32
+
+
+def test_generate_job_id_format():
+    job_id = generate_job_id()
+    assert job_id.startswith('job_')
+    assert len(job_id) == 30
+    assert set(job_id[4:]) <= set(CROCKFORD_BASE32)
+
+
+def test_generate_job_id_unique_and_sortable():
+    job_ids = [generate_job_id() for _ in range(10000)]
+    assert len(set(job_ids)) == len(job_ids)
+    assert job_ids == sorted(job_ids)
+
+
+def test_generate_job_id_unique_across_threads():
+    job_ids = []
+    lock = threading.Lock()
+
+    def generate():
+        ids = [generate_job_id() for _ in range(1000)]
+        with lock:
+            job_ids.extend(ids)
+
+    threads = [threading.Thread(target=generate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(job_ids)) == 8000
@@ -0,0 +1,118 @@
+import pytest
+import pytest_mock
+
+from src.batch import BatchScraper, PostingRegistry
+from src.database import SaveStats
+from src.estate import Estate
+from test.test_scraper import FakeBrowser
+
+
+class MultiSearchBrowser():
+    """
+    Sirve varias búsquedas: cada una con su cantidad de páginas. Los
+    postingId solo dependen del número de página, así que las búsquedas
+    se superponen en sus primeras páginas.
+    """
+
+    def __init__(self, html_page, pages_by_search):
+        self.browsers = {
+            search: FakeBrowser(html_page, pages_quantity) for search, pages_quantity in pages_by_search.items()
+        }
+
+    def get_text(self, url):
+        for search, browser in self.browsers.items():
+            if f'/{search}.html' in url or f'/{search}-pagina-' in url:
+                return browser.get_text(url)
+        raise Exception(f'Búsqueda desconocida: {url}')
+
+
+def test_posting_registry_claims_each_posting_once():
+    registry = PostingRegistry()
+    first, second, third = Estate(posting_id='1'), Estate(posting_id='2'), Estate(posting_id='3')
+
+    assert registry.claim([first, second]) == [first, second]
+    assert registry.claim([Estate(posting_id='2'), third]) == [third]
+    assert len(registry) == 3
+    assert registry.duplicates == 1
+
+
+def test_posting_registry_release():
+    registry = PostingRegistry()
+    first, second = Estate(posting_id='1'), Estate(posting_id='2')
+    registry.claim([first, second])
+
+    registry.release([second])
+
+    assert len(registry) == 1
+    assert registry.claim([Estate(posting_id='1'), second]) == [second]
+
+
+def test_batch_deduplicates_across_searches(html_page: str):
+    browser = MultiSearchBrowser(html_page, {'alquiler-a': 2, 'alquiler-b': 3})
+    urls = [
+        'https://www.zonaprop.com.ar/alquiler-a.html',
+        'https://www.zonaprop.com.ar/alquiler-b.html',
+        'https://www.zonaprop.com.ar/alquiler-a.html',
+    ]
+    progress = []
+    batch = BatchScraper(browser, urls, workers=2, progress_callback=lambda *totals: progress.append(totals))
+
+    exported = []
+    result = batch.run(on_page=exported.extend)
+
+    posting_ids = [estate.posting_id for estate in exported]
+    assert len(posting_ids) == len(set(posting_ids)) == 60
+    assert result['count'] == 60
+    assert result['duplicates'] == 40
+    assert [url_result['url'] for url_result in result['urls']] == [
+        'https://www.zonaprop.com.ar/alquiler-a', 'https://www.zonaprop.com.ar/alquiler-b'
+    ]
+    assert result['failed_urls'] == 0
+    assert result['throughput']['pages'] == 5
+    assert result['throughput']['listings'] == 100
+    assert result['throughput']['listings_per_second'] > 0
+    # Avance sumado de todo el lote
+    assert progress[-1][:2] == (5, 5)
+
+
+def test_batch_isolates_failing_searches(html_page: str):
+    browser = MultiSearchBrowser(html_page, {'alquiler-a': 2})
+    urls = ['https://www.zonaprop.com.ar/alquiler-a.html', 'https://www.zonaprop.com.ar/venta-x.html']
+
+    result = BatchScraper(browser, urls, workers=2).run()
+
+    assert result['count'] == 40
+    assert result['failed_urls'] == 1
+    assert 'Búsqueda desconocida' in result['urls'][1]['error']
+
+
+@pytest.mark.parametrize('writer_queue_size', [0, 4])
+def test_batch_releases_postings_not_saved(html_page: str, mocker: pytest_mock.MockFixture, writer_queue_size):
+    browser = MultiSearchBrowser(html_page, {'alquiler-a': 2, 'alquiler-b': 3})
+    urls = ['https://www.zonaprop.com.ar/alquiler-a.html', 'https://www.zonaprop.com.ar/alquiler-b.html']
+    sessions = []
+    saved = []
+
+    def session_factory():
+        sessions.append(mocker.MagicMock())
+        return sessions[-1]
+
+    def save_page_to_db(session, estates, batch_size=None):
+        # Falla la BD de la primera búsqueda
+        if session is sessions[0]:
+            raise RuntimeError('Lost connection to MySQL server')
+        saved.extend(estates)
+        stats = SaveStats()
+        stats.inserted = len(estates)
+        return stats
+
+    mocker.patch('src.database.save_page_to_db', save_page_to_db)
+    batch = BatchScraper(browser, urls, workers=1, session_factory=session_factory,
+                         db_writer_queue_size=writer_queue_size)
+
+    result = batch.run()
+
+    # Las publicaciones que alquiler-a no guardó las guarda alquiler-b
+    assert result['failed_urls'] == 1
+    assert len(saved) == len({estate.posting_id for estate in saved}) == 60
+    assert result['db_stats']['inserted'] == 60
@@ -0,0 +1,39 @@
+from benchmarks.bench_scraping import compare, percentile, TimedBrowser
+from benchmarks.fake_server import FakeZonaPropServer, FakeZonaPropSite
+from src.scraper import Scraper
+
+
+def test_fake_server_serves_paginated_search():
+    with FakeZonaPropServer(FakeZonaPropSite(listings=45, page_size=20)) as server:
+        browser = TimedBrowser(requests_per_second=None)
+        scraper = Scraper(browser, server.search_url(), concurrency=2)
+        estates = scraper.scrap_website()
+
+    assert len(estates) == 45
+    assert len({estate.posting_id for estate in estates}) == 45
+    assert len(browser.latencies) == 3
+    assert server.requests_served == 3
+
+
+def test_fake_server_page_out_of_range_is_empty():
+    site = FakeZonaPropSite(listings=10, page_size=20)
+
+    assert site.build_state(2)['listStore']['listPostings'] == []
+
+
+def test_percentile():
+    values = list(range(1, 101))
+
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.99) == 7
+
+
+def test_compare_flags_regressions():
+    previous = {'metrics': {'pages_per_second': 10.0, 'peak_rss_mb': 100.0}}
+    results = {'metrics': {'pages_per_second': 8.0, 'peak_rss_mb': 90.0}}
+
+    differences = compare(results, previous)
+
+    assert differences['pages_per_second'] == (10.0, 8.0, -0.2, True)
+    assert differences['peak_rss_mb'][3] is False
@@ -1,5 +1,9 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
-from src.browser import Browser
+from src.browser import Browser, BrowserError, parse_retry_after
 
 
 @pytest.fixture
@@ -10,3 +14,185 @@ def browser():
 class TestBrowser():
     def test_browser(self, browser):
         assert browser.get_text('https://www.google.com') is not None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Responde en orden las respuestas programadas para cada path:
+    (status, headers, demora en segundos)
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, time.monotonic()))
+            server.request_headers.append(dict(self.headers))
+            responses = server.responses.get(self.path, [])
+            status, headers, delay = responses.pop(0) if len(responses) > 1 else responses[0]
+
+        if delay:
+            time.sleep(delay)
+
+        body = b'' if status == 304 else f'respuesta {status}'.encode()
+        try:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.request_headers = []
+    server.responses = {}
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def stub_browser(**kwargs):
+    options = dict(requests_per_second=None, timeout=2, max_retries=3, backoff_base=0.01, backoff_max=0.05)
+    options.update(kwargs)
+    return Browser(**options)
+
+
+def test_retries_throttled_responses_honoring_retry_after(stub_server):
+    stub_server.responses['/page'] = [(429, {'Retry-After': '0.3'}, 0), (503, {}, 0), (200, {}, 0)]
+    browser = stub_browser(requests_per_second=50)
+
+    assert browser.get_text(f'{stub_server.url}/page') == 'respuesta 200'
+
+    times = [request_time for _, request_time in stub_server.requests]
+    assert len(times) == 3
+    assert times[1] - times[0] >= 0.29
+    # Tras dos respuestas de throttling la tasa quedó reducida
+    assert browser.rate_limiter.rate < 50
+
+
+def test_gives_up_after_max_retries(stub_server):
+    stub_server.responses['/down'] = [(503, {}, 0)]
+    browser = stub_browser(max_retries=2)
+
+    with pytest.raises(BrowserError) as error:
+        browser.get_text(f'{stub_server.url}/down')
+
+    assert error.value.status_code == 503
+    assert len(stub_server.requests) == 3
+    assert browser.stats()['http_requests'] == 3
+    assert browser.stats()['http_retries'] == 2
+
+
+def test_does_not_retry_client_errors(stub_server):
+    stub_server.responses['/missing'] = [(404, {}, 0)]
+
+    with pytest.raises(BrowserError) as error:
+        stub_browser().get_text(f'{stub_server.url}/missing')
+
+    assert error.value.status_code == 404
+    assert len(stub_server.requests) == 1
+
+
+def test_retries_timeouts(stub_server):
+    stub_server.responses['/slow'] = [(200, {}, 1), (200, {}, 0)]
+
+    assert stub_browser(timeout=0.2).get_text(f'{stub_server.url}/slow') == 'respuesta 200'
+    assert len(stub_server.requests) == 2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('no es una fecha') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+
+
+def test_uses_given_session(stub_server):
+    stub_server.responses['/page'] = [(200, {}, 0)]
+    session = stub_browser().scraper
+
+    browser = stub_browser(session=session)
+    browser.get_text(f'{stub_server.url}/page')
+
+    assert browser.scraper is session
+
+
+def test_response_cache_avoids_network(stub_server, tmp_path):
+    from src.response_cache import ResponseCache
+
+    stub_server.responses['/page'] = [(200, {}, 0)]
+    cache = ResponseCache(str(tmp_path))
+
+    assert stub_browser(cache=cache).get_text(f'{stub_server.url}/page') == 'respuesta 200'
+    # Replay: otro browser en modo solo cache no accede a la red
+    replay = stub_browser(cache=cache, cache_only=True)
+    assert replay.get_text(f'{stub_server.url}/page') == 'respuesta 200'
+    assert len(stub_server.requests) == 1
+
+    with pytest.raises(BrowserError):
+        replay.get_text(f'{stub_server.url}/otra')
+    assert len(stub_server.requests) == 1
+
+
+def test_conditional_get(stub_server):
+    stub_server.responses['/page'] = [(200, {'ETag': '"v1"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}, 0),
+                                      (304, {}, 0)]
+    browser = stub_browser()
+
+    text, etag, last_modified = browser.get_conditional(f'{stub_server.url}/page')
+    assert (text, etag, last_modified) == ('respuesta 200', '"v1"', 'Wed, 21 Oct 2015 07:28:00 GMT')
+
+    assert browser.get_conditional(f'{stub_server.url}/page', etag, last_modified) == (None, etag, last_modified)
+    assert stub_server.request_headers[1]['If-None-Match'] == '"v1"'
+    assert stub_server.request_headers[1]['If-Modified-Since'] == last_modified
+
+
+def test_conditional_get_uses_cache_and_keeps_validators(stub_server, tmp_path):
+    from src.response_cache import ResponseCache
+
+    stub_server.responses['/page'] = [(200, {'ETag': '"v1"', 'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}, 0)]
+    cache = ResponseCache(str(tmp_path))
+    expected = ('respuesta 200', '"v1"', 'Wed, 21 Oct 2015 07:28:00 GMT')
+
+    assert stub_browser(cache=cache).get_conditional(f'{stub_server.url}/page') == expected
+    # Del cache vuelven también el ETag y el Last-Modified guardados
+    replay = stub_browser(cache=cache, cache_only=True)
+    assert replay.get_conditional(f'{stub_server.url}/page') == expected
+    assert len(stub_server.requests) == 1
+
+
+def test_conditional_get_cache_only_does_not_use_network(stub_server, tmp_path):
+    from src.response_cache import ResponseCache
+
+    stub_server.responses['/page'] = [(200, {}, 0)]
+    browser = stub_browser(cache=ResponseCache(str(tmp_path)), cache_only=True)
+
+    with pytest.raises(BrowserError, match='modo solo cache'):
+        browser.get_conditional(f'{stub_server.url}/page')
+    assert stub_server.requests == []
+
+
+def test_challenge_pages_are_not_cached(stub_server, tmp_path):
+    from src.extractor import has_preloaded_state
+    from src.response_cache import ResponseCache
+
+    # Un 200 sin PRELOADED_STATE (challenge de Cloudflare): se devuelve pero no se guarda
+    stub_server.responses['/page'] = [(200, {}, 0)]
+    cache = ResponseCache(str(tmp_path), validator=has_preloaded_state)
+
+    assert stub_browser(cache=cache).get_text(f'{stub_server.url}/page') == 'respuesta 200'
+    assert stub_browser(cache=cache).get_conditional(f'{stub_server.url}/page')[0] == 'respuesta 200'
+    assert cache.get(f'{stub_server.url}/page') is None
+    assert len(stub_server.requests) == 2
@@ -0,0 +1,109 @@
+import pytest
+
+from src.checkpoint import CheckpointStore
+
+BASE_URL = 'https://www.zonaprop.com.ar/departamentos-alquiler'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+
+
+def test_mark_pages_and_finish(store):
+    store.create(BASE_URL, 'job_a', 'data/a.csv')
+    store.update_total(BASE_URL, 'job_a', 45, 3)
+    store.mark_page_done(BASE_URL, 'job_a', 1, 20)
+    store.mark_page_done(BASE_URL, 'job_a', 2, 20)
+
+    checkpoint = store.get(BASE_URL, 'job_a')
+    assert checkpoint['completed_pages'] == {1: 20, 2: 20}
+    assert (checkpoint['total'], checkpoint['pages_total']) == (45, 3)
+    assert store.find_resumable(BASE_URL, 'job_a')['job_id'] == 'job_a'
+
+    store.finish(BASE_URL, 'job_a')
+    assert store.get(BASE_URL, 'job_a')['finished']
+    assert store.find_resumable(BASE_URL, 'job_a') is None
+
+
+def test_find_resumable_prefers_own_job(store):
+    store.create(BASE_URL, 'job_a')
+    store.create(BASE_URL, 'job_b')
+    store.create(BASE_URL + '-otra', 'job_c')
+    store.mark_page_done(BASE_URL, 'job_b', 1, 20)
+
+    checkpoint = store.find_resumable(BASE_URL, 'job_a', is_abandoned=lambda owner: True)
+    assert (checkpoint['job_id'], checkpoint['resumed_from']) == ('job_a', None)
+    # Sin checkpoint propio, el más reciente de la misma URL
+    assert store.find_resumable(BASE_URL, 'job_z', is_abandoned=lambda owner: True)['resumed_from'] == 'job_b'
+    assert store.find_resumable(BASE_URL + '-nueva', 'job_z', is_abandoned=lambda owner: True) is None
+
+
+def test_find_resumable_skips_jobs_still_running(store):
+    store.create(BASE_URL, 'job_a')
+    store.mark_page_done(BASE_URL, 'job_a', 1, 20)
+    store.create(BASE_URL, 'job_b')
+
+    # Sin is_abandoned no se toma el checkpoint de otro job
+    assert store.find_resumable(BASE_URL, 'job_z') is None
+    # job_b (el más reciente) sigue corriendo: se reanuda el de job_a
+    checkpoint = store.find_resumable(BASE_URL, 'job_z', is_abandoned=lambda owner: owner == 'job_a')
+    assert checkpoint['resumed_from'] == 'job_a'
+    assert checkpoint['completed_pages'] == {1: 20}
+
+
+def test_find_resumable_takes_over_checkpoint(store):
+    store.create(BASE_URL, 'job_a', 'data/a.csv')
+    store.mark_page_done(BASE_URL, 'job_a', 1, 20)
+
+    checkpoint = store.find_resumable(BASE_URL, 'job_b', is_abandoned=lambda owner: True)
+    assert (checkpoint['job_id'], checkpoint['output_file']) == ('job_b', 'data/a.csv')
+    assert store.get(BASE_URL, 'job_a') is None
+
+    # Otro job que reanuda después no toma el mismo checkpoint
+    assert store.find_resumable(BASE_URL, 'job_c', is_abandoned=lambda owner: owner == 'job_a') is None
+
+
+def test_create_resets_pages(store):
+    store.create(BASE_URL, 'job_a')
+    store.mark_page_done(BASE_URL, 'job_a', 1, 20)
+
+    assert store.create(BASE_URL, 'job_a')['completed_pages'] == {}
+
+
+def test_page_snapshots(store):
+    store.save_snapshot(BASE_URL, 2, {'1001': 'hash-a', '1002': 'hash-b'}, etag='"v1"')
+    store.save_snapshot(BASE_URL, 2, {'1001': 'hash-c'}, last_modified='Wed, 01 May 2024 10:00:00 GMT')
+    store.save_snapshot(BASE_URL + '-otra', 1, {'2001': 'hash-d'})
+
+    assert store.load_snapshots(BASE_URL) == {
+        2: {'postings': {'1001': 'hash-c'}, 'etag': None, 'last_modified': 'Wed, 01 May 2024 10:00:00 GMT'}
+    }
+    assert store.load_snapshots(BASE_URL + '-nueva') == {}
+
+
+def test_heartbeat_tells_live_owners_from_stale_ones(store, mocker):
+    store.create(BASE_URL, 'cli-a')
+    store.mark_page_done(BASE_URL, 'cli-a', 1, 20)
+    assert not store.is_stale(BASE_URL, 'cli-a')
+    assert store.is_stale(BASE_URL, 'cli-inexistente')
+
+    def is_abandoned(owner):
+        return store.is_stale(BASE_URL, owner, timeout=60)
+
+    # Una ejecución en paralelo sigue latiendo: su checkpoint no se reanuda
+    assert store.find_resumable(BASE_URL, 'cli-b', is_abandoned=is_abandoned) is None
+
+    # Pasado el timeout sin latidos se da por caída
+    now = mocker.patch('time.time', return_value=store.get(BASE_URL, 'cli-a')['heartbeat_at'] + 61)
+    checkpoint = store.find_resumable(BASE_URL, 'cli-b', is_abandoned=is_abandoned)
+    assert (checkpoint['resumed_from'], checkpoint['completed_pages']) == ('cli-a', {1: 20})
+
+    # El nuevo dueño queda vivo desde que toma el checkpoint
+    assert checkpoint['heartbeat_at'] == now.return_value
+    assert not store.is_stale(BASE_URL, 'cli-b')
+
+    now.return_value += 61
+    assert store.is_stale(BASE_URL, 'cli-b')
+    store.heartbeat(BASE_URL, 'cli-b')
+    assert not store.is_stale(BASE_URL, 'cli-b')
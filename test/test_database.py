@@ -0,0 +1,298 @@
+import threading
+
+import pytest
+import pytest_mock
+from sqlalchemy import UniqueConstraint, create_engine, select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import Select
+
+from benchmarks.common import synthetic_estates
+from src import database
+from src.estate import EstateImage
+from src.models import Base, SourceData, Image, Property
+
+
+@pytest.fixture(autouse=True)
+def clear_identity_cache():
+    database.identity_cache.clear()
+    yield
+    database.identity_cache.clear()
+
+
+def mock_session(mocker, estates, stored_rows=()):
+    """
+    Sesión falsa: stored_rows son las propiedades ya guardadas
+    (publication_id, id, content_hash). No hay imágenes guardadas y las
+    propiedades nuevas reciben IDs consecutivos.
+    """
+    property_ids = [(int(estate.posting_id), i + 1) for i, estate in enumerate(estates)]
+
+    def execute(statement, *args, **kwargs):
+        result = mocker.MagicMock()
+        if isinstance(statement, Select):
+            if Image.__table__ in statement.get_final_froms():
+                result.all.return_value = []
+            elif len(statement.selected_columns) == 3:
+                result.all.return_value = list(stored_rows)
+            else:
+                result.all.return_value = property_ids
+        return result
+
+    session = mocker.MagicMock()
+    session.execute.side_effect = execute
+    mocker.patch('src.database.get_or_create_source', return_value=SourceData(id=1))
+    return session
+
+
+def test_property_upsert_compiles_to_mysql_multi_row_statement():
+    estates = synthetic_estates(3)
+    rows = [database.build_estate_values(estate, 1)[1] for estate in estates]
+
+    compiled = database.upsert_statement(Property, rows, database.PROPERTY_UPDATE_COLUMNS).compile(
+        dialect=mysql.dialect()
+    )
+    sql = str(compiled)
+    insert_sql, update_sql = sql.split(' ON DUPLICATE KEY UPDATE ')
+
+    # Un único INSERT con una fila de VALUES por propiedad
+    columns = insert_sql[insert_sql.index('(') + 1:insert_sql.index(')')].split(', ')
+    row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    assert insert_sql.startswith('INSERT INTO properties (')
+    assert insert_sql.endswith('VALUES ' + ', '.join([row_sql] * 3))
+    assert [compiled.params[f'publication_id_m{i}'] for i in range(3)] == [
+        int(estate.posting_id) for estate in estates
+    ]
+    assert compiled.params['content_hash_m2'] == estates[2].content_hash
+
+    # Ante un duplicado se actualizan solo PROPERTY_UPDATE_COLUMNS, con el valor nuevo
+    assert sorted(update_sql.split(', ')) == sorted(
+        f'{column} = VALUES({column})' for column in database.PROPERTY_UPDATE_COLUMNS
+    )
+
+    # El duplicado lo detecta la clave única (publication_id, source_id), que no se actualiza
+    unique_keys = [
+        tuple(column.name for column in constraint.columns)
+        for constraint in Property.__table__.constraints if isinstance(constraint, UniqueConstraint)
+    ]
+    assert unique_keys == [('publication_id', 'source_id')]
+    assert {'publication_id', 'source_id'} <= set(columns)
+    assert not {'publication_id', 'source_id'} & set(database.PROPERTY_UPDATE_COLUMNS)
+
+
+def test_save_page_to_db_one_commit_per_batch(mocker: pytest_mock.MockFixture):
+    estates = synthetic_estates(40)
+    session = mock_session(mocker, estates)
+
+    stats = database.save_page_to_db(session, estates, batch_size=20)
+
+    assert stats.as_dict() == {'inserted': 40, 'updated': 0, 'unchanged': 0, 'failed': 0}
+    assert session.commit.call_count == 2
+    # Por lote: select huellas, upsert publishers, upsert propiedades, select IDs, select e insert de imágenes
+    assert session.execute.call_count == 12
+
+
+def test_save_page_to_db_skips_estates_without_publisher(mocker: pytest_mock.MockFixture):
+    estates = synthetic_estates(3)
+    estates[1].publisher_id = ''
+    session = mock_session(mocker, estates)
+
+    stats = database.save_page_to_db(session, estates)
+
+    assert stats.saved == 2
+    assert stats.failed == 1
+    assert session.commit.call_count == 1
+
+
+def test_save_page_to_db_skips_only_malformed_estates(mocker: pytest_mock.MockFixture):
+    estates = synthetic_estates(4)
+    session = mock_session(mocker, estates)
+    estates[0].posting_id = 'no-numérico'
+    estates[2].title = None
+
+    stats = database.save_page_to_db(session, estates)
+
+    # Las propiedades mal formadas se descartan antes del upsert; el resto se guarda
+    assert stats.as_dict() == {'inserted': 2, 'updated': 0, 'unchanged': 0, 'failed': 2}
+    session.rollback.assert_not_called()
+    assert session.commit.call_count == 1
+
+
+def test_save_page_to_db_rolls_back_and_raises_failed_batch(mocker: pytest_mock.MockFixture):
+    estates = synthetic_estates(2)
+    session = mock_session(mocker, estates)
+    session.execute.side_effect = Exception('Lost connection to MySQL server')
+
+    # El error se propaga: la página no se da por guardada
+    with pytest.raises(Exception, match='Lost connection'):
+        database.save_page_to_db(session, estates)
+
+    session.rollback.assert_called_once()
+    session.commit.assert_not_called()
+
+
+def test_save_page_to_db_skips_known_publishers(mocker: pytest_mock.MockFixture):
+    estates = synthetic_estates(20, publishers_quantity=5)
+    session = mock_session(mocker, estates)
+
+    database.save_page_to_db(session, estates)
+    session.execute.reset_mock()
+    database.save_page_to_db(session, estates)
+
+    # Sin upsert de publishers: select huellas, propiedades, select IDs, select e insert de imágenes
+    assert session.execute.call_count == 5
+
+
+def test_save_page_to_db_skips_unchanged_estates(mocker: pytest_mock.MockFixture):
+    estates = synthetic_estates(20)
+    stored_rows = [(int(estate.posting_id), i + 1, estate.content_hash) for i, estate in enumerate(estates)]
+    session = mock_session(mocker, estates, stored_rows)
+
+    stats = database.save_page_to_db(session, estates)
+
+    assert stats.as_dict() == {'inserted': 0, 'updated': 0, 'unchanged': 20, 'failed': 0}
+    # Solo la consulta de huellas, sin escrituras ni commit
+    assert session.execute.call_count == 1
+    session.commit.assert_not_called()
+    # La transacción de lectura se cierra para devolver la conexión al pool
+    session.rollback.assert_called_once()
+
+
+def test_save_page_to_db_updates_changed_estates(mocker: pytest_mock.MockFixture):
+    estates = synthetic_estates(3)
+    stored_rows = [(int(estate.posting_id), i + 1, estate.content_hash) for i, estate in enumerate(estates[:2])]
+    stored_rows[0] = (stored_rows[0][0], 1, 'old-hash')
+    session = mock_session(mocker, estates, stored_rows)
+
+    stats = database.save_page_to_db(session, estates)
+
+    assert stats.as_dict() == {'inserted': 1, 'updated': 1, 'unchanged': 1, 'failed': 0}
+    session.commit.assert_called_once()
+
+
+def test_identity_cache_lru_eviction():
+    cache = database.IdentityCache(max_size=2)
+    cache.add('publisher', 1)
+    cache.add('publisher', 2)
+    assert cache.contains('publisher', 1)
+    cache.add('publisher', 3)
+
+    assert not cache.contains('publisher', 2)
+    assert cache.contains('publisher', 1)
+    assert cache.contains('publisher', 3)
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'size': 2}
+
+
+def test_identity_cache_ttl(mocker: pytest_mock.MockFixture):
+    now = mocker.patch('src.database.time.monotonic', return_value=100.0)
+    cache = database.IdentityCache(ttl=60)
+    cache.add('source', 1)
+
+    now.return_value = 159.0
+    assert cache.contains('source', 1)
+    now.return_value = 161.0
+    assert not cache.contains('source', 1)
+    assert cache.stats()['size'] == 0
+
+
+@pytest.fixture
+def images_session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine, tables=[SourceData.__table__, Image.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def stored_images(session, property_id):
+    return sorted(session.execute(
+        select(Image.image_url, Image.order).where(Image.property_id == property_id)
+    ).all())
+
+
+def test_sync_images_inserts_and_deletes_only_differences(images_session):
+    first_scrape = {
+        1: [EstateImage('a.jpg', 0), EstateImage('b.jpg', 1)],
+        2: [EstateImage('c.jpg', 0)],
+    }
+    assert database.sync_images(images_session, 1, first_scrape) == (3, 0)
+    images_session.commit()
+    unchanged_ids = images_session.execute(select(Image.id).where(Image.property_id == 2)).scalars().all()
+
+    second_scrape = {
+        1: [EstateImage('a.jpg', 0), EstateImage('d.jpg', 1)],
+        2: [EstateImage('c.jpg', 0)],
+    }
+    assert database.sync_images(images_session, 1, second_scrape) == (1, 1)
+    images_session.commit()
+
+    assert stored_images(images_session, 1) == [('a.jpg', 0), ('d.jpg', 1)]
+    assert images_session.execute(select(Image.id).where(Image.property_id == 2)).scalars().all() == unchanged_ids
+    assert database.sync_images(images_session, 1, second_scrape) == (0, 0)
+
+
+def test_sync_images_removes_duplicates(images_session):
+    images_session.add_all([
+        Image(property_id=1, source_id=1, image_url='a.jpg', order=0),
+        Image(property_id=1, source_id=1, image_url='a.jpg', order=0),
+    ])
+    images_session.commit()
+
+    assert database.sync_images(images_session, 1, {1: [EstateImage('a.jpg', 0)]}) == (0, 1)
+    assert stored_images(images_session, 1) == [('a.jpg', 0)]
+
+
+@pytest.fixture
+def process_engine(tmp_path, monkeypatch):
+    """
+    Engine del proceso apuntando a un SQLite en archivo (usa QueuePool,
+    como MySQL)
+    """
+    monkeypatch.setattr(database, 'DATABASE_URL', f"sqlite:///{tmp_path / 'pool.db'}")
+    monkeypatch.setattr(database, '_engine', None)
+    yield
+    database.release_session()
+    database.dispose_engine()
+    database.SessionLocal.configure(bind=None)
+
+
+def test_get_engine_uses_pool_options(process_engine):
+    engine = database.get_engine()
+
+    assert database.get_engine() is engine
+    assert engine.pool.size() == database.DB_POOL_SIZE
+    assert engine.pool._recycle == database.DB_POOL_RECYCLE
+    assert engine.pool._pre_ping == database.DB_POOL_PRE_PING
+
+
+def test_get_session_is_scoped_per_thread(process_engine):
+    session = database.get_session()
+    assert database.get_session() is session
+
+    other_thread_sessions = []
+    thread = threading.Thread(target=lambda: other_thread_sessions.append(database.get_session()))
+    thread.start()
+    thread.join()
+    assert other_thread_sessions[0] is not session
+
+    database.release_session()
+    assert database.get_session() is not session
+
+
+def test_session_returns_connection_to_pool_after_transaction(process_engine):
+    session = database.get_session()
+    session.execute(select(1))
+    assert database.pool_stats()['checked_out'] == 1
+
+    session.rollback()
+    assert database.pool_stats()['checked_out'] == 0
+
+
+def test_reset_after_fork_discards_inherited_pool(mocker: pytest_mock.MockFixture, monkeypatch):
+    engine = mocker.MagicMock()
+    monkeypatch.setattr(database, '_engine', engine)
+
+    database._reset_after_fork()
+
+    # Las conexiones heredadas son del padre: no se cierran desde el hijo
+    engine.dispose.assert_called_once_with(close=False)
@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+import pytest_mock
+
+from benchmarks.common import synthetic_estates
+from src.database import SaveStats
+from src.db_writer import DatabaseWriter, DatabaseWriterError
+from src.metrics import JobMetrics, MetricsRegistry
+
+
+class FakeSave:
+    """
+    Reemplazo de save_page_to_db que registra cada escritura y, si se
+    indica, bloquea la primera hasta que se libera (BD lenta)
+    """
+
+    def __init__(self, block_first=False):
+        self.calls = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+        if not block_first:
+            self.release.set()
+
+    def __call__(self, session, estates, batch_size):
+        self.started.set()
+        self.release.wait(5)
+        self.calls.append(len(estates))
+        stats = SaveStats()
+        stats.inserted = len(estates)
+        return stats
+
+
+@pytest.fixture
+def fake_save(mocker: pytest_mock.MockFixture):
+    save = FakeSave(block_first=True)
+    mocker.patch('src.database.save_page_to_db', save)
+    return save
+
+
+def test_groups_queued_pages_into_batches(fake_save):
+    writer = DatabaseWriter(session=None, queue_size=10, batch_size=50).start()
+    writer.submit(synthetic_estates(20))
+    fake_save.started.wait(5)
+
+    # Mientras se guarda la primera página, las siguientes esperan en la cola
+    for _ in range(4):
+        writer.submit(synthetic_estates(20))
+    fake_save.release.set()
+    stats = writer.drain()
+
+    # 20 (sola) + 60 (tres páginas hasta superar 50) + 20
+    assert fake_save.calls == [20, 60, 20]
+    assert stats.inserted == 100
+    assert writer.submitted == writer.pages_saved == 5
+    assert writer.writes == 3
+
+
+def test_submit_blocks_when_queue_is_full(fake_save):
+    writer = DatabaseWriter(session=None, queue_size=1).start()
+    writer.submit(synthetic_estates(5))
+    fake_save.started.wait(5)
+    writer.submit(synthetic_estates(5))  # ocupa la cola
+
+    blocked = threading.Thread(target=writer.submit, args=(synthetic_estates(5),))
+    blocked.start()
+    blocked.join(0.3)
+    assert blocked.is_alive()
+    assert writer.pages_saved == 0
+
+    fake_save.release.set()
+    blocked.join(5)
+    assert not blocked.is_alive()
+    assert writer.drain().inserted == 15
+
+
+def test_writer_error_is_raised_in_job_thread(mocker: pytest_mock.MockFixture):
+    mocker.patch('src.database.save_page_to_db', side_effect=RuntimeError('MySQL server has gone away'))
+    writer = DatabaseWriter(session=None, queue_size=1).start()
+    writer.submit(synthetic_estates(5))
+
+    with pytest.raises(DatabaseWriterError, match='gone away'):
+        # El writer deja de consumir: submit no queda bloqueado con la cola llena
+        for _ in range(3):
+            writer.submit(synthetic_estates(5))
+    with pytest.raises(DatabaseWriterError):
+        writer.drain()
+    assert writer.pages_saved == 0
+
+
+def test_records_writes_in_job_metrics(mocker: pytest_mock.MockFixture):
+    mocker.patch('src.database.save_page_to_db', FakeSave())
+    job_metrics = JobMetrics('job_1', MetricsRegistry())
+    writer = DatabaseWriter(session=None, job_metrics=job_metrics).start()
+    writer.submit(synthetic_estates(7))
+    writer.drain()
+
+    totals = job_metrics.as_dict()
+    assert totals['rows_written']['db'] == 7
+    assert totals['stage_seconds']['db_write'] >= 0
+    assert 'zonaprop_rows_written_total{target="db"} 7' in job_metrics.registry.render_all()
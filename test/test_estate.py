@@ -0,0 +1,61 @@
+import os
+import pickle
+import shutil
+
+import pytest
+
+from benchmarks.common import load_example_post
+from src.estate import Estate, EstateImage, ESTATE_FIELDS
+from src.scraper import Scraper
+from src.utils import StreamingExporter
+
+
+def teardown_function(function):
+    if os.path.exists('data'):
+        shutil.rmtree('data')
+
+
+def test_estate_defaults():
+    estate = Estate(posting_id='1')
+
+    assert estate.posting_id == '1'
+    assert estate.title == ''
+    assert estate.sell_price is None
+    assert estate.images == []
+    assert not hasattr(estate, '__dict__')
+
+
+def test_estate_rejects_unknown_fields():
+    with pytest.raises(TypeError):
+        Estate(posting_id='1', precio=100)
+
+
+def test_estate_to_dict_keeps_previous_format():
+    estate = Scraper(None, '').parse_estate(load_example_post())
+    data = estate.to_dict()
+
+    assert tuple(data) == ESTATE_FIELDS
+    assert data['posting_id'] == estate.posting_id
+    assert data['images'][0] == {'url': estate.images[0].url, 'order': estate.images[0].order}
+
+
+def test_estate_survives_pickle():
+    estate = Estate(posting_id='1', images=[EstateImage('a.jpg', 0)])
+
+    assert pickle.loads(pickle.dumps(estate)) == estate
+
+
+def test_streaming_exporter_writes_estates():
+    filename = 'data/test_estates.csv'
+    columns = ('posting_id', 'sell_price', 'images')
+    estate = Estate(posting_id='1', sell_price=100, images=[EstateImage('a.jpg', 0)])
+
+    with StreamingExporter(filename, columns) as exporter:
+        exporter.write_page([estate, Estate(posting_id='2')])
+
+    with open(filename, encoding='utf-8') as f:
+        assert f.read().splitlines() == [
+            'posting_id,sell_price,images',
+            "1,100,\"[{'url': 'a.jpg', 'order': 0}]\"",
+            '2,,[]',
+        ]
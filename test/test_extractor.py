@@ -0,0 +1,55 @@
+import json
+
+from src import extractor
+from src.extractor import extract_preloaded_state, has_preloaded_state
+
+
+def build_page(state):
+    return (
+        '<html><head></head><body>'
+        '<script id="preloadedData">\n\t\t\twindow.__PRELOADED_STATE__ = '
+        f'{json.dumps(state)};\n\t\t\twindow.__SITE_DATA__ = {{"name":"zonaprop"}};'
+        '</script></body></html>'
+    )
+
+
+def test_extract_preloaded_state_from_mock(html_page):
+    data = extract_preloaded_state(html_page)
+    assert data['listStore']['paging']['total'] == 15217
+    assert len(data['listStore']['listPostings']) == 20
+
+
+def test_extract_preloaded_state_braces_inside_strings():
+    state = {'listStore': {'listPostings': [
+        {'postingId': '1', 'descriptionNormalized': 'Ambientes {amplios}} con "vista" \\ al río'},
+        {'postingId': '2', 'title': '{{{'},
+    ]}}
+    assert extract_preloaded_state(build_page(state)) == state
+
+
+def test_extract_preloaded_state_bytes():
+    state = {'listStore': {'paging': {'total': 3}}}
+    assert extract_preloaded_state(build_page(state).encode('utf-8')) == state
+
+
+def test_extract_preloaded_state_missing():
+    assert extract_preloaded_state('<html><script>var a = 1;</script></html>') is None
+    assert extract_preloaded_state('<script id="preloadedData">var a = 1;</script>') is None
+
+
+def test_has_preloaded_state_does_not_decode(html_page, mocker):
+    raw_decode = mocker.spy(extractor._decoder, 'raw_decode')
+
+    assert has_preloaded_state(html_page)
+    assert has_preloaded_state(build_page({'listStore': {}}).encode('utf-8'))
+    raw_decode.assert_not_called()
+
+
+def test_has_preloaded_state_rejects_challenge_and_truncated_pages(html_page):
+    assert not has_preloaded_state('<html><body>Just a moment...</body></html>')
+    assert not has_preloaded_state('<script id="preloadedData">var a = 1;</script>')
+    assert not has_preloaded_state('<script id="preloadedData">window.__PRELOADED_STATE__ = null;</script>')
+
+    # Respuesta cortada a mitad del JSON: falta el </script> de cierre
+    truncated = html_page[:html_page.index('window.__PRELOADED_STATE__') + 5000]
+    assert not has_preloaded_state(truncated)
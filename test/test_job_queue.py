@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from api.job_queue import (
+    JobStore, JobRunner, STATUS_QUEUED, STATUS_RUNNING, STATUS_COMPLETED, STATUS_FAILED,
+    ACTIVE_STATUSES, FINISHED_STATUSES, KIND_SCRAPE, KIND_BATCH
+)
+
+
+@pytest.fixture
+def job_store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.sqlite3'))
+
+
+def wait_for_status(job_store, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_store.get(job_id)
+        if job['status'] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'{job_id} no llegó a {status}: {job_store.get(job_id)}')
+
+
+def test_claim_next_is_fifo_and_exclusive(job_store):
+    job_store.enqueue('job_a', 'https://www.zonaprop.com.ar/a.html')
+    job_store.enqueue('job_b', 'https://www.zonaprop.com.ar/b.html')
+
+    assert job_store.claim_next(os.getpid())['job_id'] == 'job_a'
+    assert job_store.claim_next(os.getpid())['job_id'] == 'job_b'
+    assert job_store.claim_next(os.getpid()) is None
+    assert job_store.get('job_a')['status'] == STATUS_RUNNING
+
+
+def stop_heartbeat(job_store, job_id):
+    """
+    Simula un worker caído: el último latido del job quedó viejo
+    """
+    job_store._update(job_id, heartbeat_at=time.time() - job_store.heartbeat_timeout - 1)
+
+
+def test_requeue_orphans(job_store):
+    job_store.enqueue('job_a', 'https://www.zonaprop.com.ar/a.html')
+    job_store.enqueue('job_b', 'https://www.zonaprop.com.ar/b.html')
+    job_store.claim_next(os.getpid())
+    job_store.claim_next(os.getpid())
+    stop_heartbeat(job_store, 'job_b')
+
+    assert job_store.requeue_orphans() == 1
+    assert job_store.get('job_a')['status'] == STATUS_RUNNING
+    assert job_store.get('job_b')['status'] == STATUS_QUEUED
+    # Los jobs interrumpidos continúan desde su checkpoint
+    assert job_store.get('job_a')['resume'] is False
+    assert job_store.get('job_b')['resume'] is True
+
+
+def test_requeue_orphans_fails_job_after_max_attempts(tmp_path):
+    job_store = JobStore(str(tmp_path / 'jobs.sqlite3'), max_attempts=2)
+    job_store.enqueue('job_a', 'https://www.zonaprop.com.ar/a.html')
+
+    job_store.claim_next(os.getpid())
+    stop_heartbeat(job_store, 'job_a')
+    assert job_store.requeue_orphans() == 1
+    assert job_store.get('job_a')['attempts'] == 1
+
+    # Segundo intento: el worker vuelve a caerse y el job no se re-encola más
+    job_store.claim_next(os.getpid())
+    stop_heartbeat(job_store, 'job_a')
+    assert job_store.requeue_orphans() == 0
+    job = job_store.get('job_a')
+    assert job['status'] == STATUS_FAILED
+    assert job['attempts'] == 2
+    assert 'interrumpido 2 veces' in job['error']
+    assert job_store.claim_next(os.getpid()) is None
+
+
+def test_is_abandoned(job_store):
+    for job_id in ('job_a', 'job_b', 'job_c', 'job_d'):
+        job_store.enqueue(job_id, f'https://www.zonaprop.com.ar/{job_id}.html')
+    job_store.claim_next(os.getpid())
+    job_store.claim_next(os.getpid())
+    job_store.claim_next(os.getpid())
+    stop_heartbeat(job_store, 'job_b')
+    job_store.fail('job_c', 'Cloudflare block')
+
+    assert job_store.is_abandoned('job_a') is False  # corriendo
+    assert job_store.is_abandoned('job_b') is True  # huérfano
+    assert job_store.is_abandoned('job_c') is True  # fallido
+    assert job_store.is_abandoned('job_d') is False  # encolado
+    assert job_store.is_abandoned('cli-20240101000000') is False
+
+
+def test_runner_executes_jobs_and_reports_progress(job_store):
+    def handler(job, report_progress):
+        report_progress(2, 3, 40)
+        if 'fail' in job['url']:
+            raise ValueError('Cloudflare block')
+        return {'count': 40, 'job_id': job['job_id']}
+
+    runner = JobRunner(job_store, handler, workers=2, poll_interval=0.05)
+    runner.start()
+    try:
+        job_store.enqueue('job_ok', 'https://www.zonaprop.com.ar/ok.html')
+        job_store.enqueue('job_ko', 'https://www.zonaprop.com.ar/fail.html')
+        runner.notify()
+
+        job = wait_for_status(job_store, 'job_ok', STATUS_COMPLETED)
+        assert job['result'] == {'count': 40, 'job_id': 'job_ok'}
+        assert job['progress'] == {'pages_done': 2, 'pages_total': 3, 'listings_saved': 40}
+        assert set(job['counters']) == {'wall_seconds', 'cpu_seconds', 'process_max_rss_kb'}
+
+        job = wait_for_status(job_store, 'job_ko', STATUS_FAILED)
+        assert job['error'] == 'Cloudflare block'
+    finally:
+        runner.stop(timeout=1)
+
+
+def test_orphan_with_live_pid_is_detected_by_heartbeat(job_store):
+    # En un contenedor reiniciado el PID del worker caído puede existir (es
+    # de otro proceso, o del mismo worker tras el reinicio): cuenta el latido
+    job_store.enqueue('job_a', 'https://www.zonaprop.com.ar/a.html')
+    job_store.claim_next(os.getpid())
+    assert job_store.is_abandoned('job_a') is False
+
+    stop_heartbeat(job_store, 'job_a')
+    assert job_store.is_abandoned('job_a') is True
+    assert job_store.requeue_orphans() == 1
+
+
+def test_runner_heartbeat_keeps_running_jobs_alive(tmp_path):
+    job_store = JobStore(str(tmp_path / 'jobs.sqlite3'), heartbeat_timeout=0.3)
+    release = threading.Event()
+
+    def handler(job, report_progress):
+        release.wait(5)
+        return {'count': 0}
+
+    runner = JobRunner(job_store, handler, workers=1, poll_interval=0.05, heartbeat_interval=0.05)
+    runner.start()
+    try:
+        job_store.enqueue('job_a', 'https://www.zonaprop.com.ar/a.html')
+        runner.notify()
+        wait_for_status(job_store, 'job_a', STATUS_RUNNING)
+
+        # Un job de otro proceso que dejó de latir se re-encola sin reiniciar
+        job_store.enqueue('job_b', 'https://www.zonaprop.com.ar/b.html')
+        job_store._update('job_b', status=STATUS_RUNNING, heartbeat_at=time.time() - 10)
+        wait_for_status(job_store, 'job_b', STATUS_QUEUED)
+
+        # El job en curso sigue latiendo aunque dure más que el timeout
+        time.sleep(0.6)
+        assert job_store.get('job_a')['status'] == STATUS_RUNNING
+        assert job_store.is_abandoned('job_a') is False
+    finally:
+        release.set()
+        runner.stop(timeout=1)
+
+    assert job_store.get('job_a')['status'] == STATUS_COMPLETED
+
+
+def test_list_jobs_active_and_recent(job_store):
+    for job_id in ('job_01', 'job_02', 'job_03'):
+        job_store.enqueue(job_id, f'https://www.zonaprop.com.ar/{job_id}.html')
+    job_store.claim_next(os.getpid())
+    job_store.complete('job_01', {'count': 1}, {'wall_seconds': 1.5})
+
+    active = job_store.list_jobs(ACTIVE_STATUSES)
+    recent = job_store.list_jobs(FINISHED_STATUSES)
+
+    assert [job['job_id'] for job in active] == ['job_03', 'job_02']
+    assert [job['job_id'] for job in recent] == ['job_01']
+    assert recent[0]['counters'] == {'wall_seconds': 1.5}
+    assert recent[0]['finished_at'] is not None
+
+
+def test_job_store_migrates_old_schema(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            'CREATE TABLE jobs (id TEXT PRIMARY KEY, url TEXT NOT NULL, webhook_url TEXT, '
+            'status TEXT NOT NULL, pages_done INTEGER NOT NULL DEFAULT 0, '
+            'pages_total INTEGER NOT NULL DEFAULT 0, listings_saved INTEGER NOT NULL DEFAULT 0, '
+            'result TEXT, error TEXT, worker_pid INTEGER, created_at TEXT NOT NULL, '
+            'started_at TEXT, finished_at TEXT)'
+        )
+
+    job_store = JobStore(path)
+    job_store.enqueue('job_01', 'https://www.zonaprop.com.ar/a.html')
+    job = job_store.get('job_01')
+    assert job['counters'] == {}
+    assert (job['kind'], job['resume'], job['incremental'], job['profile']) == (KIND_SCRAPE, False, False, False)
+    assert job['attempts'] == 0
+    assert job['heartbeat_at'] is None
+
+
+def test_enqueue_batch(job_store):
+    urls = ['https://www.zonaprop.com.ar/a.html', 'https://www.zonaprop.com.ar/b.html']
+    job_store.enqueue('job_01', 'batch:2 urls', urls=urls, incremental=True, profile=True)
+
+    job = job_store.claim_next(os.getpid())
+    assert job['kind'] == KIND_BATCH
+    assert job['urls'] == urls
+    assert job['incremental'] is True
+    assert job['profile'] is True
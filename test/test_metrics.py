@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+from src.metrics import JobMetrics, log_event, MetricsRegistry, MetricsStore, set_json_logs, STAGES
+from src.scraper import Scraper
+from test.test_scraper import FakeBrowser
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.inc('zonaprop_pages_total', 3)
+    registry.inc('zonaprop_rows_written_total', 20, target='db')
+    registry.observe('zonaprop_stage_duration_seconds', 0.02, stage='fetch')
+    registry.observe('zonaprop_stage_duration_seconds', 40, stage='fetch')
+
+    lines = registry.render_all().splitlines()
+
+    assert '# TYPE zonaprop_pages_total counter' in lines
+    assert 'zonaprop_pages_total 3' in lines
+    assert 'zonaprop_rows_written_total{target="db"} 20' in lines
+    assert '# TYPE zonaprop_stage_duration_seconds histogram' in lines
+    assert 'zonaprop_stage_duration_seconds_bucket{stage="fetch",le="0.01"} 0' in lines
+    assert 'zonaprop_stage_duration_seconds_bucket{stage="fetch",le="0.025"} 1' in lines
+    assert 'zonaprop_stage_duration_seconds_bucket{stage="fetch",le="+Inf"} 2' in lines
+    assert lines.index('zonaprop_stage_duration_seconds_bucket{stage="fetch",le="30"} 1') < \
+        lines.index('zonaprop_stage_duration_seconds_bucket{stage="fetch",le="+Inf"} 2')
+    assert 'zonaprop_stage_duration_seconds_count{stage="fetch"} 2' in lines
+
+
+def test_registry_rejects_unknown_metrics():
+    registry = MetricsRegistry()
+
+    with pytest.raises(ValueError):
+        registry.inc('zonaprop_unknown_total')
+    with pytest.raises(ValueError):
+        registry.observe('zonaprop_pages_total', 1)
+
+
+def test_store_sums_processes(tmp_path):
+    store = MetricsStore(str(tmp_path / 'metrics.sqlite3'))
+    first, second = MetricsRegistry(), MetricsRegistry()
+    first.inc('zonaprop_pages_total', 2)
+    second.inc('zonaprop_pages_total', 5)
+    second.inc('zonaprop_jobs_total', status='completed')
+
+    store.save(100, first.samples())
+    store.save(200, second.samples())
+    # Volver a volcar un proceso reemplaza su acumulado anterior
+    first.inc('zonaprop_pages_total')
+    store.save(100, first.samples())
+
+    samples = {(name, labels): value for name, labels, value in store.load()}
+    assert samples[('zonaprop_pages_total', ())] == 8
+    assert samples[('zonaprop_jobs_total', (('status', 'completed'),))] == 1
+
+
+def test_store_retires_dead_processes(tmp_path, mocker):
+    store = MetricsStore(str(tmp_path / 'metrics.sqlite3'), heartbeat_timeout=60)
+    dead, alive = MetricsRegistry(), MetricsRegistry()
+    for registry in (dead, alive):
+        registry.inc('zonaprop_pages_total', 2)
+        registry.add('zonaprop_jobs_running', 1)
+
+    now = mocker.patch('time.time', return_value=1000.0)
+    store.save(100, dead.samples(), 'arranque-a')
+    now.return_value += 61
+    store.save(200, alive.samples(), 'arranque-b')
+
+    def load():
+        return {(name, labels): value for name, labels, value in store.load()}
+
+    # El proceso 100 dejó de latir: se conservan sus contadores, no su gauge
+    assert load()[('zonaprop_pages_total', ())] == 4
+    assert load()[('zonaprop_jobs_running', ())] == 1
+    with store._connect() as connection:
+        pids = {row['pid'] for row in connection.execute('SELECT pid FROM metrics')}
+    assert pids == {0, 200}
+
+    # Otro arranque con el mismo PID no pisa los contadores del anterior
+    restarted = MetricsRegistry()
+    restarted.inc('zonaprop_pages_total')
+    store.save(200, restarted.samples(), 'arranque-c')
+    assert load()[('zonaprop_pages_total', ())] == 5
+    assert ('zonaprop_jobs_running', ()) not in load()
+
+    # Un gauge deja de contarse en cuanto su proceso deja de latir, aunque nadie haya vuelto a volcar
+    store.save(300, alive.samples(), 'arranque-d')
+    now.return_value += 61
+    assert ('zonaprop_jobs_running', ()) not in load()
+    assert load()[('zonaprop_pages_total', ())] == 7
+
+
+def test_log_event_writes_one_json_line(capsys):
+    set_json_logs(True)
+    try:
+        log_event('page', job_id='abc', seconds={'fetch': 0.5})
+    finally:
+        set_json_logs(False)
+
+    record = json.loads(capsys.readouterr().out)
+    assert record['event'] == 'page'
+    assert record['job_id'] == 'abc'
+    assert record['seconds'] == {'fetch': 0.5}
+
+
+def test_scraper_records_stage_timings(html_page: str):
+    registry = MetricsRegistry()
+    job_metrics = JobMetrics('job-1', registry=registry)
+    scraper = Scraper(FakeBrowser(html_page, pages_quantity=3), 'fake_url.com', concurrency=2)
+    scraper.job_metrics = job_metrics
+    assert 'zonaprop_jobs_running 1' in registry.render_all().splitlines()
+
+    for _ in scraper.iter_pages():
+        pass
+
+    totals = job_metrics.finish('completed')
+    assert totals['pages'] == 3
+    assert totals['listings'] == 60
+    assert totals['rows_written'] == {'db': 0, 'export': 60}
+    assert set(totals['stage_seconds']) == set(STAGES)
+    assert all(totals['stage_seconds'][stage] > 0 for stage in ('fetch', 'extract', 'parse'))
+    assert scraper.page_timings == {}
+
+    samples = {(name, labels): value for name, labels, value in registry.samples()}
+    assert samples[('zonaprop_stage_duration_seconds_count', (('stage', 'parse'),))] == 3
+    assert samples[('zonaprop_jobs_running', ())] == 0
+    assert samples[('zonaprop_jobs_total', (('status', 'completed'),))] == 1
@@ -0,0 +1,49 @@
+import os
+
+from src.parse_pool import ParsePool
+from src.scraper import Scraper, parse_page
+from test.test_scraper import FakeBrowser
+
+
+def get_pid(_):
+    return os.getpid()
+
+
+def test_parse_page_returns_paging_and_estates(html_page: str):
+    parsed = parse_page(html_page)
+
+    assert parsed.total == 15217
+    assert parsed.page_size == 20
+    assert len(parsed.estates) == 20
+    assert all(len(estate.content_hash) == 40 for estate in parsed.estates)
+
+
+def test_parse_page_without_state():
+    parsed = parse_page('<html><body>Access denied</body></html>')
+
+    assert parsed.total == 0
+    assert parsed.estates == []
+
+
+def test_parse_pool_without_workers_runs_inline():
+    pool = ParsePool(workers=0)
+
+    assert pool.run(get_pid, None) == os.getpid()
+
+
+def test_parse_pool_runs_in_other_process():
+    with ParsePool(workers=1) as pool:
+        assert pool.run(get_pid, None) != os.getpid()
+
+
+def test_scraper_with_parse_pool_matches_inline(html_page: str):
+    inline = Scraper(FakeBrowser(html_page, pages_quantity=4), 'fake_url.com', concurrency=3)
+    expected = inline.scrap_website()
+
+    with ParsePool(workers=2) as pool:
+        scraper = Scraper(FakeBrowser(html_page, pages_quantity=4), 'fake_url.com', concurrency=3)
+        scraper.parse_pool = pool
+        estates = scraper.scrap_website()
+
+    assert len(estates) == 80
+    assert estates == expected
@@ -0,0 +1,106 @@
+import copy
+import hashlib
+import json
+
+import pytest
+
+from benchmarks.bench_parse_estate import legacy_parse_estate
+from benchmarks.common import load_example_post, synthetic_posts
+from src.estate import ESTATE_FIELDS
+from src.posting_fields import compile_path, compute_content_hash, parse_posting, parse_postings_columns
+from src.utils import StreamingExporter
+
+
+def example_variants():
+    post = load_example_post()
+
+    sell = copy.deepcopy(post)
+    sell['priceOperationTypes'][0]['operationType']['operationTypeId'] = '1'
+
+    without_prices = copy.deepcopy(post)
+    without_prices['priceOperationTypes'] = []
+
+    without_features = copy.deepcopy(post)
+    del without_features['mainFeatures']
+
+    nulls = copy.deepcopy(post)
+    nulls['expenses'] = None
+    nulls['postingLocation'] = None
+
+    return [post, sell, without_prices, without_features, nulls, {}]
+
+
+@pytest.mark.parametrize('post', example_variants())
+def test_parse_posting_matches_previous_parser(post):
+    assert parse_posting(post).to_dict() == legacy_parse_estate(post)
+
+
+def test_parse_posting_tolerates_null_sections():
+    post = load_example_post()
+    post['publisher'] = None
+    post['visiblePictures'] = None
+
+    estate = parse_posting(post)
+
+    assert estate.publisher_name == ''
+    assert estate.publisher_url == ''
+    assert estate.images == []
+    assert len(estate.content_hash) == 40
+
+
+def test_content_hash_matches_json_dumps():
+    estate = parse_posting(load_example_post())
+    estate.sell_price = 1250.5
+    estate.title = 'Depto "luminoso" con balcón\n'
+    estate.ambientes = {'valor': 2, 'unidad': 'amb'}
+
+    data = estate.to_dict()
+    del data['content_hash']
+    expected = hashlib.sha1(
+        json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    ).hexdigest()
+
+    assert compute_content_hash(estate) == expected
+    assert compute_content_hash(estate) != parse_posting(load_example_post()).content_hash
+
+
+def test_compile_path():
+    posting = {'a': {'b': [{'c': 'x'}]}, 'null': None}
+
+    assert compile_path('a.b.0.c', '')(posting) == 'x'
+    assert compile_path('a.b.1.c', 'default')(posting) == 'default'
+    assert compile_path('null.c', 'default')(posting) == 'default'
+    assert compile_path('a', None)({}) is None
+
+
+def test_parse_postings_columns_matches_parse_posting():
+    posts = example_variants() + synthetic_posts(20)
+    columns = parse_postings_columns(posts)
+
+    assert tuple(columns) == ESTATE_FIELDS
+    for index, post in enumerate(posts):
+        expected = parse_posting(post).to_dict()
+        assert {column: values[index] for column, values in columns.items()} == expected
+
+    assert parse_postings_columns([]) == {column: [] for column in ESTATE_FIELDS}
+
+
+@pytest.mark.parametrize('columnar_format', [None, 'arrow'])
+def test_streaming_exporter_write_columns_matches_write_page(tmp_path, columnar_format):
+    if columnar_format:
+        pytest.importorskip('pyarrow')
+    posts = synthetic_posts(5)
+    by_row = str(tmp_path / 'rows.csv')
+    by_column = str(tmp_path / 'columns.csv')
+
+    with StreamingExporter(by_row, ESTATE_FIELDS, columnar_format) as rows_exporter:
+        rows_exporter.write_page([parse_posting(post) for post in posts])
+    with StreamingExporter(by_column, ESTATE_FIELDS, columnar_format) as columns_exporter:
+        assert columns_exporter.write_columns(parse_postings_columns(posts)) == 5
+
+    with open(by_row, encoding='utf-8') as rows, open(by_column, encoding='utf-8') as columns:
+        assert rows.read() == columns.read()
+    if columnar_format:
+        import pyarrow.ipc
+        read = lambda filename: pyarrow.ipc.open_stream(filename).read_all()
+        assert read(rows_exporter.columnar_filename).equals(read(columns_exporter.columnar_filename))
@@ -0,0 +1,17 @@
+from src.preloaded_state import PreloadedState
+
+
+def test_preloaded_state_from_html(html_page):
+    state = PreloadedState.from_html(html_page)
+    assert state.found
+    assert state.total == 15217
+    assert state.page_size == 20
+    assert state.total_pages == 761
+    assert len(state.postings) == 20
+
+
+def test_preloaded_state_missing_script():
+    state = PreloadedState.from_html('<html><body>Access denied</body></html>')
+    assert not state.found
+    assert state.total == 0
+    assert state.postings == []
@@ -0,0 +1,32 @@
+import os
+import pstats
+
+from src.profiling import JobProfiler
+from src.scraper import Scraper
+from test.test_scraper import FakeBrowser
+
+
+def test_job_profiler_writes_profiles_next_to_output(html_page: str, tmp_path):
+    csv_filename = str(tmp_path / 'busqueda.csv')
+    scraper = Scraper(FakeBrowser(html_page, pages_quantity=4), 'fake_url.com', concurrency=2)
+
+    with JobProfiler(csv_filename, sample_interval=0.001) as profiler:
+        estates = scraper.scrap_website()
+
+    assert len(estates) == 80
+    summary = profiler.summary()
+    assert summary['pstats_file'] == str(tmp_path / 'busqueda.pstats')
+    assert summary['collapsed_file'] == str(tmp_path / 'busqueda.collapsed')
+    assert os.path.exists(summary['collapsed_file'])
+
+    # El pstats se puede abrir y tiene el parseo del thread principal (página 1)
+    stats = pstats.Stats(summary['pstats_file'])
+    assert any(name == 'parse_page' for _, _, name in stats.stats)
+    assert summary['top_functions'][0]['tottime'] >= summary['top_functions'][-1]['tottime']
+
+    # El muestreo ve los threads de descarga que cProfile no ve
+    assert summary['samples'] > 0
+    with open(summary['collapsed_file'], encoding='utf-8') as f:
+        stacks = f.read().splitlines()
+    assert any(line.startswith('ThreadPoolExecutor') for line in stacks)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in stacks)
@@ -0,0 +1,73 @@
+import os
+import time
+
+from src.response_cache import ResponseCache
+
+URL = 'https://www.zonaprop.com.ar/departamentos-alquiler.html'
+
+
+def test_get_and_set(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+
+    assert cache.get(URL) is None
+    cache.set(URL, '<html>ñandú</html>')
+
+    assert cache.get(URL) == '<html>ñandú</html>'
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_keeps_http_validators(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.set(URL, '<html></html>', etag='"v1"', last_modified='Wed, 21 Oct 2015 07:28:00 GMT')
+
+    assert cache.get_entry(URL) == ('<html></html>', '"v1"', 'Wed, 21 Oct 2015 07:28:00 GMT')
+    assert cache.get_entry(URL + '?otra=1') is None
+
+
+def test_responses_are_compressed_and_content_addressed(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    page = '<html>' + 'propiedad ' * 10000 + '</html>'
+
+    cache.set(URL, page)
+    cache.set(URL + '?orden=1', page)
+
+    blobs = os.listdir(cache.blobs_directory)
+    assert len(blobs) == 1
+    assert cache.size() < len(page) / 10
+
+
+def test_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0.05)
+    cache.set(URL, 'vieja')
+    time.sleep(0.1)
+
+    assert cache.get(URL) is None
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    pages = {f'{URL}?p={i}': os.urandom(2000).hex() for i in range(3)}
+    for url, page in pages.items():
+        cache.set(url, page)
+        time.sleep(0.01)
+    page_size = cache.size() // 3
+
+    # La página 0 se usó recién: se desaloja la 1, la menos usada
+    cache.get(f'{URL}?p=0')
+    cache.max_bytes = page_size * 2 + page_size // 2
+    assert cache.evict() == 1
+
+    assert cache.get(f'{URL}?p=1') is None
+    assert cache.get(f'{URL}?p=0') == pages[f'{URL}?p=0']
+    assert cache.get(f'{URL}?p=2') == pages[f'{URL}?p=2']
+    assert len(os.listdir(cache.blobs_directory)) == 2
+
+
+def test_validator_rejects_responses(tmp_path):
+    cache = ResponseCache(str(tmp_path), validator=lambda text: 'PRELOADED_STATE' in text)
+
+    assert not cache.set(URL, '<html>Just a moment...</html>')
+    assert cache.get(URL) is None
+    assert cache.set(URL, '<html>window.__PRELOADED_STATE__ = {}</html>')
+    assert cache.get(URL) is not None
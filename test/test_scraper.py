@@ -1,5 +1,55 @@
+import hashlib
+import re
+import threading
+import time
+
+import pytest
 import pytest_mock
-from src.scraper import Scraper
+from benchmarks.common import load_example_post
+from src.checkpoint import CheckpointStore
+from src.database import SaveStats
+from src.scraper import Scraper, EmptyPagesError
+
+
+class FakeBrowser():
+    """
+    Browser local que sirve el mock HTML. Prefija los postingId con el
+    número de página y demora más las primeras páginas para que las
+    descargas terminen desordenadas.
+    """
+
+    def __init__(self, html_page, pages_quantity):
+        # Ajustar el paging.total del mock a la cantidad de páginas servidas
+        self.html_page = html_page.replace('"paging":{"total":15217', f'"paging":{{"total":{pages_quantity * 20}')
+        self.pages_quantity = pages_quantity
+        self.requested_urls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def get_text(self, url):
+        match = re.search(r'-pagina-(\d+)\.html$', url)
+        page_number = int(match.group(1)) if match else 1
+
+        with self._lock:
+            self.requested_urls.append(url)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(0.01 * (self.pages_quantity - page_number))
+
+        with self._lock:
+            self.in_flight -= 1
+
+        return self.html_page.replace('"postingId":"', f'"postingId":"{page_number}-')
+
+    def get_conditional(self, url, etag=None, last_modified=None):
+        # ETag = hash del contenido: responde 304 si la página no cambió
+        text = self.get_text(url)
+        current_etag = hashlib.sha1(text.encode()).hexdigest()
+        if etag == current_etag:
+            return None, etag, last_modified
+        return text, current_etag, None
 
 
 class TestScraper():
@@ -11,3 +61,294 @@ class TestScraper():
         browser.get_text = mocker.MagicMock(return_value=html_page)
         estates = scraper.scrap_website()
         assert len(estates) == 20
+
+    def test_scraper_concurrent_keeps_page_order(self, mocker: pytest_mock.MockFixture, html_page: str):
+        browser = FakeBrowser(html_page, pages_quantity=5)
+        scraper = Scraper(browser, 'fake_url.com', concurrency=4)
+        scraper.get_estates_quantity = mocker.MagicMock(return_value=100)
+
+        estates = scraper.scrap_website()
+
+        assert len(estates) == 100
+        pages = [int(estate.posting_id.split('-')[0]) for estate in estates]
+        assert pages == sorted(pages)
+        assert set(pages) == {1, 2, 3, 4, 5}
+        assert len(browser.requested_urls) == 5
+        assert 1 < browser.max_in_flight <= 4
+
+    def test_first_page_fetched_once(self, html_page: str):
+        browser = FakeBrowser(html_page, pages_quantity=2)
+        scraper = Scraper(browser, 'fake_url.com')
+
+        estates = scraper.scrap_website()
+
+        assert len(estates) == 40
+        assert browser.requested_urls == ['fake_url.com.html', 'fake_url.com-pagina-2.html']
+        assert scraper.get_estates_quantity() == 40
+        assert len(browser.requested_urls) == 2
+
+    def test_content_hash_is_stable_and_tracks_changes(self):
+        scraper = Scraper(None, 'fake_url.com')
+        estate_post = load_example_post()
+
+        first = scraper.parse_estate(estate_post)
+        assert len(first.content_hash) == 40
+        assert scraper.parse_estate(estate_post).content_hash == first.content_hash
+
+        estate_post['priceOperationTypes'][0]['prices'][0]['amount'] += 1
+        assert scraper.parse_estate(estate_post).content_hash != first.content_hash
+
+    def test_iter_estates_streams_page_by_page(self, html_page: str):
+        browser = FakeBrowser(html_page, pages_quantity=3)
+        scraper = Scraper(browser, 'fake_url.com')
+
+        estates = scraper.iter_estates()
+        assert next(estates).posting_id.startswith('1-')
+        # Solo se descargó lo necesario para producir la primera propiedad
+        assert len(browser.requested_urls) == 1
+
+        assert len(list(estates)) == 59
+        assert len(browser.requested_urls) == 3
+
+    def test_iter_pages_reports_progress(self, html_page: str):
+        browser = FakeBrowser(html_page, pages_quantity=3)
+        scraper = Scraper(browser, 'fake_url.com', concurrency=2)
+        progress = []
+        scraper.progress_callback = lambda *args: progress.append(args)
+
+        pages = list(scraper.iter_pages())
+
+        assert [len(page) for page in pages] == [20, 20, 20]
+        assert progress == [(1, 3, 20), (2, 3, 40), (3, 3, 60)]
+
+    def interrupted_run(self, html_page, store, pages_done):
+        """
+        Scrapea con checkpoints y corta después de procesar pages_done páginas
+        """
+        scraper = Scraper(FakeBrowser(html_page, pages_quantity=4), 'fake_url.com')
+        scraper.enable_checkpoints(store, 'job_1', output_file='data/out.csv')
+        pages = scraper.iter_pages()
+        for _ in range(pages_done):
+            next(pages)
+        # Una página queda procesada cuando el consumidor pide la siguiente
+        next(pages)
+        pages.close()
+
+    def test_resume_skips_checkpointed_pages(self, html_page: str, tmp_path):
+        store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+        self.interrupted_run(html_page, store, pages_done=2)
+
+        checkpoint = store.get('fake_url.com', 'job_1')
+        assert checkpoint['completed_pages'] == {1: 20, 2: 20}
+        assert checkpoint['total'] == 80
+        assert not checkpoint['finished']
+
+        browser = FakeBrowser(html_page, pages_quantity=4)
+        scraper = Scraper(browser, 'fake_url.com')
+        checkpoint = scraper.enable_checkpoints(store, 'job_2', resume=True, is_abandoned=lambda owner: True)
+        assert checkpoint['resumed_from'] == 'job_1'
+        assert checkpoint['output_file'] == 'data/out.csv'
+
+        estates = scraper.scrap_website()
+
+        pages = sorted({int(estate.posting_id.split('-')[0]) for estate in estates})
+        assert pages == [3, 4]
+        # La página 1 se descarga solo para leer el paging
+        assert browser.requested_urls == [
+            'fake_url.com.html', 'fake_url.com-pagina-3.html', 'fake_url.com-pagina-4.html'
+        ]
+        assert store.get('fake_url.com', 'job_2')['finished']
+        assert store.find_resumable('fake_url.com', 'job_3', is_abandoned=lambda owner: True) is None
+
+    def test_resume_concurrently(self, html_page: str, tmp_path):
+        store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+        self.interrupted_run(html_page, store, pages_done=1)
+
+        browser = FakeBrowser(html_page, pages_quantity=4)
+        scraper = Scraper(browser, 'fake_url.com', concurrency=3)
+        scraper.enable_checkpoints(store, 'job_2', resume=True, is_abandoned=lambda owner: True)
+
+        estates = scraper.scrap_website()
+
+        pages = [int(estate.posting_id.split('-')[0]) for estate in estates]
+        assert pages == sorted(pages)
+        assert set(pages) == {2, 3, 4}
+        assert 'fake_url.com-pagina-2.html' in browser.requested_urls
+        assert store.get('fake_url.com', 'job_2')['completed_pages'] == {1: 20, 2: 20, 3: 20, 4: 20}
+
+    def test_without_resume_starts_over(self, html_page: str, tmp_path):
+        store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+        self.interrupted_run(html_page, store, pages_done=2)
+
+        scraper = Scraper(FakeBrowser(html_page, pages_quantity=4), 'fake_url.com')
+        checkpoint = scraper.enable_checkpoints(store, 'job_2', output_file='data/new.csv')
+
+        assert checkpoint['job_id'] == 'job_2'
+        assert checkpoint['completed_pages'] == {}
+        assert len(scraper.scrap_website()) == 80
+
+    def test_database_writer_checkpoints_pages_once_saved(self, html_page: str, tmp_path,
+                                                           mocker: pytest_mock.MockFixture):
+        release = threading.Event()
+        saved = []
+
+        def save_page_to_db(session, estates, batch_size):
+            # BD lenta: no termina de guardar hasta que se libera
+            release.wait(5)
+            saved.extend(estates)
+            stats = SaveStats()
+            stats.inserted = len(estates)
+            return stats
+
+        mocker.patch('src.database.save_page_to_db', save_page_to_db)
+        store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+        scraper = Scraper(FakeBrowser(html_page, pages_quantity=3), 'fake_url.com')
+        scraper.enable_checkpoints(store, 'job_1')
+        scraper.enable_database_save(mocker.MagicMock(), writer_queue_size=4)
+
+        pages = scraper.iter_pages()
+        next(pages)
+        next(pages)
+        # La descarga sigue aunque la BD no guardó nada, y la página 1 (ya
+        # exportada) no se marca en el checkpoint hasta estar guardada
+        assert saved == []
+        assert store.get('fake_url.com', 'job_1')['completed_pages'] == {}
+
+        release.set()
+        assert len(list(pages)) == 1
+
+        # El generador termina recién con todo guardado
+        assert len(saved) == 60
+        assert scraper.save_stats.inserted == 60
+        checkpoint = store.get('fake_url.com', 'job_1')
+        assert checkpoint['completed_pages'] == {1: 20, 2: 20, 3: 20}
+        assert checkpoint['finished']
+        assert scraper.db_writer is None
+
+    @pytest.mark.parametrize('writer_queue_size', [0, 4])
+    def test_failed_database_write_is_not_checkpointed(self, html_page: str, tmp_path,
+                                                       mocker: pytest_mock.MockFixture, writer_queue_size):
+        def save_page_to_db(session, estates, batch_size=None):
+            if any(estate.posting_id.startswith('2-') for estate in estates):
+                raise RuntimeError('Lost connection to MySQL server')
+            stats = SaveStats()
+            stats.inserted = len(estates)
+            return stats
+
+        mocker.patch('src.database.save_page_to_db', save_page_to_db)
+        store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+        scraper = Scraper(FakeBrowser(html_page, pages_quantity=3), 'fake_url.com')
+        scraper.enable_checkpoints(store, 'job_1')
+        scraper.enable_database_save(mocker.MagicMock(), writer_queue_size=writer_queue_size)
+
+        with pytest.raises(Exception, match='Lost connection'):
+            scraper.scrap_website()
+
+        # La página 2 no se guardó: ni ella ni las siguientes quedan en el
+        # checkpoint (el writer puede haber guardado la 1 junto con la 2)
+        checkpoint = store.get('fake_url.com', 'job_1')
+        assert set(checkpoint['completed_pages']) <= {1}
+        assert not checkpoint['finished']
+
+    def test_aborts_after_consecutive_empty_pages(self, html_page: str):
+        browser = FakeBrowser(html_page, pages_quantity=6)
+        blocked_page = '<html><body>Just a moment...</body></html>'
+        get_text = browser.get_text
+        browser.get_text = lambda url: blocked_page if '-pagina-' in url else get_text(url)
+        scraper = Scraper(browser, 'fake_url.com', max_empty_pages=3)
+
+        pages = []
+        with pytest.raises(EmptyPagesError):
+            for page_estates in scraper.iter_pages():
+                pages.append(page_estates)
+
+        assert len(pages) == 3  # la página 1 y las dos primeras vacías
+        assert len(browser.requested_urls) == 1
+
+    @pytest.mark.parametrize('concurrency', [1, 3])
+    def test_stops_when_search_shrinks(self, html_page: str, concurrency):
+        browser = FakeBrowser(html_page, pages_quantity=4)
+        get_text = browser.get_text
+        browser.get_text = lambda url: '<html></html>' if re.search(r'-pagina-[34]\.html$', url) else get_text(url)
+        scraper = Scraper(browser, 'fake_url.com', concurrency=concurrency, max_empty_pages=2)
+
+        # Las dos últimas páginas vienen vacías: la última no cuenta como
+        # página vacía sino como fin de los resultados
+        assert len(scraper.scrap_website()) == 40
+
+    def snapshot_run(self, html_page, store, incremental, concurrency=1, stop_after_unchanged=3, change_page=None):
+        """
+        Scrapea 4 páginas con instantáneas. change_page modifica los títulos
+        de esa página para simular publicaciones editadas
+        """
+        browser = FakeBrowser(html_page, pages_quantity=4)
+        if change_page:
+            get_text = browser.get_text
+            suffix = f'-pagina-{change_page}.html' if change_page > 1 else 'fake_url.com.html'
+            browser.get_text = lambda url: (
+                get_text(url).replace('"title":"', '"title":"EDITADO ') if url.endswith(suffix) else get_text(url)
+            )
+        scraper = Scraper(browser, 'fake_url.com', concurrency=concurrency)
+        scraper.enable_page_snapshots(store, incremental=incremental, stop_after_unchanged=stop_after_unchanged)
+        pages = [int(page_estates[0].posting_id.split('-')[0]) for page_estates in scraper.iter_pages()]
+        return scraper, browser, pages
+
+    def test_incremental_stops_when_pages_are_unchanged(self, html_page: str, tmp_path):
+        store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+        _, _, pages = self.snapshot_run(html_page, store, incremental=False)
+        assert pages == [1, 2, 3, 4]
+
+        scraper, browser, pages = self.snapshot_run(html_page, store, incremental=True, stop_after_unchanged=2)
+
+        assert pages == []
+        assert scraper.pages_unchanged == 2
+        assert browser.requested_urls == ['fake_url.com.html', 'fake_url.com-pagina-2.html']
+
+    def test_incremental_skips_unchanged_pages(self, html_page: str, tmp_path):
+        for concurrency in (1, 3):
+            store = CheckpointStore(str(tmp_path / f'checkpoints-{concurrency}.sqlite3'))
+            self.snapshot_run(html_page, store, incremental=False)
+
+            scraper, browser, pages = self.snapshot_run(
+                html_page, store, incremental=True, concurrency=concurrency, stop_after_unchanged=0, change_page=3
+            )
+            assert pages == [3]
+            assert scraper.pages_unchanged == 3
+            assert len(browser.requested_urls) == 4
+            # La instantánea queda actualizada: la próxima corrida no tiene cambios
+            scraper, _, pages = self.snapshot_run(
+                html_page, store, incremental=True, concurrency=concurrency, stop_after_unchanged=0, change_page=3
+            )
+            assert pages == []
+
+    def test_incremental_drops_validators_of_unchanged_pages(self, html_page: str, tmp_path):
+        store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+        self.snapshot_run(html_page, store, incremental=False)
+
+        browser = FakeBrowser(html_page, pages_quantity=4)
+        get_text = browser.get_text
+        browser.get_text = lambda url: (
+            get_text(url).replace('"title":"', '"title":"EDITADO ') if url.endswith('-pagina-4.html') else get_text(url)
+        )
+        scraper = Scraper(browser, 'fake_url.com')
+        scraper.enable_page_snapshots(store, incremental=True, stop_after_unchanged=0)
+        pages = scraper.iter_pages()
+
+        next(pages)
+        # Las páginas 2 y 3 no cambiaron (304): sus validadores no se acumulan
+        assert set(scraper.page_validators) == {4}
+        assert list(pages) == []
+        assert scraper.page_validators == {}
+
+    def test_incremental_uses_conditional_requests(self, html_page: str, tmp_path, mocker: pytest_mock.MockFixture):
+        store = CheckpointStore(str(tmp_path / 'checkpoints.sqlite3'))
+        self.snapshot_run(html_page, store, incremental=False)
+        assert store.load_snapshots('fake_url.com')[2]['etag'] is not None
+
+        parse_estate = mocker.spy(Scraper, 'parse_estate')
+        scraper, _, pages = self.snapshot_run(html_page, store, incremental=True, stop_after_unchanged=0)
+
+        assert pages == []
+        assert scraper.pages_unchanged == 4
+        # Las páginas 2..4 respondieron 304: solo se parsea la página 1
+        assert parse_estate.call_count == 20
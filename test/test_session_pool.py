@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from src.session_pool import SessionPool
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+        self.requested_urls = []
+
+    def get(self, url, timeout=None):
+        self.requested_urls.append(url)
+
+    def close(self):
+        self.closed = True
+
+
+def test_sessions_are_reused_between_checkouts():
+    pool = SessionPool(size=2, factory=FakeSession)
+
+    with pool.checkout() as first:
+        pass
+    with pool.checkout() as second:
+        pass
+
+    assert first is second
+    assert pool.stats() == {'idle': 1, 'created': 1, 'reused': 1, 'discarded': 0}
+
+
+def test_concurrent_checkouts_get_distinct_sessions_and_pool_is_bounded():
+    pool = SessionPool(size=1, factory=FakeSession)
+
+    sessions = [pool.acquire() for _ in range(3)]
+    assert len({id(session) for session in sessions}) == 3
+
+    for session in sessions:
+        pool.release(session)
+
+    # Solo se conserva una sesión ociosa; el resto se cierra
+    assert pool.stats()['idle'] == 1
+    assert [session.closed for session in sessions] == [False, True, True]
+
+
+def test_expired_sessions_are_discarded():
+    pool = SessionPool(size=2, max_age=0.05, factory=FakeSession)
+
+    old = pool.acquire()
+    pool.release(old)
+    time.sleep(0.1)
+    new = pool.acquire()
+
+    assert new is not old
+    assert old.closed
+
+
+def test_failed_checkout_discards_session():
+    pool = SessionPool(size=2, factory=FakeSession)
+
+    with pytest.raises(RuntimeError):
+        with pool.checkout() as session:
+            raise RuntimeError('bloqueado')
+
+    assert session.closed
+    assert pool.stats()['idle'] == 0
+
+
+def test_warm_up_fills_pool():
+    pool = SessionPool(size=2, factory=FakeSession)
+    pool.warm_up('https://www.zonaprop.com.ar/')
+
+    sessions = [pool.acquire(), pool.acquire()]
+    assert all(session.requested_urls == ['https://www.zonaprop.com.ar/'] for session in sessions)
+    assert pool.stats()['created'] == 2
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from src.throttle import RateLimiter
+
+
+def test_rate_limiter_spaces_requests():
+    rate_limiter = RateLimiter(requests_per_second=20)
+    start = time.monotonic()
+    for _ in range(5):
+        rate_limiter.wait()
+    # El primer request sale inmediato, los otros 4 esperan 1/20 s cada uno
+    assert time.monotonic() - start >= 0.19
+
+
+def test_rate_limiter_disabled():
+    rate_limiter = RateLimiter(requests_per_second=None)
+    start = time.monotonic()
+    for _ in range(100):
+        rate_limiter.wait()
+    assert time.monotonic() - start < 0.05
+
+
+def test_rate_limiter_burst():
+    rate_limiter = RateLimiter(requests_per_second=10, burst=3)
+    time.sleep(0.3)
+    start = time.monotonic()
+    for _ in range(3):
+        rate_limiter.wait()
+    assert time.monotonic() - start < 0.05
+
+
+def test_rate_limiter_adapts_to_throttling():
+    rate_limiter = RateLimiter(requests_per_second=8)
+
+    rate_limiter.penalize()
+    rate_limiter.penalize()
+    assert rate_limiter.rate == 2
+    for _ in range(10):
+        rate_limiter.penalize()
+    assert rate_limiter.rate == 1  # piso: 1/8 de la tasa configurada
+
+    for _ in range(20):
+        rate_limiter.reward()
+    assert rate_limiter.rate == 8
+
+
+def test_rate_limiter_respects_retry_after():
+    rate_limiter = RateLimiter(requests_per_second=None)
+    rate_limiter.penalize(retry_after=0.2)
+    start = time.monotonic()
+    rate_limiter.wait()
+    assert time.monotonic() - start >= 0.19
+
+
+def test_rate_limiter_concurrent_adjustments_stay_in_bounds():
+    limiter = RateLimiter(requests_per_second=100)
+
+    def adjust(index):
+        for _ in range(500):
+            if index % 2:
+                limiter.reward()
+            else:
+                limiter.penalize()
+
+    threads = [threading.Thread(target=adjust, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert limiter.min_rate <= limiter.rate <= limiter.max_rate
@@ -1,7 +1,9 @@
 import os
 import shutil
 
-from src.utils import remove_host_from_url, save_df_to_csv
+import pytest
+
+from src.utils import remove_host_from_url, save_df_to_csv, StreamingExporter
 
 
 def teardown_function(function):
@@ -17,3 +19,71 @@ def test_save_df_to_csv(df_estates):
     filename = 'data/test.csv'
     save_df_to_csv(df_estates, filename)
     assert os.path.exists(filename)
+
+
+def test_streaming_exporter_appends_csv_per_page():
+    filename = 'data/test_append.csv'
+    columns = ('posting_id', 'title')
+
+    with StreamingExporter(filename, columns) as exporter:
+        assert exporter.write_page([{'posting_id': '1', 'title': 'a'}]) == 1
+        # El CSV ya tiene la primera página antes de cerrar
+        with open(filename, encoding='utf-8') as f:
+            assert f.read().splitlines() == ['posting_id,title', '1,a']
+        assert exporter.write_page([{'posting_id': '2', 'title': 'b', 'extra': 'x'}, {'posting_id': '3'}]) == 2
+        assert exporter.write_page([]) == 0
+
+    # Reabrir el mismo archivo (p. ej. al reanudar) no repite el encabezado
+    with StreamingExporter(filename, columns) as exporter:
+        exporter.write_page([{'posting_id': '4', 'title': 'd'}])
+
+    with open(filename, encoding='utf-8') as f:
+        assert f.read().splitlines() == ['posting_id,title', '1,a', '2,b', '3,', '4,d']
+    assert exporter.rows_written == 1
+    assert exporter.columnar_filename is None
+
+@pytest.mark.parametrize('columnar_format', ['parquet', 'arrow'])
+def test_streaming_exporter_columnar(columnar_format):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    columns = ('posting_id', 'sell_price', 'images')
+    pages = [
+        [{'posting_id': '1', 'sell_price': 100, 'images': [{'url': 'a.jpg', 'order': 0}]}],
+        [{'posting_id': '2', 'sell_price': None, 'images': []}, {'posting_id': '3'}],
+    ]
+    with StreamingExporter('data/test_columnar.csv', columns, columnar_format) as exporter:
+        for page in pages:
+            exporter.write_page(page)
+
+    if columnar_format == 'parquet':
+        assert exporter.columnar_filename == 'data/test_columnar.parquet'
+        parquet_file = pa.parquet.ParquetFile(exporter.columnar_filename)
+        assert parquet_file.metadata.num_row_groups == 2
+        table = parquet_file.read()
+    else:
+        assert exporter.columnar_filename == 'data/test_columnar.arrows'
+        with pa.ipc.open_stream(exporter.columnar_filename) as reader:
+            table = reader.read_all()
+
+    assert table.column_names == list(columns)
+    assert table.to_pylist() == [
+        {'posting_id': '1', 'sell_price': '100', 'images': [{'url': 'a.jpg', 'order': 0}]},
+        {'posting_id': '2', 'sell_price': None, 'images': []},
+        {'posting_id': '3', 'sell_price': None, 'images': None},
+    ]
+
+def test_streaming_exporter_columnar_does_not_overwrite():
+    pytest.importorskip('pyarrow')
+
+    for _ in range(2):
+        with StreamingExporter('data/test_resume.csv', ('posting_id',), 'parquet') as exporter:
+            exporter.write_page([{'posting_id': '1'}])
+
+    assert exporter.columnar_filename == 'data/test_resume-part2.parquet'
+    assert os.path.exists('data/test_resume.parquet')
+
+def test_streaming_exporter_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        StreamingExporter('data/test_unknown.csv', ('posting_id',), 'xlsx')
@@ -1,43 +1,233 @@
-import sys
-
-import pandas as pd
+import argparse
+import contextlib
+import datetime
+import os
 
 from src import utils
-from src.browser import Browser
-from src.scraper import Scraper
-from src.database import get_session
+from src.batch import BatchScraper, DEFAULT_BATCH_WORKERS
+from src.browser import Browser, DEFAULT_REQUESTS_PER_SECOND, DEFAULT_MAX_RETRIES
+from src.checkpoint import CheckpointStore
+from src.db_writer import DEFAULT_WRITER_QUEUE_SIZE
+from src.estate import ESTATE_FIELDS
+from src.extractor import has_preloaded_state
+from src.heartbeat import Heartbeat
+from src.metrics import JobMetrics, set_json_logs
+from src.parse_pool import ParsePool
+from src.profiling import JobProfiler
+from src.response_cache import ResponseCache
+from src.scraper import Scraper, DEFAULT_STOP_AFTER_UNCHANGED
+from src.database import get_session, identity_cache, release_session
+
+
+CHECKPOINTS_DB_PATH = 'data/checkpoints.sqlite3'
 
 
-def main(url):
+def main(url, concurrency=1, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, columnar_format=None, resume=False,
+         max_retries=DEFAULT_MAX_RETRIES, cache_dir=None, cache_ttl=None, offline=False, incremental=False,
+         stop_after_unchanged=DEFAULT_STOP_AFTER_UNCHANGED, parse_workers=0, profile=False,
+         db_writer_queue_size=DEFAULT_WRITER_QUEUE_SIZE):
     base_url = utils.parse_zonaprop_url(url)
+    # Con el PID, dos ejecuciones lanzadas en el mismo segundo no comparten checkpoint
+    run_id = datetime.datetime.now().strftime('cli-%Y%m%d%H%M%S') + f'-{os.getpid()}'
     print(f'Running scraper for {base_url}')
     print(f'This may take a while...')
 
     # Inicializar browser y scraper
-    browser = Browser()
-    scraper = Scraper(browser, base_url)
+    response_cache = ResponseCache(cache_dir, ttl=cache_ttl, validator=has_preloaded_state) if cache_dir else None
+    browser = Browser(requests_per_second=requests_per_second, max_retries=max_retries,
+                      cache=response_cache, cache_only=offline)
+    scraper = Scraper(browser, base_url, concurrency=concurrency)
+    parse_pool = ParsePool(workers=parse_workers)
+    scraper.parse_pool = parse_pool
+    job_metrics = JobMetrics(run_id)
+    scraper.job_metrics = job_metrics
 
     # Inicializar sesión de BD y habilitar guardado automático
     db_session = get_session()
-    scraper.enable_database_save(db_session)
-    print('Guardado en BD habilitado - cada propiedad se guardara inmediatamente\n')
+    scraper.enable_database_save(db_session, db_writer_queue_size)
+    if db_writer_queue_size:
+        print(f'Guardado en BD habilitado - en segundo plano (hasta {db_writer_queue_size} paginas en cola)\n')
+    else:
+        print('Guardado en BD habilitado - cada pagina se guardara inmediatamente\n')
+
+    # Checkpoints: con --resume continúa el último scraping sin terminar de esta URL
+    # hecho desde la línea de comandos (los de jobs de la API los reanuda la API).
+    # Solo se toma el de una ejecución que dejó de latir: otra en paralelo sigue viva
+    checkpoint_store = CheckpointStore(CHECKPOINTS_DB_PATH)
+    checkpoint = scraper.enable_checkpoints(
+        checkpoint_store,
+        run_id,
+        resume=resume,
+        output_file=utils.get_filename_from_datetime(base_url, 'csv'),
+        is_abandoned=lambda owner: owner.startswith('cli-') and checkpoint_store.is_stale(base_url, owner)
+    )
+    filename = checkpoint['output_file']
+    heartbeat = Heartbeat(lambda: checkpoint_store.heartbeat(base_url, run_id), name='checkpoint-heartbeat').start()
+
+    # Instantáneas de páginas: con --incremental se saltean las páginas sin cambios
+    scraper.enable_page_snapshots(
+        checkpoint_store, incremental=incremental, stop_after_unchanged=stop_after_unchanged
+    )
 
-    # Ejecutar scraping (ahora guarda en BD automáticamente)
-    estates = scraper.scrap_website()
+    # Ejecutar scraping: cada página se guarda en BD y se agrega al CSV apenas se scrapea
+    profiler = JobProfiler(filename) if profile else None
+    try:
+        with parse_pool, profiler or contextlib.nullcontext(), \
+                utils.StreamingExporter(filename, ESTATE_FIELDS, columnar_format) as exporter:
+            for page_estates in scraper.iter_pages():
+                exporter.write_page(page_estates)
+    finally:
+        heartbeat.stop()
+    count = exporter.rows_written
 
     # Cerrar sesión de BD
-    db_session.close()
+    release_session()
+    print(f'BD: {scraper.save_stats.as_dict()}')
+    print(f"Tiempos y contadores: {job_metrics.finish('completed', browser)}")
+    print(f'Cache de IDs (source/publisher): {identity_cache.stats()}')
+    if response_cache:
+        print(f'Cache de respuestas: {response_cache.stats()}')
 
-    # Guardar CSV al final
-    df = pd.DataFrame(estates)
     print('\nScraping finished !!!')
-    print('Saving data to csv file')
-    filename = utils.get_filename_from_datetime(base_url, 'csv')
-    utils.save_df_to_csv(df, filename)
-    print(f'Data saved to {filename}')
+    print(f'{count} properties saved to {filename}')
+    if incremental:
+        print(f'{scraper.pages_unchanged} pages without changes were skipped')
+    if exporter.columnar_filename:
+        print(f'{count} properties saved to {exporter.columnar_filename}')
+    if profiler:
+        print_profile(profiler.summary())
 
     print('\nScrap finished !!!')
 
+
+def main_batch(urls, workers=DEFAULT_BATCH_WORKERS, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+               columnar_format=None, max_retries=DEFAULT_MAX_RETRIES, cache_dir=None, cache_ttl=None,
+               offline=False, incremental=False, stop_after_unchanged=DEFAULT_STOP_AFTER_UNCHANGED,
+               parse_workers=0, profile=False, db_writer_queue_size=DEFAULT_WRITER_QUEUE_SIZE):
+    print(f'Running batch scraper for {len(urls)} URLs ({workers} in parallel)')
+    print(f'This may take a while...')
+
+    # Un único browser: el límite de tasa y la sesión HTTP son del lote completo
+    response_cache = ResponseCache(cache_dir, ttl=cache_ttl, validator=has_preloaded_state) if cache_dir else None
+    browser = Browser(requests_per_second=requests_per_second, max_retries=max_retries,
+                      cache=response_cache, cache_only=offline)
+    checkpoint_store = CheckpointStore(CHECKPOINTS_DB_PATH)
+    parse_pool = ParsePool(workers=parse_workers)
+    job_metrics = JobMetrics(datetime.datetime.now().strftime('cli-%Y%m%d%H%M%S'))
+
+    def prepare_scraper(scraper):
+        scraper.parse_pool = parse_pool
+        scraper.job_metrics = job_metrics
+        scraper.enable_page_snapshots(
+            checkpoint_store, incremental=incremental, stop_after_unchanged=stop_after_unchanged
+        )
+
+    # Cada búsqueda guarda en BD con su propia sesión; las publicaciones
+    # repetidas entre búsquedas se guardan y exportan una sola vez
+    batch = BatchScraper(browser, urls, workers=workers, session_factory=get_session,
+                         prepare_scraper=prepare_scraper, db_writer_queue_size=db_writer_queue_size)
+    filename = utils.get_filename_from_datetime('https://www.zonaprop.com.ar/lote', 'csv')
+    profiler = JobProfiler(filename) if profile else None
+    with parse_pool, profiler or contextlib.nullcontext(), \
+            utils.StreamingExporter(filename, ESTATE_FIELDS, columnar_format) as exporter:
+        result = batch.run(on_page=exporter.write_page)
+
+    for url_result in result['urls']:
+        status = f"ERROR: {url_result['error']}" if url_result['error'] else 'OK'
+        print(f"{url_result['url']}: {url_result['pages']} pages, {url_result['count']} new properties - {status}")
+    print(f"BD: {result['db_stats']}")
+    print(f"Throughput: {result['throughput']}")
+    print(f"Tiempos y contadores: {job_metrics.finish('completed', browser)}")
+
+    print('\nBatch finished !!!')
+    print(f"{result['count']} unique properties saved to {filename} ({result['duplicates']} duplicates skipped)")
+    if exporter.columnar_filename:
+        print(f"{result['count']} unique properties saved to {exporter.columnar_filename}")
+    if profiler:
+        print_profile(profiler.summary())
+
+
+def print_profile(summary):
+    """
+    Muestra las funciones principales del perfil y dónde quedaron los archivos
+    """
+    print('\nFunciones con más tiempo propio (cProfile, thread principal):')
+    for row in summary['top_functions']:
+        print(f"  {row['tottime']:>9.3f}s  {row['calls']:>9} llamadas  {row['function']}")
+    print(f"Funciones más muestreadas ({summary['samples']} muestras, todos los threads del scraping):")
+    for row in summary['top_sampled_functions']:
+        print(f"  {row['percent']:>5.1f}%  {row['function']}")
+    if summary['pstats_file']:
+        print(f"Perfil: {summary['pstats_file']} (python -m pstats {summary['pstats_file']})")
+    print(f"Stacks colapsados: {summary['collapsed_file']} (flamegraph.pl o speedscope)")
+
+
+def read_urls_file(path):
+    """
+    Lee un archivo con una URL por línea (ignora líneas vacías y comentarios #)
+    """
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
 if __name__ == '__main__':
-    url = sys.argv[1] if len(sys.argv) > 1 else 'https://www.zonaprop.com.ar/departamentos-alquiler.html'
-    main(url)
+    parser = argparse.ArgumentParser(description='Scraper de ZonaProp')
+    parser.add_argument('urls', nargs='*', metavar='url',
+                        help='URL de ZonaProp (con varias URLs se scrapean como un lote)')
+    parser.add_argument('--urls-file',
+                        help='Archivo con una URL por línea para scrapear como un lote')
+    parser.add_argument('--batch-workers', type=int, default=DEFAULT_BATCH_WORKERS,
+                        help='Búsquedas scrapeadas en paralelo en un lote (default: 4)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Páginas descargadas en paralelo (default: 1)')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Procesos para parsear las páginas en paralelo a las descargas '
+                             '(default: 0, parsear en los threads de descarga)')
+    parser.add_argument('--db-writer-queue', type=int, default=DEFAULT_WRITER_QUEUE_SIZE,
+                        help='Páginas que pueden esperar a guardarse en BD en segundo plano '
+                             '(default: 8, 0 = guardar cada página antes de seguir)')
+    parser.add_argument('--rps', type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                        help='Requests por segundo como máximo (default: 0.33)')
+    parser.add_argument('--retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help='Reintentos por request ante timeouts, 429 y 5xx (default: 4)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Re-scrape incremental: saltear páginas sin publicaciones nuevas o modificadas')
+    parser.add_argument('--stop-after-unchanged', type=int, default=DEFAULT_STOP_AFTER_UNCHANGED,
+                        help='Con --incremental, terminar tras N páginas seguidas sin cambios (0 = nunca, default: 3)')
+    parser.add_argument('--cache-dir',
+                        help='Guardar/leer las páginas descargadas en un cache en disco (ej: data/http_cache)')
+    parser.add_argument('--cache-ttl', type=float,
+                        help='Segundos de validez de las páginas del cache (default: no vencen)')
+    parser.add_argument('--offline', action='store_true',
+                        help='Repetir el scraping solo desde el cache, sin acceder a la red (requiere --cache-dir)')
+    parser.add_argument('--columnar', choices=sorted(utils.COLUMNAR_FORMATS),
+                        help='Exportar además a Parquet o Arrow IPC (requiere pyarrow)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continuar el último scraping interrumpido de la URL desde la primera página sin terminar')
+    parser.add_argument('--profile', action='store_true',
+                        help='Perfilar el scraping: guarda .pstats y stacks colapsados junto al CSV en data/')
+    parser.add_argument('--json-logs', action='store_true',
+                        help='Escribir una línea JSON por página y por job con los tiempos de cada etapa')
+    args = parser.parse_args()
+    set_json_logs(args.json_logs)
+    if args.offline and not args.cache_dir:
+        parser.error('--offline requiere --cache-dir')
+
+    urls = args.urls + (read_urls_file(args.urls_file) if args.urls_file else [])
+    if len(urls) > 1:
+        if args.resume:
+            parser.error('--resume no está soportado en lotes')
+        main_batch(urls, workers=args.batch_workers, requests_per_second=args.rps,
+                   columnar_format=args.columnar, max_retries=args.retries,
+                   cache_dir=args.cache_dir, cache_ttl=args.cache_ttl, offline=args.offline,
+                   incremental=args.incremental, stop_after_unchanged=args.stop_after_unchanged,
+                   parse_workers=args.parse_workers, profile=args.profile,
+                   db_writer_queue_size=args.db_writer_queue)
+    else:
+        url = urls[0] if urls else 'https://www.zonaprop.com.ar/departamentos-alquiler.html'
+        main(url, concurrency=args.concurrency, requests_per_second=args.rps,
+             columnar_format=args.columnar, resume=args.resume, max_retries=args.retries,
+             cache_dir=args.cache_dir, cache_ttl=args.cache_ttl, offline=args.offline,
+             incremental=args.incremental, stop_after_unchanged=args.stop_after_unchanged,
+             parse_workers=args.parse_workers, profile=args.profile,
+             db_writer_queue_size=args.db_writer_queue)